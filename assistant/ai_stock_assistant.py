@@ -6,8 +6,9 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from scripts.stock_api import StockAPIClient, StockAPIError
+from scripts.stock_api import StockAPIClient, StockAPIError, normalize_stock_code
 from scripts.technical_indicators import TechnicalIndicators, StockScreener
+from scripts.stock_scanner import StockScanner
 import json
 from typing import Dict, List
 
@@ -15,15 +16,17 @@ from typing import Dict, List
 class AIStockAssistant:
     """AI股票助手 - 提供给AI调用的接口"""
 
-    def __init__(self, api_source: str = 'tencent'):
+    def __init__(self, api_source: str = 'tencent', scanner: StockScanner = None):
         """
         初始化
         api_source: API数据源 ('tencent' 或 'sina')
+        scanner: 全市场扫描器（市场概览使用），默认在首次使用时创建
         """
         self.api_client = StockAPIClient()
         self.api_source = api_source
         self.screener = StockScreener()
         self.indicators = TechnicalIndicators()
+        self.scanner = scanner
 
     def query_stock(self, stock_code: str) -> Dict:
         """
@@ -51,10 +54,30 @@ class AIStockAssistant:
         stock_codes: 股票代码列表
         返回股票信息列表
         """
+        if self.api_source != 'tencent':
+            return [self.query_stock(code) for code in stock_codes]
+
+        # 腾讯数据源支持一次请求查询多只股票
+        try:
+            quotes = self.api_client.get_stock_prices(stock_codes)
+        except StockAPIError as e:
+            return [{'success': False, 'error': str(e), 'stock_code': code} for code in stock_codes]
+
         results = []
         for code in stock_codes:
-            result = self.query_stock(code)
-            results.append(result)
+            stock_data = quotes.get(normalize_stock_code(code))
+            if stock_data:
+                results.append({
+                    'success': True,
+                    'data': stock_data,
+                    'formatted': self.api_client.format_stock_info(stock_data)
+                })
+            else:
+                results.append({
+                    'success': False,
+                    'error': f"无法解析股票数据: {code}",
+                    'stock_code': code
+                })
         return results
 
     def get_stock_price_simple(self, stock_code: str) -> str:
@@ -233,6 +256,34 @@ class AIStockAssistant:
         }
 
 
+    def get_market_overview(self, snapshot=None, top_n: int = 10) -> Dict:
+        """
+        全市场概览（涨跌家数、涨幅榜、跌幅榜、成交额榜）
+        snapshot: MarketSnapshot，默认使用扫描器的当前快照（盘中超过 max_age 的快照会重新获取）
+        top_n: 各榜单数量
+        """
+        if snapshot is None:
+            if self.scanner is None:
+                self.scanner = StockScanner()
+            snapshot = self.scanner.current_snapshot()
+
+        change = snapshot['change_percent']
+        rising = int((change > 0).sum())
+        falling = int((change < 0).sum())
+        flat = len(snapshot) - rising - falling
+
+        return {
+            'total': len(snapshot),
+            'rising': rising,
+            'falling': falling,
+            'flat': flat,
+            'top_gainers': snapshot.top('change_percent', top_n).to_records(),
+            'top_losers': snapshot.top('change_percent', top_n, ascending=True).to_records(),
+            'top_turnover': snapshot.top('turnover', top_n).to_records(),
+            'summary': f"全市场 {len(snapshot)} 只股票: 上涨 {rising}, 下跌 {falling}, 平盘 {flat}"
+        }
+
+
 # 便捷函数，供AI快速调用
 def get_stock_info(stock_code: str) -> str:
     """
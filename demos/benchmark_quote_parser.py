@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""行情解析性能对比：逐字典解析 vs 向量化解析
+
+使用方法：
+    python benchmark_quote_parser.py              # 默认5500只股票
+    python benchmark_quote_parser.py --count 1000
+"""
+import sys
+import os
+import time
+import argparse
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+# 设置UTF-8编码
+from scripts.encoding_helper import auto_setup
+auto_setup()
+
+from scripts.stock_api import _parse_tencent_fields, _TENCENT_LINE_RE
+from scripts.quote_parser import parse_tencent_batch
+
+
+def make_payload(count: int) -> bytes:
+    """构造与腾讯批量接口格式相同的模拟响应"""
+    lines = []
+    for i in range(count):
+        code = f'{600000 + i}' if i % 2 else f'{i:06d}'
+        market = 'sh' if code.startswith('6') else 'sz'
+        fields = [str(i % 100)] * 88
+        fields[1] = f'测试股票{i % 1000}'
+        fields[2] = code
+        fields[3] = f'{10 + (i % 500) * 0.01:.2f}'
+        fields[4] = '10.00'
+        fields[30] = '20260105150000'
+        fields[31] = '15:00:00'
+        lines.append(f'v_{market}{code}="{"~".join(fields)}";\n')
+    return ''.join(lines).encode('gbk')
+
+
+def parse_dict_path(raw: bytes):
+    """当前实现：整体GBK解码、切分字符串、逐字段 float()、逐股构造字典"""
+    content = raw.decode('gbk')
+    return [_parse_tencent_fields(symbol[2:], data.split('~'))
+            for symbol, data in _TENCENT_LINE_RE.findall(content)]
+
+
+def best_of(func, raw: bytes, repeat: int) -> float:
+    """多次运行取最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(raw)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(count: int, repeat: int):
+    raw = make_payload(count)
+    print("=" * 60)
+    print(f"行情解析性能对比 - {count} 只股票, 响应 {len(raw) / 1024:.0f} KB")
+    print("=" * 60)
+
+    dict_ms = best_of(parse_dict_path, raw, repeat)
+    array_ms = best_of(parse_tencent_batch, raw, repeat)
+
+    print(f"  逐字典解析:   {dict_ms:8.2f} ms")
+    print(f"  向量化解析:   {array_ms:8.2f} ms")
+    print(f"  加速比:       {dict_ms / array_ms:8.2f} x")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='行情解析性能对比')
+    parser.add_argument('--count', type=int, default=5500, help='股票数量（默认5500）')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数（默认5）')
+    args = parser.parse_args()
+
+    main(args.count, args.repeat)
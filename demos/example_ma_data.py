@@ -53,7 +53,7 @@ def example_2_batch_get_ma():
     symbols = ['601318', '600519', '000001', '002594']
     names = ['中国平安', '贵州茅台', '平安银行', '比亚迪']
 
-    results = batch_get_stock_ma(symbols, delay=0.5)
+    results = batch_get_stock_ma(symbols)
 
     print(f"{'股票名称':<12} {'代码':<10} {'MA5':<10} {'MA10':<10} {'MA20':<10}")
     print("-" * 70)
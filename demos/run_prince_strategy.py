@@ -8,7 +8,6 @@ auto_setup()
 
 from scripts import StockScanner, EnhancedStockAPI
 from strategies.custom import 王子战法
-import time
 
 def prince_strategy_wrapper(stock_detail):
     """
@@ -105,9 +104,6 @@ def main():
             if i % 50 == 0:
                 print(f"  进度: {i}/{len(hot_stocks)}")
 
-            # 避免请求过快
-            time.sleep(1.0)
-
         except Exception as e:
             print(f"  [{i}] ✗ {stock.get('name', code)}: {e}")
             continue
@@ -20,7 +20,6 @@ from scripts.stock_scanner import StockScanner
 from scripts.stock_api_enhanced import EnhancedStockAPI
 from scripts.stock_ma_data import MADataAPI
 from strategies.custom import 王子战法
-import time
 import argparse
 
 
@@ -137,12 +136,9 @@ def main(target_count=10):
                 print(f"\n已找到 {target_count} 只符合条件的股票，停止筛选")
                 break
 
-            # 每30只显示进度
+            # 每30只显示进度（请求频率由全局限速器控制）
             if i % 30 == 0:
                 print(f"  进度: {i}/{len(hot_stocks)} - 已找到 {len(qualified)} 只")
-                time.sleep(1.0)  # 避免请求过快
-            else:
-                time.sleep(1.0)  # 基本延迟
 
         except Exception as e:
             # 修复：添加错误日志
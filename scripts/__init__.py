@@ -1,18 +1,32 @@
 """
 核心模块 - 股票数据获取和扫描
 """
-from .stock_api import StockAPIClient, StockAPIError
+from .stock_api import StockAPIClient, StockAPIError, StockDataError
 from .stock_api_enhanced import EnhancedStockAPI
 from .stock_scanner import StockScanner, get_all_stocks, scan_market
+from .async_stock_client import AsyncStockClient
+from .quote_cache import QuoteCache, get_quote_cache
+from .quote_models import Quote, QuoteBatch
+from .screen_expression import ScreenExpression, ExpressionError
+from .market_snapshot import MarketSnapshot
 from .technical_indicators import TechnicalIndicators, StockScreener
 
 __all__ = [
     'StockAPIClient',
     'StockAPIError',
+    'StockDataError',
     'EnhancedStockAPI',
     'StockScanner',
     'get_all_stocks',
     'scan_market',
+    'AsyncStockClient',
+    'QuoteCache',
+    'get_quote_cache',
+    'Quote',
+    'QuoteBatch',
+    'ScreenExpression',
+    'ExpressionError',
+    'MarketSnapshot',
     'TechnicalIndicators',
     'StockScreener',
 ]
@@ -0,0 +1,279 @@
+"""
+异步行情客户端（asyncio）
+与 StockAPIClient / EnhancedStockAPI / StockScanner 提供相同的腾讯、新浪、东方财富接口，
+所有请求共享一个事件循环和一个连接池，适合同时发起成百上千个请求
+
+依赖 aiohttp（可选）：pip install aiohttp
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from .stock_api import (SINA_HEADERS, StockAPIError, normalize_stock_code, _market_prefix,
+                            _parse_tencent_fields, _parse_sina_fields, _TENCENT_LINE_RE)
+    from .stock_api_enhanced import (DETAIL_FIELDS, ULIST_DETAIL_FIELDS, _secid,
+                                     _parse_detail_em, _ulist_to_detail_fields)
+    from .stock_scanner import CLIST_URL, CLIST_FIELDS, clist_params, _parse_clist_item
+    from .rate_limiter import get_rate_limiter
+except ImportError:
+    from stock_api import (SINA_HEADERS, StockAPIError, normalize_stock_code, _market_prefix,
+                           _parse_tencent_fields, _parse_sina_fields, _TENCENT_LINE_RE)
+    from stock_api_enhanced import (DETAIL_FIELDS, ULIST_DETAIL_FIELDS, _secid,
+                                    _parse_detail_em, _ulist_to_detail_fields)
+    from stock_scanner import CLIST_URL, CLIST_FIELDS, clist_params, _parse_clist_item
+    from rate_limiter import get_rate_limiter
+
+
+EM_UT = 'fa5fd1943c7b386f172d6893dbfba10b'
+
+# 各数据源的默认地址（测试时可通过 base_urls 指向本地替身服务）
+DEFAULT_BASE_URLS = {
+    'tencent': 'http://qt.gtimg.cn/q=',
+    'sina': 'http://hq.sinajs.cn/list=',
+    'em_detail': 'http://push2.eastmoney.com/api/qt/stock/get',
+    'em_ulist': 'http://push2.eastmoney.com/api/qt/ulist.np/get',
+    'em_clist': CLIST_URL,
+}
+
+
+class AsyncStockClient:
+    """异步A股行情客户端"""
+
+    def __init__(self,
+                 timeout: float = 5,
+                 limit_per_host: int = 10,
+                 max_concurrency: int = 100,
+                 base_urls: Optional[Dict[str, str]] = None):
+        """
+        初始化
+
+        参数:
+            timeout: 单个请求超时（秒）
+            limit_per_host: 每个主机的最大连接数
+            max_concurrency: 同时在途的请求数上限（信号量）
+            base_urls: 覆盖默认数据源地址，键同 DEFAULT_BASE_URLS
+        """
+        if aiohttp is None:
+            raise StockAPIError("AsyncStockClient 需要 aiohttp，请运行: pip install aiohttp")
+
+        self.timeout = timeout
+        self.limit_per_host = limit_per_host
+        self.max_concurrency = max_concurrency
+        self.base_urls = {**DEFAULT_BASE_URLS, **(base_urls or {})}
+        self.limiter = get_rate_limiter()
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self) -> 'AsyncStockClient':
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_session(self):
+        """在当前事件循环中创建连接池"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, url: str, params: Optional[Dict] = None,
+                   headers: Optional[Dict] = None) -> bytes:
+        """发送GET请求，返回原始响应内容"""
+        self._ensure_session()
+        await self.limiter.acquire_async(url)
+        async with self._semaphore:
+            async with self._session.get(url, params=params, headers=headers) as response:
+                if response.status != 200:
+                    raise StockAPIError(f"HTTP错误: {response.status}")
+                return await response.read()
+
+    async def _get_json(self, url: str, params: Optional[Dict] = None) -> Dict:
+        return json.loads(await self._get(url, params))
+
+    async def gather_bounded(self,
+                             func: Callable[[str], Awaitable],
+                             items: List[str]) -> List:
+        """
+        对每个元素并发执行协程（受信号量限制），结果顺序与输入一致
+
+        失败的元素返回对应的异常对象而不是抛出
+        """
+        return await asyncio.gather(*(func(item) for item in items), return_exceptions=True)
+
+    # ---------------- 腾讯 / 新浪 实时行情 ----------------
+
+    async def get_stock_price_tencent(self, stock_code: str) -> Dict:
+        """腾讯API获取单只股票实时行情"""
+        url = f"{self.base_urls['tencent']}{_market_prefix(stock_code)}{stock_code}"
+        try:
+            content = (await self._get(url)).decode('gbk', errors='ignore')
+            if '~' not in content:
+                raise StockAPIError(f"无法解析股票数据: {stock_code}")
+            fields = content.split('"')[1].split('~')
+            return _parse_tencent_fields(stock_code, fields)
+        except Exception as e:
+            raise StockAPIError(f"获取股票行情失败: {str(e)}")
+
+    async def get_stock_price_sina(self, stock_code: str) -> Dict:
+        """新浪API获取单只股票实时行情"""
+        url = f"{self.base_urls['sina']}{_market_prefix(stock_code)}{stock_code}"
+        try:
+            content = (await self._get(url, headers=SINA_HEADERS)).decode('gbk', errors='ignore')
+            if '=' not in content:
+                raise StockAPIError(f"无法解析股票数据: {stock_code}")
+            fields = content.split('"')[1].split(',')
+            return _parse_sina_fields(stock_code, fields)
+        except Exception as e:
+            raise StockAPIError(f"获取股票行情失败: {str(e)}")
+
+    async def get_stock_price(self, stock_code: str, source: str = 'tencent') -> Dict:
+        """获取股票实时行情，source: 'tencent' 或 'sina'"""
+        stock_code = normalize_stock_code(stock_code)
+
+        if source == 'tencent':
+            return await self.get_stock_price_tencent(stock_code)
+        elif source == 'sina':
+            return await self.get_stock_price_sina(stock_code)
+        else:
+            raise StockAPIError(f"不支持的数据源: {source}")
+
+    async def get_stock_prices(self, stock_codes: List[str], batch_size: int = 100) -> Dict[str, Dict]:
+        """
+        批量获取实时行情（腾讯多代码接口，各批次并发请求）
+
+        返回:
+            {stock_code: 行情字典}，顺序与输入一致
+        """
+        codes = list(dict.fromkeys(normalize_stock_code(code) for code in stock_codes))
+        chunks = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, Dict]:
+            symbols = ','.join(f"{_market_prefix(code)}{code}" for code in chunk)
+            try:
+                content = (await self._get(f"{self.base_urls['tencent']}{symbols}")).decode('gbk', errors='ignore')
+            except Exception as e:
+                raise StockAPIError(f"批量获取股票行情失败: {str(e)}")
+
+            quotes = {}
+            for symbol, data_str in _TENCENT_LINE_RE.findall(content):
+                fields = data_str.split('~')
+                if len(fields) < 38:
+                    continue
+                try:
+                    quotes[symbol[2:]] = _parse_tencent_fields(symbol[2:], fields)
+                except ValueError:
+                    continue
+            return quotes
+
+        results = {}
+        for quotes in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+            results.update(quotes)
+
+        return {code: results[code] for code in codes if code in results}
+
+    # ---------------- 东方财富 详细数据 ----------------
+
+    async def get_stock_detail_em(self, stock_code: str) -> Dict:
+        """东方财富 stock/get 获取单只股票详细数据（含换手率）"""
+        params = {
+            'secid': _secid(stock_code),
+            'fields': DETAIL_FIELDS,
+            'ut': EM_UT
+        }
+        try:
+            data = await self._get_json(self.base_urls['em_detail'], params)
+            if not data.get('data'):
+                raise StockAPIError("未获取到数据")
+            return _parse_detail_em(stock_code, data['data'])
+        except Exception as e:
+            raise StockAPIError(f"获取股票详情失败: {str(e)}")
+
+    async def get_stock_details_em(self, stock_codes: List[str], batch_size: int = 100) -> Dict[str, Dict]:
+        """
+        批量获取详细数据（东方财富 ulist 接口，各批次并发请求）
+
+        返回:
+            {stock_code: 详细数据字典}，字段与 get_stock_detail_em 一致
+        """
+        codes = list(dict.fromkeys(stock_codes))
+        chunks = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+
+        async def fetch_chunk(chunk: List[str]) -> List[Dict]:
+            params = {
+                'secids': ','.join(_secid(code) for code in chunk),
+                'fields': ULIST_DETAIL_FIELDS,
+                'ut': EM_UT
+            }
+            try:
+                data = await self._get_json(self.base_urls['em_ulist'], params)
+            except Exception as e:
+                raise StockAPIError(f"批量获取股票详情失败: {str(e)}")
+            diff = (data.get('data') or {}).get('diff') or []
+            return list(diff.values()) if isinstance(diff, dict) else diff
+
+        results = {}
+        for items in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+            for item in items:
+                code = item.get('f12', '')
+                if code:
+                    results[code] = _parse_detail_em(code, _ulist_to_detail_fields(item))
+
+        return {code: results[code] for code in codes if code in results}
+
+    # ---------------- 东方财富 全市场列表 ----------------
+
+    async def get_clist_page(self,
+                             page: int,
+                             page_size: int = 100,
+                             fid: str = 'f62',
+                             fields: str = CLIST_FIELDS) -> Tuple[List[Dict], int]:
+        """
+        获取 clist 的一页
+
+        返回:
+            (股票列表, 全市场总数)
+        """
+        params = clist_params(page, page_size, fid, fields)
+        data = await self._get_json(self.base_urls['em_clist'], params)
+        payload = data.get('data') or {}
+        items = payload.get('diff') or []
+        if isinstance(items, dict):
+            items = list(items.values())
+        return [_parse_clist_item(item) for item in items], payload.get('total', 0)
+
+    async def get_all_stocks(self, limit: Optional[int] = None, page_size: int = 100) -> List[Dict]:
+        """
+        获取所有A股列表：先取第一页得到总数，其余页并发获取后按代码去重合并
+        """
+        first, total = await self.get_clist_page(1, page_size)
+        if limit:
+            total = min(total, limit)
+
+        pages = max(1, -(-total // page_size))
+        rest = await asyncio.gather(*(self.get_clist_page(pn, page_size) for pn in range(2, pages + 1)))
+
+        stocks = {}
+        for page_stocks in [first] + [r[0] for r in rest]:
+            for stock in page_stocks:
+                stocks.setdefault(stock['code'], stock)
+
+        all_stocks = list(stocks.values())
+        return all_stocks[:limit] if limit else all_stocks
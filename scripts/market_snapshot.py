@@ -0,0 +1,262 @@
+"""
+全市场行情快照（列式）
+每个字段一个 NumPy 数组，代码 -> 行号 哈希索引，市场、行业等字段的二级索引按需建立；
+筛选得到的是共享原数组的视图（只记录行号），排行用 argpartition 做部分排序
+
+示例:
+    snapshot = scanner.get_snapshot()
+    snapshot.get('600000')                       # 单只股票（O(1)）
+    snapshot.by_industry('银行').top('turnover', 10)
+    snapshot.filter('change_percent > 3').to_records()
+"""
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+try:
+    from .screen_expression import ScreenExpression
+except ImportError:
+    from screen_expression import ScreenExpression
+
+
+def _to_column(values: List) -> np.ndarray:
+    """一个字段的取值转换为数组；文本字段的缺失值按空字符串处理（与 _storable 一致）"""
+    column = np.asarray(values)
+    if column.dtype == object and any(isinstance(v, str) for v in values):
+        column = np.array(['' if v is None else str(v) for v in values])
+    return column
+
+
+def stocks_to_columns(stocks: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    股票字典列表转换为列式结构 {字段: 数组}
+
+    字段取自第一条记录；数值字段为数值数组（缺失值为 None 的列为对象数组），
+    字符串字段为定长字符串数组。转换一次后可对同一批数据执行任意多个向量化筛选
+    """
+    if not stocks:
+        return {}
+    return {key: _to_column([stock.get(key) for stock in stocks]) for key in stocks[0]}
+
+
+def columns_to_stocks(columns: Dict[str, np.ndarray], rows: Optional[np.ndarray] = None) -> List[Dict]:
+    """列式结构转换回股票字典列表（rows 为行号，None表示全部）"""
+    if rows is None:
+        rows = np.arange(len(next(iter(columns.values()), ())))
+    picked = {key: values[rows].tolist() for key, values in columns.items()}
+    return [dict(zip(picked, values)) for values in zip(*picked.values())]
+
+
+def _storable(values: np.ndarray) -> np.ndarray:
+    """对象数组（含 None 的列）转换为可不用 pickle 保存的类型"""
+    if values.dtype != object:
+        return values
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return np.array(['' if v is None else str(v) for v in values.tolist()])
+
+
+class MarketSnapshot:
+    """
+    全市场行情快照
+
+    与 DataFrame 一致：len() 为股票数，snapshot['字段'] 取一列，'字段' in snapshot 判断字段是否存在，
+    因此可直接传给 mask_func / ScreenExpression；按代码查找使用 get()、row()
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray],
+                 fetched_at: Optional[datetime] = None,
+                 code_field: str = 'code',
+                 _rows: Optional[np.ndarray] = None):
+        """
+        参数:
+            columns: {字段: 数组}
+            fetched_at: 行情获取时间（北京时间）
+            code_field: 代码字段名
+        """
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.fetched_at = fetched_at
+        self.code_field = code_field
+        self._rows = _rows          # 视图对应原数组的行号，None表示全部
+        self._index = None          # 代码 -> 位置
+        self._groups = {}           # 字段 -> {值: 位置数组}
+
+    @classmethod
+    def from_stocks(cls, stocks: List[Dict], fetched_at: Optional[datetime] = None) -> 'MarketSnapshot':
+        """从 get_all_stocks 返回的股票字典列表创建"""
+        return cls(stocks_to_columns(stocks), fetched_at)
+
+    # ---- 基本访问 ----
+
+    def __len__(self) -> int:
+        if self._rows is not None:
+            return len(self._rows)
+        return len(next(iter(self.columns.values()), ()))
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.columns
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.column(field)
+
+    def keys(self):
+        return self.columns.keys()
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+
+    def column(self, field: str) -> np.ndarray:
+        """取出一列（全量快照不复制，视图按行号取值）"""
+        values = self.columns[field]
+        return values if self._rows is None else values[self._rows]
+
+    @property
+    def codes(self) -> List[str]:
+        return self.column(self.code_field).tolist()
+
+    def _code_index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {code: position for position, code in enumerate(self.codes)}
+        return self._index
+
+    def has_code(self, code: str) -> bool:
+        return code in self._code_index()
+
+    def row(self, code: str) -> int:
+        """代码在本快照（视图）中的位置"""
+        return self._code_index()[code]
+
+    def rows(self, codes: Iterable[str]) -> np.ndarray:
+        """多个代码对应的位置，不存在的为 -1"""
+        index = self._code_index()
+        return np.array([index.get(code, -1) for code in codes], dtype=np.int64)
+
+    def get(self, code: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """单只股票的字典（O(1)）"""
+        position = self._code_index().get(code)
+        if position is None:
+            return default
+        return self.records([position])[0]
+
+    def records(self, positions: Optional[Iterable[int]] = None) -> List[Dict]:
+        """指定位置（默认全部）转换为股票字典列表"""
+        base = self._rows if self._rows is not None else np.arange(len(self))
+        rows = base if positions is None else base[np.asarray(list(positions), dtype=np.int64)]
+        return columns_to_stocks(self.columns, rows)
+
+    def to_records(self) -> List[Dict]:
+        return self.records()
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    # ---- 视图 ----
+
+    def select(self, positions) -> 'MarketSnapshot':
+        """
+        按布尔掩码或位置取子集，返回共享原数组的视图（不复制列数据）
+        """
+        positions = np.asarray(positions)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        base = self._rows if self._rows is not None else np.arange(len(self))
+        return MarketSnapshot(self.columns, self.fetched_at, self.code_field, _rows=base[positions])
+
+    def filter(self, mask_func: Union[str, Callable[[Any], Any]]) -> 'MarketSnapshot':
+        """
+        按筛选条件取子集
+
+        参数:
+            mask_func: 筛选表达式（如 'change_percent > 3'）或接收快照返回布尔掩码的函数
+        """
+        if isinstance(mask_func, str):
+            mask_func = ScreenExpression(mask_func)
+        mask = np.asarray(mask_func(self), dtype=bool)
+        return self.select(np.broadcast_to(mask, (len(self),)))
+
+    def group(self, field: str) -> Dict[Any, np.ndarray]:
+        """二级索引：{字段值: 位置数组}（首次使用时建立）"""
+        groups = self._groups.get(field)
+        if groups is None:
+            values = self.column(field)
+            try:
+                order = np.argsort(values, kind='stable')
+                keys, starts = np.unique(values[order], return_index=True)
+                groups = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+            except TypeError:
+                # 对象数组中混有无法比较的值（如数值与 None），按值逐个归组
+                positions = {}
+                for position, value in enumerate(values.tolist()):
+                    positions.setdefault(value, []).append(position)
+                groups = {value: np.array(rows, dtype=np.int64) for value, rows in positions.items()}
+            self._groups[field] = groups
+        return groups
+
+    def where(self, field: str, value) -> 'MarketSnapshot':
+        """字段等于某个值的视图（使用二级索引）"""
+        return self.select(self.group(field).get(value, np.empty(0, dtype=np.int64)))
+
+    def by_market(self, market) -> 'MarketSnapshot':
+        """某个市场（0 深市、1 沪市）的股票"""
+        return self.where('market', market)
+
+    def by_industry(self, industry: str) -> 'MarketSnapshot':
+        """某个行业的股票（需要快照包含 industry 字段）"""
+        return self.where('industry', industry)
+
+    def top(self, field: str, k: int, ascending: bool = False) -> 'MarketSnapshot':
+        """
+        按字段排序的前 k 只（argpartition 部分排序，只对前 k 个完整排序）
+
+        参数:
+            field: 排序字段
+            k: 数量
+            ascending: True 为从小到大
+        """
+        values = np.asarray(self.column(field), dtype=float)
+        keys = values if ascending else -values
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        k = min(k, len(keys))
+        if k <= 0:
+            return self.select(np.empty(0, dtype=np.int64))
+        candidates = np.argpartition(keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        return self.select(candidates[np.argsort(keys[candidates], kind='stable')])
+
+    def copy(self) -> 'MarketSnapshot':
+        """复制为独立的快照（视图只保留选中的行）"""
+        return MarketSnapshot({field: np.array(self.column(field)) for field in self.columns},
+                              self.fetched_at, self.code_field)
+
+    # ---- 保存 ----
+
+    def save(self, path: str):
+        """保存为 .npz 文件（原子写入）"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        arrays = {f'col_{field}': _storable(self.column(field)) for field in self.columns}
+        arrays['__fields__'] = np.array(list(self.columns))
+        arrays['__code_field__'] = np.array(self.code_field)
+        arrays['__fetched_at__'] = np.array(self.fetched_at.isoformat() if self.fetched_at else '')
+
+        tmp_path = f'{path}.tmp.{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'MarketSnapshot':
+        """从 save() 保存的文件读取"""
+        with np.load(path) as data:
+            fields = data['__fields__'].tolist()
+            fetched_at = str(data['__fetched_at__'])
+            return cls({field: data[f'col_{field}'] for field in fields},
+                       datetime.fromisoformat(fetched_at) if fetched_at else None,
+                       str(data['__code_field__']))
+
+    def __repr__(self) -> str:
+        fetched = self.fetched_at.strftime('%Y-%m-%d %H:%M:%S') if self.fetched_at else '-'
+        return f"MarketSnapshot({len(self)} 只, {len(self.columns)} 个字段, {fetched})"
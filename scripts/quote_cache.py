@@ -0,0 +1,126 @@
+"""
+实时行情缓存
+进程内共享的LRU缓存，有效期随交易时段变化：
+- 集合竞价和连续竞价期间只缓存几秒
+- 9:25-9:30 竞价撮合后缓存到连续竞价开始
+- 午间休市期间缓存到13:00开盘
+- 收盘后、周末和节假日缓存到下一个交易日开盘
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional
+
+try:
+    from .trading_session import beijing_now, is_market_active, seconds_until_active
+except ImportError:
+    from trading_session import beijing_now, is_market_active, seconds_until_active
+
+
+def session_ttl(now: datetime, live_ttl: float) -> float:
+    """
+    根据当前交易时段计算行情有效期（秒）
+
+    参数:
+        now: 当前时间（北京时间）
+        live_ttl: 交易进行中的有效期
+    """
+    if is_market_active(now):
+        return live_ttl
+    return seconds_until_active(now)
+
+
+class QuoteCache:
+    """按交易时段设置有效期的LRU行情缓存（线程安全）"""
+
+    def __init__(self,
+                 max_size: int = 6000,
+                 live_ttl: float = 3.0,
+                 now_func: Callable[[], datetime] = beijing_now,
+                 clock: Callable[[], float] = time.time):
+        """
+        初始化
+
+        参数:
+            max_size: 最大缓存条数，超出后淘汰最久未使用的条目
+            live_ttl: 交易进行中的有效期（秒）
+            now_func: 返回当前北京时间，用于判断交易时段
+            clock: 返回当前时间戳，用于判断过期
+        """
+        self.max_size = max_size
+        self.live_ttl = live_ttl
+        self.now_func = now_func
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self) -> float:
+        """当前时段的有效期（秒）"""
+        return session_ttl(self.now_func(), self.live_ttl)
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """读取缓存，未命中或已过期返回None（返回副本，调用方可自由修改）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, key: Hashable, value: Dict):
+        """写入缓存"""
+        expires_at = self.clock() + self.ttl()
+        with self._lock:
+            self._entries[key] = (expires_at, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Dict]) -> Dict:
+        """命中则直接返回，否则调用 fetch() 获取并写入缓存"""
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """清空缓存和计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+# 全局实例
+_quote_cache = None
+
+
+def get_quote_cache() -> QuoteCache:
+    """获取全局行情缓存实例"""
+    global _quote_cache
+    if _quote_cache is None:
+        _quote_cache = QuoteCache()
+    return _quote_cache
@@ -0,0 +1,267 @@
+"""
+统一行情数据结构
+- Quote: 单只股票行情（__slots__，字段名统一，成交额统一为元）
+- QuoteBatch: 多只股票行情的列式容器（每个字段一个 NumPy 数组，按代码索引）
+
+各数据源原有的行情字典字段名不一致（腾讯/新浪为 turnover，东方财富为 turnover_amount，
+且腾讯成交额单位是万元），这里统一后可通过 from_dict / to_dict 与旧字典互相转换，
+原有战法无需修改
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+# 统一字段及其列类型
+QUOTE_COLUMNS = (
+    ('stock_code', 'U6'),
+    ('stock_name', 'U16'),
+    ('current_price', 'f8'),
+    ('yesterday_close', 'f8'),
+    ('open_price', 'f8'),
+    ('high_price', 'f8'),
+    ('low_price', 'f8'),
+    ('volume', 'i8'),                   # 成交量（手）
+    ('amount', 'f8'),                   # 成交额（元）
+    ('change_percent', 'f8'),           # 涨跌幅（%）
+    ('turnover_rate', 'f8'),            # 换手率（%）
+    ('total_market_cap', 'f8'),         # 总市值（元）
+    ('circulating_market_cap', 'f8'),   # 流通市值（元）
+    ('buy1_price', 'f8'),
+    ('sell1_price', 'f8'),
+    ('industry', 'U16'),
+    ('timestamp', 'i8'),                # 行情时间（Unix时间戳，秒）
+)
+QUOTE_FIELDS = tuple(name for name, _ in QUOTE_COLUMNS)
+
+# 各数据源旧字典中成交额的字段名及换算为元的倍数
+_AMOUNT_KEYS = {
+    'tencent': ('turnover', 10000),    # 万元
+    'sina': ('turnover', 10000),       # 万元（解析时已由元换算）
+    'em': ('turnover_amount', 1),
+}
+
+_BEIJING = timezone(timedelta(hours=8))
+
+
+def _legacy_timestamp(data: Dict) -> int:
+    """从旧字典取行情时间：东方财富为时间戳，腾讯为 20260105150000，新浪为日期+时间"""
+    if data.get('timestamp'):
+        return int(data['timestamp'])
+
+    date = str(data.get('date') or '')
+    clock = str(data.get('time') or '')
+    for text, fmt in ((date, '%Y%m%d%H%M%S'), (f'{date} {clock}', '%Y-%m-%d %H:%M:%S')):
+        try:
+            return int(datetime.strptime(text, fmt).replace(tzinfo=_BEIJING).timestamp())
+        except ValueError:
+            continue
+    return 0
+
+
+def _detect_source(data: Dict) -> str:
+    """根据字段名推断旧字典的来源（含 turnover_amount 的为东方财富，否则按腾讯处理）"""
+    return 'em' if 'turnover_amount' in data else 'tencent'
+
+
+class Quote:
+    """单只股票行情"""
+
+    __slots__ = QUOTE_FIELDS
+
+    def __init__(self, stock_code: str, stock_name: str = '',
+                 current_price: float = 0.0, yesterday_close: float = 0.0,
+                 open_price: float = 0.0, high_price: float = 0.0, low_price: float = 0.0,
+                 volume: int = 0, amount: float = 0.0, change_percent: float = 0.0,
+                 turnover_rate: float = 0.0, total_market_cap: float = 0.0,
+                 circulating_market_cap: float = 0.0, buy1_price: float = 0.0,
+                 sell1_price: float = 0.0, industry: str = '', timestamp: int = 0):
+        self.stock_code = stock_code
+        self.stock_name = stock_name
+        self.current_price = current_price
+        self.yesterday_close = yesterday_close
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.volume = volume
+        self.amount = amount
+        self.change_percent = change_percent
+        self.turnover_rate = turnover_rate
+        self.total_market_cap = total_market_cap
+        self.circulating_market_cap = circulating_market_cap
+        self.buy1_price = buy1_price
+        self.sell1_price = sell1_price
+        self.industry = industry
+        self.timestamp = timestamp
+
+    @property
+    def change_amount(self) -> float:
+        """涨跌额"""
+        return self.current_price - self.yesterday_close
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: Optional[str] = None) -> 'Quote':
+        """
+        从旧行情字典创建
+
+        参数:
+            data: get_stock_price / get_stock_detail_em 等返回的字典
+            source: 'tencent'、'sina' 或 'em'，决定成交额字段和单位；None表示按字段名推断
+        """
+        amount_key, scale = _AMOUNT_KEYS[source or _detect_source(data)]
+        return cls(
+            stock_code=data.get('stock_code', ''),
+            stock_name=data.get('stock_name') or '',
+            current_price=float(data.get('current_price') or 0),
+            yesterday_close=float(data.get('yesterday_close') or 0),
+            open_price=float(data.get('open_price') or 0),
+            high_price=float(data.get('high_price') or 0),
+            low_price=float(data.get('low_price') or 0),
+            volume=int(data.get('volume') or 0),
+            amount=float(data.get(amount_key) or 0) * scale,
+            change_percent=float(data.get('change_percent') or 0),
+            turnover_rate=float(data.get('turnover_rate') or 0),
+            total_market_cap=float(data.get('total_market_cap') or 0),
+            circulating_market_cap=float(data.get('circulating_market_cap') or 0),
+            buy1_price=float(data.get('buy1_price') or 0),
+            sell1_price=float(data.get('sell1_price') or 0),
+            industry=data.get('industry') or '',
+            timestamp=_legacy_timestamp(data),
+        )
+
+    def to_dict(self) -> Dict:
+        """
+        转换为旧行情字典（字段与 get_stock_detail_em 一致，另含 buy1/sell1 和 date/time）
+
+        turnover 与 turnover_amount 均为成交额（元）
+        """
+        moment = datetime.fromtimestamp(self.timestamp, _BEIJING) if self.timestamp else None
+        return {
+            'stock_code': self.stock_code,
+            'stock_name': self.stock_name,
+            'current_price': self.current_price,
+            'open_price': self.open_price,
+            'yesterday_close': self.yesterday_close,
+            'high_price': self.high_price,
+            'low_price': self.low_price,
+            'volume': self.volume,
+            'turnover_amount': self.amount,
+            'turnover': self.amount,
+            'change_percent': self.change_percent,
+            'total_market_cap': self.total_market_cap,
+            'circulating_market_cap': self.circulating_market_cap,
+            'turnover_rate': self.turnover_rate,
+            'industry': self.industry,
+            'timestamp': self.timestamp,
+            'change_amount': self.change_amount,
+            'buy1_price': self.buy1_price,
+            'sell1_price': self.sell1_price,
+            'date': moment.strftime('%Y-%m-%d') if moment else '',
+            'time': moment.strftime('%H:%M:%S') if moment else '',
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Quote):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in QUOTE_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Quote({self.stock_code} {self.stock_name} {self.current_price:.2f} {self.change_percent:+.2f}%)"
+
+
+class QuoteBatch:
+    """
+    多只股票行情的列式容器
+
+    每个字段一个 NumPy 数组，可直接做向量化计算；
+    按代码查找通过 代码->行号 索引完成
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        参数:
+            columns: {字段名: 数组}，缺少的字段以默认值补齐
+        """
+        n = len(columns['stock_code'])
+        self.columns = {}
+        for name, dtype in QUOTE_COLUMNS:
+            values = columns.get(name)
+            self.columns[name] = np.zeros(n, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+        self._index = {code: row for row, code in enumerate(self.columns['stock_code'].tolist())}
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[Quote]) -> 'QuoteBatch':
+        """从 Quote 列表创建"""
+        quotes = list(quotes)
+        return cls({name: [getattr(q, name) for q in quotes] for name in QUOTE_FIELDS})
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[Dict], source: Optional[str] = None) -> 'QuoteBatch':
+        """从旧行情字典列表创建（参数同 Quote.from_dict）"""
+        return cls.from_quotes(Quote.from_dict(d, source) for d in records)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, source: str = 'tencent') -> 'QuoteBatch':
+        """
+        从 quote_parser 的结构化数组创建
+
+        参数:
+            array: parse_tencent_batch / parse_sina_batch 的结果
+            source: 'tencent' 或 'sina'，用于换算成交额单位
+        """
+        columns = {name: array[name] for name in array.dtype.names if name in QUOTE_FIELDS}
+        columns['amount'] = array['turnover'] * _AMOUNT_KEYS[source][1]
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns['stock_code'])
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._index
+
+    def __iter__(self) -> Iterator[Quote]:
+        for row in range(len(self)):
+            yield self._quote_at(row)
+
+    def __getitem__(self, stock_code: str) -> Quote:
+        return self._quote_at(self._index[stock_code])
+
+    def get(self, stock_code: str, default: Optional[Quote] = None) -> Optional[Quote]:
+        row = self._index.get(stock_code)
+        return default if row is None else self._quote_at(row)
+
+    def row(self, stock_code: str) -> int:
+        """代码所在行号"""
+        return self._index[stock_code]
+
+    def rows(self, codes: Iterable[str]) -> np.ndarray:
+        """多个代码对应的行号，不存在的为 -1"""
+        return np.array([self._index.get(code, -1) for code in codes], dtype=np.int64)
+
+    @property
+    def codes(self) -> List[str]:
+        return self.columns['stock_code'].tolist()
+
+    def column(self, name: str) -> np.ndarray:
+        """取出一列（不复制）"""
+        return self.columns[name]
+
+    def _quote_at(self, row: int) -> Quote:
+        return Quote(**{name: values[row].item() for name, values in self.columns.items()})
+
+    def select(self, rows) -> 'QuoteBatch':
+        """
+        按布尔掩码或行号取子集
+
+        示例:
+            batch.select(batch.column('change_percent') > 5)
+        """
+        return QuoteBatch({name: values[rows] for name, values in self.columns.items()})
+
+    def to_quotes(self) -> List[Quote]:
+        return list(self)
+
+    def to_dicts(self) -> List[Dict]:
+        """转换为旧行情字典列表（顺序不变）"""
+        return [quote.to_dict() for quote in self]
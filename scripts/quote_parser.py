@@ -0,0 +1,186 @@
+"""
+批量行情向量化解析
+将腾讯/新浪批量接口的原始响应（bytes）直接解析为 NumPy 结构化数组，
+数值列一次性转换，只对名称列做GBK解码
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# 结构化数组的列定义（字段名与行情字典保持一致）
+QUOTE_DTYPE = np.dtype([
+    ('stock_code', 'U6'),
+    ('stock_name', 'U16'),
+    ('current_price', 'f8'),
+    ('yesterday_close', 'f8'),
+    ('open_price', 'f8'),
+    ('volume', 'i8'),
+    ('turnover', 'f8'),
+    ('high_price', 'f8'),
+    ('low_price', 'f8'),
+    ('buy1_price', 'f8'),
+    ('sell1_price', 'f8'),
+    ('change_percent', 'f8'),
+])
+
+# 数值列在原始字段中的位置，顺序：现价、昨收、开盘、成交量、成交额、最高、最低、买一、卖一
+_NUMERIC_COLUMNS = ('current_price', 'yesterday_close', 'open_price', 'volume', 'turnover',
+                    'high_price', 'low_price', 'buy1_price', 'sell1_price')
+_TENCENT_INDEX = [3, 4, 5, 6, 37, 33, 34, 9, 19]
+_SINA_INDEX = [3, 2, 1, 8, 9, 4, 5, 6, 7]
+
+# 数值字段的最大字节数
+_FIELD_BYTES = 16
+
+
+# 单行格式: v_sh600000="...";（腾讯） 或 var hq_str_sh600000="...";（新浪）
+_RECORD_RE = re.compile(rb'(\d{6})="([^"]*)"')
+
+
+def _field_offsets(joined: bytes, sep: bytes, width: int):
+    """根据分隔符位置计算每个字段的起止偏移，返回 (字节数组, 起点矩阵, 终点矩阵)，矩阵形如 (行数, 字段数)"""
+    buf = np.frombuffer(joined, dtype=np.uint8)
+    seps = np.flatnonzero(buf == sep[0])
+    starts = np.concatenate(([0], seps + 1)).reshape(-1, width)
+    ends = np.concatenate((seps, [len(buf)])).reshape(-1, width)
+    return buf, starts, ends
+
+
+def _gather_columns(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray, indexes) -> np.ndarray:
+    """
+    按列取出字段字节串，返回形如 (列数, 行数) 的定长字节矩阵
+
+    直接按偏移从缓冲区取字节，不创建逐字段的 bytes 对象
+    """
+    field_starts = starts[:, indexes].T
+    field_lengths = np.minimum(ends[:, indexes].T - field_starts, _FIELD_BYTES)
+
+    offsets = np.arange(_FIELD_BYTES)
+    gather = np.minimum(field_starts[..., None] + offsets, len(buf) - 1)
+    chars = buf[gather]
+    chars[offsets >= field_lengths[..., None]] = 0
+    return chars.view(f'S{_FIELD_BYTES}')[..., 0]
+
+
+def _repair_names(codes, bodies, sep: bytes, name_index: int, code_index: Optional[int]) -> Dict[int, str]:
+    """
+    修复名称被误切的行，返回 {行号: 名称}
+
+    GBK双字节字符的第二字节可能恰好等于分隔符（如 '~' 即0x7E），这类名称会多切出字段；
+    名称之后的代码字段对不上时按GBK解码重新切分，把名称替换为空再参与定位，名称单独保存
+    """
+    names = {}
+    if code_index is None:
+        return names
+    for i, (code, body) in enumerate(zip(codes, bodies)):
+        parts = body.split(sep, code_index + 1)
+        if len(parts) > code_index and parts[code_index] == code.encode():
+            continue
+        fields = body.decode('gbk', errors='ignore').split(sep.decode())
+        names[i] = fields[name_index]
+        fields[name_index] = ''
+        bodies[i] = sep.join(f.encode('gbk', errors='ignore') for f in fields)
+    return names
+
+
+def _to_float(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    字节矩阵转换为浮点，返回 (数值, 每行是否有效)
+
+    空字段按0处理；整列一次转换失败时（如停牌股票的 '-'）才逐个转换，无法转换的行标记为无效
+    """
+    matrix = matrix.copy()
+    matrix[matrix == b''] = b'0'
+    try:
+        return matrix.astype(np.float64), np.ones(matrix.shape[1], dtype=bool)
+    except ValueError:
+        pass
+
+    def convert(value: bytes) -> float:
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+
+    values = np.frompyfunc(convert, 1, 1)(matrix).astype(np.float64)
+    return values, ~np.isnan(values).any(axis=0)
+
+
+def _build_array(raw: bytes, sep: bytes, min_fields: int, name_index: int, numeric_index,
+                 code_index: Optional[int] = None) -> np.ndarray:
+    """
+    将原始响应转换为结构化数组
+
+    不同证券类型（指数、ETF、停牌股票）的字段数可能不同，按字段数分组后分别定位；
+    数值字段无法解析的行（与逐字典解析一致）被丢弃
+    """
+    records = [(code.decode(), body) for code, body in _RECORD_RE.findall(raw)
+               if body.count(sep) >= min_fields - 1]
+    codes = [code for code, _ in records]
+    bodies = [body for _, body in records]
+    names = _repair_names(codes, bodies, sep, name_index, code_index)
+
+    n = len(records)
+    result = np.zeros(n, dtype=QUOTE_DTYPE)
+    if n == 0:
+        return result
+    result['stock_code'] = codes
+
+    counts = np.array([body.count(sep) for body in bodies])
+    valid = np.ones(n, dtype=bool)
+    for count in np.unique(counts).tolist():
+        rows = np.flatnonzero(counts == count)
+        joined = sep.join(bodies[i] for i in rows.tolist())
+        buf, starts, ends = _field_offsets(joined, sep, count + 1)
+
+        # 只取需要的数值列，一次性转换为浮点
+        values, ok = _to_float(_gather_columns(buf, starts, ends, numeric_index))
+        valid[rows] = ok
+        values[:, ~ok] = 0
+        for j, column in enumerate(_NUMERIC_COLUMNS):
+            result[column][rows] = values[j]
+
+        # 名称是唯一需要GBK解码的列：拼接后只解码一次
+        name_bytes = [joined[s:e] for s, e in zip(starts[:, name_index].tolist(), ends[:, name_index].tolist())]
+        result['stock_name'][rows] = b'\n'.join(name_bytes).decode('gbk', errors='ignore').split('\n')
+
+    for i, name in names.items():
+        result['stock_name'][i] = name
+    result = result[valid]
+
+    prev = result['yesterday_close']
+    change = np.zeros(len(result))
+    np.divide(result['current_price'] - prev, prev, out=change, where=prev > 0)
+    result['change_percent'] = change * 100
+
+    return result
+
+
+def parse_tencent_batch(raw: bytes) -> np.ndarray:
+    """
+    解析腾讯批量行情原始响应
+
+    参数:
+        raw: qt.gtimg.cn 返回的原始字节（GBK编码），可包含多行 v_sh600000="...";
+
+    返回:
+        QUOTE_DTYPE 结构化数组，每行一只股票
+    """
+    return _build_array(raw, b'~', 38, 1, _TENCENT_INDEX, code_index=2)
+
+
+def parse_sina_batch(raw: bytes) -> np.ndarray:
+    """
+    解析新浪批量行情原始响应
+
+    参数:
+        raw: hq.sinajs.cn 返回的原始字节（GBK编码），可包含多行 var hq_str_sh600000="...";
+
+    返回:
+        QUOTE_DTYPE 结构化数组，每行一只股票；成交额由元换算为万元，与腾讯一致
+    """
+    array = _build_array(raw, b',', 10, 0, _SINA_INDEX)
+    array['turnover'] /= 10000
+    return array
@@ -0,0 +1,324 @@
+"""
+东方财富SSE行情推送
+每组股票保持一个长连接（server-sent events），服务端先推送全量快照，
+之后只推送变化的字段；增量更新合并到内存行情表中。
+相比反复轮询 get_stock_details_em，延迟更低、请求数大幅减少。
+连接断开后按指数退避自动重连
+"""
+import json
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+try:
+    from .stock_api_enhanced import ULIST_DETAIL_FIELDS, _secid, _ulist_to_detail_fields, _parse_detail_em
+    from .rate_limiter import get_rate_limiter
+except ImportError:
+    from stock_api_enhanced import ULIST_DETAIL_FIELDS, _secid, _ulist_to_detail_fields, _parse_detail_em
+    from rate_limiter import get_rate_limiter
+
+
+SSE_URL = 'http://push2.eastmoney.com/api/qt/ulist/sse'
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """
+    按SSE协议拆分事件，返回每个事件的 data 内容
+
+    以冒号开头的行是心跳注释；多行 data 用换行拼接；空行表示事件结束
+    """
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data:
+        yield '\n'.join(data)
+
+
+def _iter_lines(response) -> Iterator[str]:
+    """
+    逐行读取流式响应
+
+    requests 的 iter_lines 要等缓冲区读满才返回，推送会被延迟；
+    这里每收到一段数据就立即切分处理
+    """
+    raw = response.raw
+    if not hasattr(raw, 'read1'):
+        # 旧版 urllib3 没有 read1，逐字节读取
+        yield from response.iter_lines(chunk_size=1, decode_unicode=True)
+        return
+
+    pending = b''
+    while True:
+        chunk = raw.read1(65536)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8', errors='replace')
+    if pending:
+        yield pending.decode('utf-8', errors='replace')
+
+
+def _response_socket(response) -> Optional[socket.socket]:
+    """
+    流式响应的底层socket，找不到时返回None
+
+    优先使用 urllib3 连接对象的 sock 属性（response.raw.connection.sock）；
+    服务端不保持连接时该属性为 None，再经 http.client 的内部属性查找（raw._fp.fp.raw._sock）。
+    两种方式均在 urllib3 2.8 / requests 2.34 上验证过
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        return sock
+    try:
+        return response.raw._fp.fp.raw._sock
+    except AttributeError:
+        return None
+
+
+def _interrupt(response):
+    """
+    关闭流式响应并唤醒阻塞在读取上的线程
+
+    仅调用 response.close() 不会中断另一个线程中正在进行的 recv，需要先关闭底层socket
+    """
+    sock = _response_socket(response)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+class QuoteTable:
+    """内存行情表（线程安全），保存每只股票列表接口字段的最新值"""
+
+    def __init__(self):
+        self._rows = {}        # code -> {字段: 值}
+        self.updated_at = {}   # code -> 最后更新时间戳
+        self._lock = threading.Lock()
+
+    def apply(self, code: str, fields: Dict) -> bool:
+        """合并一次增量更新，返回是否有字段发生变化"""
+        with self._lock:
+            row = self._rows.setdefault(code, {})
+            changed = any(row.get(key) != value for key, value in fields.items())
+            row.update(fields)
+            if changed:
+                self.updated_at[code] = time.time()
+            return changed
+
+    def raw(self, code: str) -> Optional[Dict]:
+        """原始字段（f2、f3 ...）"""
+        with self._lock:
+            row = self._rows.get(code)
+            return dict(row) if row is not None else None
+
+    def get(self, code: str) -> Optional[Dict]:
+        """详细数据字典，字段与 get_stock_detail_em 一致"""
+        row = self.raw(code)
+        if row is None:
+            return None
+        return _parse_detail_em(code, _ulist_to_detail_fields(row))
+
+    def codes(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """全部股票的详细数据"""
+        return {code: self.get(code) for code in self.codes()}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+class QuoteStream:
+    """
+    东方财富SSE行情流
+
+    示例:
+        stream = QuoteStream(['601318', '000001'], on_update=lambda codes: print(codes))
+        stream.start()
+        detail = stream.get_quote('601318')
+        stream.stop()
+    """
+
+    def __init__(self,
+                 codes: Iterable[str],
+                 group_size: int = 100,
+                 on_update: Optional[Callable[[List[str]], None]] = None,
+                 url: str = SSE_URL,
+                 read_timeout: float = 30.0,
+                 backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        """
+        参数:
+            codes: 股票代码
+            group_size: 每个连接订阅的股票数量
+            on_update: 回调函数，参数为本次发生变化的股票代码列表（在连接线程中调用）
+            url: SSE接口地址
+            read_timeout: 多久没有收到数据视为连接失效（秒）
+            backoff: 首次重连等待时间（秒），之后每次翻倍
+            max_backoff: 重连等待时间上限（秒）
+        """
+        codes = list(dict.fromkeys(codes))
+        self.groups = [codes[i:i + group_size] for i in range(0, len(codes), group_size)]
+        self.on_update = on_update
+        self.url = url
+        self.read_timeout = read_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.table = QuoteTable()
+        self.limiter = get_rate_limiter()
+        self.stats = {'connections': 0, 'reconnects': 0, 'messages': 0, 'updates': 0, 'errors': 0}
+        self.last_error: Optional[Exception] = None
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._responses = {}  # 分组序号 -> 当前连接（停止时关闭以唤醒读取）
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def start(self):
+        """为每组股票启动一个连接线程"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for index, codes in enumerate(self.groups):
+            thread = threading.Thread(target=self._run_group, args=(index, codes),
+                                      name=f'quote-stream-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """关闭所有连接"""
+        self._stop.set()
+        for response in list(self._responses.values()):
+            _interrupt(response)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_quote(self, code: str) -> Optional[Dict]:
+        """最新详细数据（尚未收到时返回None）"""
+        return self.table.get(code)
+
+    def get_quotes(self) -> Dict[str, Dict]:
+        return self.table.snapshot()
+
+    def _run_group(self, index: int, codes: List[str]):
+        """保持一组股票的连接，断开后按指数退避重连"""
+        delay = self.backoff
+        while not self._stop.is_set():
+            received = 0
+            try:
+                received = self._stream_group(index, codes)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self._count('errors')
+                self.last_error = e
+
+            if self._stop.is_set():
+                break
+
+            # 连接期间收到过数据说明服务正常，重新从最短等待开始
+            if received:
+                delay = self.backoff
+            self._count('reconnects')
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def _stream_group(self, index: int, codes: List[str]) -> int:
+        """建立一次连接并持续读取，返回收到的消息数"""
+        params = {
+            'secids': ','.join(_secid(code) for code in codes),
+            'fields': ULIST_DETAIL_FIELDS,
+            'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
+        }
+
+        self.limiter.acquire(self.url)
+        response = requests.get(self.url, params=params, stream=True,
+                                timeout=(5, self.read_timeout),
+                                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+        self._responses[index] = response
+        try:
+            if response.status_code != 200:
+                raise Exception(f"HTTP错误: {response.status_code}")
+            self._count('connections')
+
+            # 增量消息只带位置序号，不一定带代码：序号 -> 代码
+            index_codes = dict(enumerate(codes))
+            received = 0
+            for data in iter_sse_data(_iter_lines(response)):
+                if self._stop.is_set():
+                    break
+                received += 1
+                self._count('messages')
+                # 单条消息格式错误时跳过，不影响同一连接上的后续推送
+                try:
+                    changed = self._apply_message(json.loads(data), index_codes, codes)
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._count('errors')
+                    self.last_error = e
+                    continue
+                if changed:
+                    self._count('updates', len(changed))
+                    if self.on_update:
+                        self.on_update(changed)
+            return received
+        finally:
+            self._responses.pop(index, None)
+            response.close()
+
+    def _apply_message(self, payload: Dict, index_codes: Dict[int, str], codes: List[str]) -> List[str]:
+        """将一条推送合并到行情表，返回有变化的代码"""
+        if payload.get('full'):
+            index_codes.clear()
+            index_codes.update(enumerate(codes))
+
+        diff = (payload.get('data') or {}).get('diff') or {}
+        items = diff.items() if isinstance(diff, dict) else enumerate(diff)
+
+        changed = []
+        for key, item in items:
+            position = int(key)
+            if item.get('f12'):
+                index_codes[position] = item['f12']
+            code = index_codes.get(position)
+            if code and self.table.apply(code, item):
+                changed.append(code)
+        return changed
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            return {**self.stats, 'groups': len(self.groups), 'quotes': len(self.table)}
@@ -0,0 +1,176 @@
+"""
+行情订阅（轮询）
+按固定间隔批量获取一组股票的行情，与上一次快照比较，
+只把发生变化的股票交给回调，下游处理量随市场活跃度而不是股票数量增长
+"""
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .stock_api import StockAPIClient, normalize_stock_code
+    from .quote_models import QuoteBatch
+    from .trading_session import beijing_now, is_market_active, wait_until_active
+except ImportError:
+    from stock_api import StockAPIClient, normalize_stock_code
+    from quote_models import QuoteBatch
+    from trading_session import beijing_now, is_market_active, wait_until_active
+
+
+# 默认比较的字段：任一字段变化即视为有新成交
+DEFAULT_DIFF_FIELDS = ('current_price', 'volume', 'amount', 'buy1_price', 'sell1_price')
+
+
+def diff_batches(previous: Optional[QuoteBatch], current: QuoteBatch,
+                 fields: Tuple[str, ...] = DEFAULT_DIFF_FIELDS) -> np.ndarray:
+    """
+    比较两次快照，返回 current 中发生变化的行（布尔掩码）
+
+    上一次快照中没有的股票视为变化
+    """
+    if previous is None or len(previous) == 0:
+        return np.ones(len(current), dtype=bool)
+
+    rows = previous.rows(current.codes)
+    known = rows >= 0
+    changed = ~known
+    for field in fields:
+        before = previous.column(field)[np.where(known, rows, 0)]
+        changed |= known & (current.column(field) != before)
+    return changed
+
+
+class QuoteSubscription:
+    """
+    行情订阅
+
+    示例:
+        sub = QuoteSubscription(codes, interval=3)
+        sub.subscribe(lambda changed: print(changed.codes))
+        sub.start()
+        ...
+        sub.stop()
+    """
+
+    def __init__(self,
+                 codes: Iterable[str],
+                 callback: Optional[Callable[[QuoteBatch], None]] = None,
+                 interval: float = 3.0,
+                 client: Optional[StockAPIClient] = None,
+                 batch_size: int = 100,
+                 diff_fields: Tuple[str, ...] = DEFAULT_DIFF_FIELDS,
+                 session_aware: bool = True,
+                 now_func: Callable[[], datetime] = beijing_now):
+        """
+        参数:
+            codes: 订阅的股票代码
+            callback: 回调函数，参数为只包含变化股票的 QuoteBatch
+            interval: 轮询间隔（秒）
+            client: 行情客户端，默认新建 StockAPIClient
+            batch_size: 每次请求的股票数量
+            diff_fields: 判断变化时比较的字段
+            session_aware: 休市期间（午休、收盘后、节假日）不轮询，休眠到下一个活跃阶段
+            now_func: 返回当前北京时间
+        """
+        self.codes = list(dict.fromkeys(normalize_stock_code(code) for code in codes))
+        self.interval = interval
+        self.client = client or StockAPIClient()
+        self.batch_size = batch_size
+        self.diff_fields = tuple(diff_fields)
+        self.session_aware = session_aware
+        self.now_func = now_func
+        self.callbacks: List[Callable[[QuoteBatch], None]] = [callback] if callback else []
+        self.snapshot: Optional[QuoteBatch] = None
+        self.stats = {'polls': 0, 'changed': 0, 'errors': 0}
+        self.last_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[QuoteBatch], None]):
+        """添加回调"""
+        self.callbacks.append(callback)
+
+    def add_codes(self, codes: Iterable[str]):
+        """增加订阅的股票（下一次轮询生效）"""
+        with self._lock:
+            self.codes = list(dict.fromkeys(self.codes + [normalize_stock_code(c) for c in codes]))
+
+    def remove_codes(self, codes: Iterable[str]):
+        """取消订阅的股票（下一次轮询生效）"""
+        removed = {normalize_stock_code(c) for c in codes}
+        with self._lock:
+            self.codes = [code for code in self.codes if code not in removed]
+
+    def fetch(self) -> QuoteBatch:
+        """批量获取当前行情"""
+        with self._lock:
+            codes = list(self.codes)
+        array = self.client.get_stock_prices_array(codes, batch_size=self.batch_size)
+        return QuoteBatch.from_array(array, source='tencent')
+
+    def poll_once(self) -> QuoteBatch:
+        """
+        轮询一次：获取行情、与上一次快照比较，有变化时调用回调
+
+        返回:
+            只包含变化股票的 QuoteBatch（首次轮询包含全部股票）
+        """
+        current = self.fetch()
+        changed = current.select(diff_batches(self.snapshot, current, self.diff_fields))
+        self.snapshot = current
+        self.stats['polls'] += 1
+        self.stats['changed'] += len(changed)
+
+        if len(changed):
+            for callback in self.callbacks:
+                callback(changed)
+        return changed
+
+    def run(self, max_polls: Optional[int] = None):
+        """在当前线程中轮询，直到 stop() 被调用或达到 max_polls 次"""
+        polls = 0
+        while not self._stop.is_set():
+            # 休市期间行情不变：已有快照时直接休眠到下一个活跃阶段
+            if self.session_aware and self.snapshot is not None and not is_market_active(self.now_func()):
+                wait_until_active(self.now_func, self._stop)
+                continue
+
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.last_error = e
+                print(f"行情订阅轮询失败: {e}")
+
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """在后台线程中开始轮询"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='quote-subscription', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止轮询"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'codes': len(self.codes)}
@@ -0,0 +1,144 @@
+"""
+按主机限速（令牌桶）
+所有客户端共享同一组令牌桶：请求前先取令牌，只有额度用完时才需要等待，
+取代原来各处固定的 time.sleep()。同时支持多线程和 asyncio。
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# 各主机的默认额度：(每秒令牌数, 桶容量)
+DEFAULT_LIMITS = {
+    'push2.eastmoney.com': (10.0, 10),     # 东方财富实时行情、列表
+    'push2his.eastmoney.com': (5.0, 5),    # 东方财富历史K线
+    'qt.gtimg.cn': (20.0, 20),             # 腾讯行情
+    'hq.sinajs.cn': (10.0, 10),            # 新浪行情
+    'akshare': (1.0, 3),                   # AKShare（内部访问东方财富历史接口）
+}
+
+# 未配置主机的默认额度
+FALLBACK_LIMIT = (10.0, 10)
+
+
+class TokenBucket:
+    """令牌桶（线程安全）"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        """
+        参数:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数）
+            clock: 单调时钟
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        预留令牌，返回需要等待的秒数（0表示可立即发送）
+
+        令牌不足时直接记为欠额，后来者排在其后，保证总体速率不超过额度
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            self.acquired += 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens: float = 1) -> float:
+        """阻塞直到取得令牌，返回实际等待秒数"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """协程版本，等待期间不阻塞事件循环"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict:
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'acquired': self.acquired,
+            'waited': round(self.waited, 3),
+        }
+
+
+def host_key(url_or_host: str) -> str:
+    """
+    提取限速用的主机名
+
+    80.push2.eastmoney.com 这类带数字前缀的镜像与 push2.eastmoney.com 共用额度
+    """
+    host = urlparse(url_or_host).hostname if '://' in url_or_host else url_or_host
+    host = (host or url_or_host).lower()
+    labels = host.split('.')
+    while len(labels) > 2 and labels[0].isdigit():
+        labels = labels[1:]
+    return '.'.join(labels)
+
+
+class RateLimiter:
+    """按主机管理令牌桶"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url_or_host: str) -> TokenBucket:
+        """获取主机对应的令牌桶"""
+        key = host_key(url_or_host)
+        with self._lock:
+            if key not in self._buckets:
+                rate, capacity = self.limits.get(key, FALLBACK_LIMIT)
+                self._buckets[key] = TokenBucket(rate, capacity)
+            return self._buckets[key]
+
+    def set_limit(self, host: str, rate: float, capacity: float):
+        """调整某个主机的额度"""
+        key = host_key(host)
+        with self._lock:
+            self.limits[key] = (rate, capacity)
+            self._buckets[key] = TokenBucket(rate, capacity)
+
+    def acquire(self, url_or_host: str, tokens: float = 1) -> float:
+        """请求前调用，阻塞直到该主机有可用额度"""
+        return self.bucket(url_or_host).acquire(tokens)
+
+    async def acquire_async(self, url_or_host: str, tokens: float = 1) -> float:
+        """协程版本"""
+        return await self.bucket(url_or_host).acquire_async(tokens)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: bucket.stats() for host, bucket in self._buckets.items()}
+
+
+# 全局实例
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取全局限速器实例"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
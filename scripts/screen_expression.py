@@ -0,0 +1,314 @@
+"""
+筛选表达式
+用简单的表达式描述筛选条件，例如:
+    change_percent > 3 and turnover_rate >= 5 and MA5 > MA20
+
+表达式只解析一次，按可用字段做类型检查，编译为对整列计算的 NumPy 掩码，
+可直接作为 StockScanner.scan_market 的 mask_func，也可用于历史K线 DataFrame
+
+支持的语法:
+- 字段名、数字、字符串常量、True/False
+- 算术: + - * / %，一元负号
+- 比较: > >= < <= == !=，可连写（3 < change_percent < 8）
+- 成员: industry in ('银行', '保险')、not in
+- 逻辑: and or not
+- 函数: abs(x)、min(x, y, ...)、max(x, y, ...)
+"""
+import ast
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+# 字段/表达式类型
+NUMBER = 'number'
+STRING = 'string'
+BOOL = 'bool'
+
+
+class ExpressionError(Exception):
+    """表达式语法错误或类型错误"""
+    pass
+
+
+_COMPARE_OPS = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_ARITH_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Mod: np.mod,
+}
+
+_FUNCTIONS = {
+    'abs': (1, 1, np.abs),
+    'min': (2, None, np.minimum),
+    'max': (2, None, np.maximum),
+}
+
+
+def _value_type(value) -> str:
+    if isinstance(value, (bool, np.bool_)):
+        return BOOL
+    if isinstance(value, (int, float, np.number)):
+        return NUMBER
+    if isinstance(value, str):
+        return STRING
+    raise ExpressionError(f"不支持的常量: {value!r}")
+
+
+def column_types(columns: Mapping[str, Any]) -> Dict[str, str]:
+    """
+    推断各字段的类型
+
+    参数:
+        columns: 列式结构 {字段: 数组} 或 DataFrame
+
+    对象数组（含 None 的数值列，如尚未计算出的均线）按第一个非空值判断
+    """
+    types = {}
+    for name in columns.keys():
+        values = np.asarray(columns[name])
+        kind = values.dtype.kind
+        if kind == 'b':
+            types[name] = BOOL
+        elif kind in 'iuf':
+            types[name] = NUMBER
+        elif kind in 'US':
+            types[name] = STRING
+        else:
+            sample = next((v for v in values.tolist() if v is not None), None)
+            types[name] = STRING if isinstance(sample, str) else NUMBER
+    return types
+
+
+def _row_count(columns: Mapping[str, Any]) -> int:
+    for name in columns.keys():
+        return len(columns[name])
+    return 0
+
+
+class ScreenExpression:
+    """
+    编译后的筛选表达式
+
+    示例:
+        expr = ScreenExpression('change_percent > 3 and turnover > 1e8')
+        mask = expr(columns)                       # 布尔数组
+        scanner.scan_market(mask_func=expr)
+    """
+
+    def __init__(self, source: str):
+        """
+        参数:
+            source: 表达式文本
+
+        异常:
+            ExpressionError: 语法错误或使用了不支持的写法
+        """
+        self.source = source.strip()
+        try:
+            self.tree = ast.parse(self.source, mode='eval').body
+        except SyntaxError as e:
+            raise ExpressionError(f"表达式语法错误: {self.source} ({e.msg})")
+        # 函数名（abs、min、max）不是字段
+        functions = {id(node.func) for node in ast.walk(self.tree) if isinstance(node, ast.Call)}
+        self.fields = frozenset(node.id for node in ast.walk(self.tree)
+                                if isinstance(node, ast.Name) and id(node) not in functions
+                                and node.id not in ('True', 'False'))
+        self._compiled = {}  # 字段类型 -> 掩码函数
+
+    def check(self, types: Mapping[str, str]):
+        """
+        按字段类型检查表达式，结果必须为布尔值
+
+        异常:
+            ExpressionError: 字段不存在或类型不匹配
+        """
+        result = self._check(self.tree, types)
+        if result != BOOL:
+            raise ExpressionError(f"表达式结果不是条件判断: {self.source}")
+
+    def compile(self, types: Mapping[str, str]) -> Callable[[Mapping[str, Any]], np.ndarray]:
+        """类型检查并编译为掩码函数（相同字段类型只编译一次）"""
+        key = tuple(sorted((name, types[name]) for name in self.fields if name in types))
+        fn = self._compiled.get(key)
+        if fn is None:
+            self.check(types)
+            fn = self._build(self.tree, types)
+            self._compiled[key] = fn
+        return fn
+
+    def __call__(self, columns: Mapping[str, Any]) -> np.ndarray:
+        """对列式结构（或 DataFrame）计算掩码"""
+        types = column_types({name: columns[name] for name in self.fields if name in columns})
+        fn = self.compile(types)
+        mask = np.asarray(fn(columns), dtype=bool)
+        return np.broadcast_to(mask, (_row_count(columns),)) if mask.ndim == 0 else mask
+
+    def __repr__(self) -> str:
+        return f"ScreenExpression({self.source!r})"
+
+    # ---- 类型检查 ----
+
+    def _check(self, node, types: Mapping[str, str]) -> str:
+        if isinstance(node, ast.Constant):
+            return _value_type(node.value)
+
+        if isinstance(node, ast.Name):
+            if node.id not in types:
+                raise ExpressionError(f"未知字段: {node.id}（可用字段: {', '.join(sorted(types))}）")
+            return types[node.id]
+
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                if self._check(value, types) != BOOL:
+                    raise ExpressionError(f"and/or 两侧必须是条件: {ast.unparse(value)}")
+            return BOOL
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._check(node.operand, types)
+            if isinstance(node.op, ast.Not):
+                if operand != BOOL:
+                    raise ExpressionError(f"not 后必须是条件: {ast.unparse(node.operand)}")
+                return BOOL
+            if isinstance(node.op, (ast.USub, ast.UAdd)) and operand == NUMBER:
+                return NUMBER
+            raise ExpressionError(f"不支持的运算: {ast.unparse(node)}")
+
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _ARITH_OPS:
+                raise ExpressionError(f"不支持的运算: {ast.unparse(node)}")
+            if self._check(node.left, types) != NUMBER or self._check(node.right, types) != NUMBER:
+                raise ExpressionError(f"算术运算只能用于数值字段: {ast.unparse(node)}")
+            return NUMBER
+
+        if isinstance(node, ast.Compare):
+            left = self._check(node.left, types)
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    for item in self._members(comparator):
+                        if _value_type(item) != left:
+                            raise ExpressionError(f"类型不匹配: {ast.unparse(node)}")
+                    continue
+                if type(op) not in _COMPARE_OPS:
+                    raise ExpressionError(f"不支持的比较: {ast.unparse(node)}")
+                right = self._check(comparator, types)
+                if left != right:
+                    raise ExpressionError(f"类型不匹配: {ast.unparse(node)}")
+                if left == STRING and not isinstance(op, (ast.Eq, ast.NotEq)):
+                    raise ExpressionError(f"字符串字段只能比较是否相等: {ast.unparse(node)}")
+                left = right
+            return BOOL
+
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if name not in _FUNCTIONS or node.keywords:
+                raise ExpressionError(f"不支持的函数: {ast.unparse(node.func)}")
+            low, high, _ = _FUNCTIONS[name]
+            if len(node.args) < low or (high is not None and len(node.args) > high):
+                raise ExpressionError(f"参数个数错误: {ast.unparse(node)}")
+            for arg in node.args:
+                if self._check(arg, types) != NUMBER:
+                    raise ExpressionError(f"{name} 的参数必须是数值: {ast.unparse(node)}")
+            return NUMBER
+
+        raise ExpressionError(f"不支持的写法: {ast.unparse(node)}")
+
+    @staticmethod
+    def _members(node) -> Tuple:
+        if not isinstance(node, (ast.Tuple, ast.List, ast.Set)) or \
+                not all(isinstance(e, ast.Constant) for e in node.elts):
+            raise ExpressionError(f"in 后必须是常量列表: {ast.unparse(node)}")
+        return tuple(e.value for e in node.elts)
+
+    # ---- 编译 ----
+
+    def _build(self, node, types: Mapping[str, str]) -> Callable:
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda c: value
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if types[name] == NUMBER:
+                return lambda c: np.asarray(c[name], dtype=float)
+            return lambda c: np.asarray(c[name])
+
+        if isinstance(node, ast.BoolOp):
+            parts = [self._build(value, types) for value in node.values]
+            reduce = np.logical_and.reduce if isinstance(node.op, ast.And) else np.logical_or.reduce
+            return lambda c: reduce(np.broadcast_arrays(*[part(c) for part in parts]))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._build(node.operand, types)
+            if isinstance(node.op, ast.Not):
+                return lambda c: np.logical_not(operand(c))
+            if isinstance(node.op, ast.USub):
+                return lambda c: np.negative(operand(c))
+            return operand
+
+        if isinstance(node, ast.BinOp):
+            op = _ARITH_OPS[type(node.op)]
+            left, right = self._build(node.left, types), self._build(node.right, types)
+            return lambda c: op(left(c), right(c))
+
+        if isinstance(node, ast.Compare):
+            steps = []
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    members = list(self._members(comparator))
+                    invert = isinstance(op, ast.NotIn)
+                    steps.append((lambda a, b, m=members, inv=invert: np.isin(a, m, invert=inv), None))
+                else:
+                    steps.append((_COMPARE_OPS[type(op)], self._build(comparator, types)))
+            first = self._build(node.left, types)
+
+            def compare(c):
+                left = first(c)
+                result = None
+                for op, right_fn in steps:
+                    right = right_fn(c) if right_fn is not None else None
+                    part = op(left, right)
+                    result = part if result is None else np.logical_and(result, part)
+                    left = right
+                return result
+            return compare
+
+        # 函数调用（已通过类型检查）
+        _, _, fn = _FUNCTIONS[node.func.id]
+        args = [self._build(arg, types) for arg in node.args]
+        if len(args) == 1:
+            return lambda c: fn(args[0](c))
+
+        def call(c):
+            result = args[0](c)
+            for arg in args[1:]:
+                result = fn(result, arg(c))
+            return result
+        return call
+
+
+def compile_screen(source: str, types: Optional[Mapping[str, str]] = None) -> ScreenExpression:
+    """
+    解析筛选表达式；给出字段类型时立即做类型检查
+
+    参数:
+        source: 表达式文本
+        types: {字段: 类型}，可由 column_types(columns) 得到
+
+    异常:
+        ExpressionError: 语法错误、字段不存在或类型不匹配
+    """
+    expression = ScreenExpression(source)
+    if types is not None:
+        expression.compile(types)
+    return expression
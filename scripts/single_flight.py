@@ -0,0 +1,96 @@
+"""
+请求合并（single-flight）
+同一时刻对同一个键（接口、代码、参数）的多次调用只发出一次上游请求，
+其余调用等待并共享结果（或异常）
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def _share(result: Any) -> Any:
+    """返回结果副本，避免等待方之间互相修改（dict、DataFrame 等支持 copy()）"""
+    copy = getattr(result, 'copy', None)
+    return copy() if callable(copy) else result
+
+
+class SingleFlight:
+    """请求合并器（线程安全）"""
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+        self.executed = 0   # 实际发出的上游请求数
+        self.shared = 0     # 通过合并节省的请求数
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行调用；若相同键的调用正在进行，则等待其结果
+
+        参数:
+            key: 合并键，如 ('em_detail', '601318')
+            fn: 实际发起请求的函数
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        try:
+            call.result = fn()
+            return _share(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """当前进行中的上游调用数"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict:
+        """合并统计"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+            }
+
+
+# 全局实例
+_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局请求合并器实例"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
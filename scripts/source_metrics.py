@@ -0,0 +1,96 @@
+"""
+数据源延迟统计
+按数据源记录请求耗时直方图，用于估算 p50/p95 等分位数
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional
+
+
+def _default_bounds() -> List[float]:
+    """桶上界（秒）：1ms 到约 16s，按 2^(1/4) 等比增长"""
+    bounds = []
+    value = 0.001
+    while value < 16:
+        bounds.append(round(value, 6))
+        value *= 2 ** 0.25
+    return bounds
+
+
+class LatencyHistogram:
+    """请求耗时直方图（线程安全）"""
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = bounds or _default_bounds()
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._total = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """记录一次请求耗时"""
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._total += 1
+            self._sum += seconds
+
+    @property
+    def count(self) -> int:
+        return self._total
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        估算分位数（秒），返回所在桶的上界；没有样本时返回None
+
+        参数:
+            p: 分位，如 0.95
+        """
+        with self._lock:
+            if self._total == 0:
+                return None
+            target = p * self._total
+            cumulative = 0
+            for index, count in enumerate(self._counts):
+                cumulative += count
+                if cumulative >= target and count:
+                    return self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+            return self.bounds[-1]
+
+    def snapshot(self) -> Dict:
+        """统计摘要"""
+        with self._lock:
+            total, latency_sum = self._total, self._sum
+        return {
+            'count': total,
+            'mean': latency_sum / total if total else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.bounds) + 1)
+            self._total = 0
+            self._sum = 0.0
+
+
+# 全局实例 {source: LatencyHistogram}
+_latency_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(source: str) -> LatencyHistogram:
+    """获取数据源的全局延迟直方图"""
+    with _histograms_lock:
+        if source not in _latency_histograms:
+            _latency_histograms[source] = LatencyHistogram()
+        return _latency_histograms[source]
+
+
+def get_latency_stats() -> Dict[str, Dict]:
+    """所有数据源的延迟摘要"""
+    with _histograms_lock:
+        sources = list(_latency_histograms.items())
+    return {source: histogram.snapshot() for source, histogram in sources}
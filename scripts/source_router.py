@@ -0,0 +1,261 @@
+"""
+数据源路由与熔断
+按数据源统计最近一段时间的错误率和耗时，数据源劣化时打开熔断器，
+请求直接转到健康的同类数据源，不再每次等满超时；
+冷却期过后放行单个探测请求（半开状态），成功则恢复，失败则延长冷却期
+
+网络错误、超时、非200状态码、接口返回错误码等都计入错误率；
+只有格式正常的“代码不存在”响应应抛出 DataError，它说明数据源工作正常，不计入错误，也不再换数据源重试
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+
+# 熔断器状态
+CLOSED = 'closed'         # 正常
+OPEN = 'open'             # 熔断中，不发送请求
+HALF_OPEN = 'half_open'   # 冷却期已过，等待探测请求的结果
+
+
+class SourceUnavailableError(Exception):
+    """数据源熔断中，或所有候选数据源均请求失败"""
+    pass
+
+
+class DataError(Exception):
+    """数据源正常响应但没有所需数据（代码不存在、无数据等），不计入数据源的错误率"""
+    pass
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器（线程安全）"""
+
+    def __init__(self,
+                 window: int = 20,
+                 min_samples: int = 5,
+                 error_threshold: float = 0.5,
+                 slow_threshold: float = 3.0,
+                 cooldown: float = 30.0,
+                 max_cooldown: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        参数:
+            window: 统计最近多少次请求
+            min_samples: 样本数达到该值才判断是否劣化
+            error_threshold: 错误率达到该值时熔断
+            slow_threshold: 成功请求的平均耗时（秒）达到该值时熔断，None表示不按耗时熔断
+            cooldown: 熔断后多久放行探测请求（秒）
+            max_cooldown: 探测连续失败时冷却期翻倍的上限（秒）
+            clock: 单调时钟
+        """
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.slow_threshold = slow_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self._outcomes = deque(maxlen=window)  # (是否成功, 耗时)
+        self._cooldown = cooldown
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def _mean_latency(self) -> float:
+        latencies = [latency for ok, latency in self._outcomes if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def _degraded(self) -> bool:
+        if len(self._outcomes) < self.min_samples:
+            return False
+        if self._error_rate() >= self.error_threshold:
+            return True
+        return self.slow_threshold is not None and self._mean_latency() >= self.slow_threshold
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self.opened_count += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self._cooldown = self.base_cooldown
+        self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """是否可以发送请求；半开状态下同一时间只放行一个探测请求"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self._cooldown:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def available(self) -> bool:
+        """是否可用（只查看状态，不占用探测名额）"""
+        with self._lock:
+            if self.state == OPEN:
+                return self.clock() - self._opened_at >= self._cooldown
+            return not (self.state == HALF_OPEN and self._probing)
+
+    def record(self, ok: bool, latency: float):
+        """记录一次请求结果"""
+        with self._lock:
+            self._outcomes.append((ok, latency))
+            self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self._close()
+                else:
+                    self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                    self._open()
+            elif self.state == CLOSED and self._degraded():
+                self._open()
+
+    def score(self) -> float:
+        """健康分（0~1）：成功率越高、耗时越短分数越高；熔断中为0"""
+        with self._lock:
+            if self.state == OPEN:
+                return 0.0
+            return (1 - self._error_rate()) / (1 + self._mean_latency())
+
+    def snapshot(self) -> Dict:
+        """状态摘要（用于监控）"""
+        score = self.score()
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self._cooldown - (self.clock() - self._opened_at))
+            return {
+                'state': self.state,
+                'score': round(score, 3),
+                'samples': len(self._outcomes),
+                'error_rate': round(self._error_rate(), 3),
+                'mean_latency': round(self._mean_latency(), 3),
+                'consecutive_failures': self.consecutive_failures,
+                'opened_count': self.opened_count,
+                'retry_in': round(retry_in, 1),
+            }
+
+
+class SourceRouter:
+    """按健康状况在同类数据源之间路由请求"""
+
+    def __init__(self, **breaker_options):
+        """
+        参数:
+            breaker_options: 传给每个 CircuitBreaker 的参数（window、cooldown 等）
+        """
+        self.breaker_options = breaker_options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, source: str) -> CircuitBreaker:
+        """获取数据源对应的熔断器"""
+        with self._lock:
+            if source not in self._breakers:
+                self._breakers[source] = CircuitBreaker(**self.breaker_options)
+            return self._breakers[source]
+
+    def available(self, source: str) -> bool:
+        return self.breaker(source).available()
+
+    def order(self, sources: List[str]) -> List[str]:
+        """
+        请求顺序：首选数据源可用时排第一，其余按健康分从高到低，熔断中的排最后
+        """
+        preferred = sources[0]
+        others = sorted(sources[1:], key=lambda s: -self.breaker(s).score())
+        ordered = [preferred] + others
+        return ([s for s in ordered if self.available(s)] +
+                [s for s in ordered if not self.available(s)])
+
+    def call(self, source: str, fn: Callable[[], Any]) -> Any:
+        """
+        通过熔断器调用单个数据源，记录结果和耗时
+
+        fn 抛出 DataError 时按正常响应记录（数据源可用，只是没有数据），异常原样抛出
+
+        异常:
+            SourceUnavailableError: 数据源熔断中
+            DataError: 数据源没有所需数据
+        """
+        breaker = self.breaker(source)
+        if not breaker.allow():
+            raise SourceUnavailableError(f"{source}: 熔断中")
+
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except DataError:
+            breaker.record(True, time.perf_counter() - start)
+            raise
+        except Exception:
+            breaker.record(False, time.perf_counter() - start)
+            raise
+        breaker.record(True, time.perf_counter() - start)
+        return result
+
+    def route(self, sources: List[str], fetch: Callable[[str], Any]) -> Any:
+        """
+        依次尝试同类数据源，返回第一个成功的结果
+
+        参数:
+            sources: 同类数据源，第一个为首选
+            fetch: fetch(source) 请求指定数据源
+
+        异常:
+            SourceUnavailableError: 所有数据源都熔断或失败（包含各数据源的错误信息）
+            DataError: 数据源没有所需数据（其他同类数据源同样不会有，不再尝试）
+        """
+        errors = []
+        for source in self.order(sources):
+            try:
+                return self.call(source, lambda: fetch(source))
+            except DataError:
+                raise
+            except SourceUnavailableError as e:
+                errors.append(str(e))
+            except Exception as e:
+                errors.append(f"{source}: {e}")
+        raise SourceUnavailableError('; '.join(errors))
+
+    def status(self) -> Dict[str, Dict]:
+        """所有数据源的状态（用于监控）"""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {source: breaker.snapshot() for source, breaker in breakers}
+
+    def reset(self):
+        """清除所有数据源的统计和熔断状态"""
+        with self._lock:
+            self._breakers.clear()
+
+
+# 全局实例
+_source_router = None
+
+
+def get_source_router() -> SourceRouter:
+    """获取全局数据源路由实例"""
+    global _source_router
+    if _source_router is None:
+        _source_router = SourceRouter()
+    return _source_router
@@ -4,26 +4,157 @@ A股行情API客户端
 """
 import requests
 import json
+import re
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime
 import time
 
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from .quote_cache import QuoteCache, get_quote_cache
+    from .source_metrics import get_latency_histogram
+    from .single_flight import get_single_flight
+    from .rate_limiter import get_rate_limiter
+    from .source_router import DataError, SourceRouter, SourceUnavailableError, get_source_router
+except ImportError:
+    from quote_cache import QuoteCache, get_quote_cache
+    from source_metrics import get_latency_histogram
+    from single_flight import get_single_flight
+    from rate_limiter import get_rate_limiter
+    from source_router import DataError, SourceRouter, SourceUnavailableError, get_source_router
+
 
 class StockAPIError(Exception):
     """股票API异常"""
     pass
 
 
+class StockDataError(StockAPIError, DataError):
+    """数据源没有该股票的数据（代码不存在等），不计入数据源的错误率"""
+    pass
+
+
+# 腾讯批量行情的单行格式: v_sh600000="...";
+_TENCENT_LINE_RE = re.compile(r'v_((?:sh|sz)\d{6})="([^"]*)"')
+
+# 新浪批量行情的单行格式: var hq_str_sh600000="...";
+_SINA_LINE_RE = re.compile(r'hq_str_((?:sh|sz)\d{6})="([^"]*)"')
+
+# 新浪接口要求带 Referer，否则返回 403
+SINA_HEADERS = {'Referer': 'https://finance.sina.com.cn/'}
+
+
+def _check_status(response):
+    """非200响应（新浪缺少 Referer 时的403、5xx等）视为数据源故障，计入错误率并换数据源"""
+    if response.status_code != 200:
+        raise StockAPIError(f"HTTP错误: {response.status_code}")
+    return response
+
+
+def normalize_stock_code(stock_code: str) -> str:
+    """标准化股票代码：去掉 sh/sz 前缀和点号"""
+    return stock_code.replace('sh', '').replace('sz', '').replace('.', '')
+
+
+def _market_prefix(stock_code: str) -> str:
+    """根据代码判断市场前缀（6开头为沪市，其余为深市）"""
+    return 'sh' if stock_code.startswith('6') else 'sz'
+
+
+def _parse_tencent_fields(stock_code: str, fields: List[str]) -> Dict:
+    """将腾讯行情的 ~ 分隔字段解析为行情字典"""
+    return {
+        'stock_code': stock_code,
+        'stock_name': fields[1],
+        'current_price': float(fields[3]) if fields[3] else 0,
+        'yesterday_close': float(fields[4]) if fields[4] else 0,
+        'open_price': float(fields[5]) if fields[5] else 0,
+        'volume': int(float(fields[6])) if fields[6] else 0,  # 成交量（手）
+        'turnover': float(fields[37]) if fields[37] else 0,   # 成交额
+        'high_price': float(fields[33]) if fields[33] else 0,
+        'low_price': float(fields[34]) if fields[34] else 0,
+        'buy1_price': float(fields[9]) if fields[9] else 0,
+        'sell1_price': float(fields[19]) if fields[19] else 0,
+        'date': fields[30],
+        'time': fields[31],
+        'change_percent': ((float(fields[3]) - float(fields[4])) / float(fields[4]) * 100) if fields[3] and fields[4] else 0
+    }
+
+
+def _parse_sina_fields(stock_code: str, fields: List[str]) -> Dict:
+    """将新浪行情的逗号分隔字段解析为行情字典（成交额换算为万元，与腾讯的字典单位相同）"""
+    return {
+        'stock_code': stock_code,
+        'stock_name': fields[0],
+        'open_price': float(fields[1]) if fields[1] else 0,
+        'yesterday_close': float(fields[2]) if fields[2] else 0,
+        'current_price': float(fields[3]) if fields[3] else 0,
+        'high_price': float(fields[4]) if fields[4] else 0,
+        'low_price': float(fields[5]) if fields[5] else 0,
+        'buy1_price': float(fields[6]) if fields[6] else 0,
+        'sell1_price': float(fields[7]) if fields[7] else 0,
+        'volume': int(float(fields[8])) if fields[8] else 0,  # 成交量
+        'turnover': float(fields[9]) / 10000 if fields[9] else 0,  # 成交额（元转万元，与腾讯一致）
+        'date': fields[30] if len(fields) > 30 else '',
+        'time': fields[31] if len(fields) > 31 else '',
+        'change_percent': ((float(fields[3]) - float(fields[2])) / float(fields[2]) * 100) if fields[3] and fields[2] else 0
+    }
+
+
 class StockAPIClient:
     """A股行情API客户端"""
 
-    def __init__(self, timeout: int = 5):
+    # 对冲请求的备用数据源
+    HEDGE_PARTNER = {'tencent': 'sina', 'sina': 'tencent'}
+
+    # 可互相替代的实时行情数据源（首选数据源熔断时自动切换）
+    QUOTE_SOURCES = ('tencent', 'sina')
+
+    # 对冲请求线程池大小（主请求和备用请求各一个线程池）
+    HEDGE_WORKERS = 8
+
+    def __init__(self,
+                 timeout: int = 5,
+                 cache: Optional[QuoteCache] = None,
+                 use_cache: bool = True,
+                 hedge_delay: Optional[float] = None,
+                 hedge_percentile: float = 0.95,
+                 router: Optional[SourceRouter] = None):
+        """
+        初始化
+        timeout: 请求超时（秒）
+        cache: 行情缓存，默认使用全局共享缓存
+        use_cache: 是否启用行情缓存
+        hedge_delay: 对冲请求的等待时间（秒），None表示按主数据源的延迟分位数自动计算
+        hedge_percentile: 自动计算对冲等待时间时使用的分位数
+        router: 数据源路由（熔断），默认使用全局共享实例
+        """
         self.timeout = timeout
+        self.cache = (cache or get_quote_cache()) if use_cache else None
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'secondary_wins': 0}
+        self._hedge_lock = threading.Lock()  # 保护 hedge_stats 和对冲线程池的创建
+        # 主请求与备用请求使用各自的线程池：主数据源挂起占满线程时，备用请求不会排在其后
+        self._executors = None  # (主请求线程池, 备用请求线程池)
+        self.flight = get_single_flight()
+        self.limiter = get_rate_limiter()
+        self.router = router or get_source_router()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
 
+    def _timed_get(self, source: str, url: str, **kwargs):
+        """发送请求并记录该数据源的耗时"""
+        self.limiter.acquire(url)
+        start = time.perf_counter()
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        get_latency_histogram(source).record(time.perf_counter() - start)
+        return response
+
     def get_stock_price_tencent(self, stock_code: str) -> Dict:
         """
         使用腾讯API获取股票实时行情
@@ -31,108 +162,321 @@ class StockAPIClient:
         返回格式化的股票信息字典
         """
         # 腾讯API格式：sh600000 或 sz000001
-        if stock_code.startswith('6'):
-            market = 'sh'
-        else:
-            market = 'sz'
-
-        url = f"http://qt.gtimg.cn/q={market}{stock_code}"
+        url = f"http://qt.gtimg.cn/q={_market_prefix(stock_code)}{stock_code}"
         try:
-            response = self.session.get(url, timeout=self.timeout)
+            response = self._timed_get('tencent', url)
+            _check_status(response)
             response.encoding = 'gbk'
 
             # 腾讯返回格式: v_sh600000="1~平安银行~..."
             content = response.text
+            # 代码不存在时返回 v_pv_none_match="1";
+            if 'v_pv_none_match' in content:
+                raise StockDataError(f"股票代码不存在: {stock_code}")
             if '~' not in content:
                 raise StockAPIError(f"无法解析股票数据: {stock_code}")
 
             # 解析返回数据
             data_str = content.split('"')[1]
             fields = data_str.split('~')
+            if len(fields) < 38:
+                raise StockAPIError(f"无法解析股票数据: {stock_code}")
 
-            result = {
-                'stock_code': stock_code,
-                'stock_name': fields[1],
-                'current_price': float(fields[3]) if fields[3] else 0,
-                'yesterday_close': float(fields[4]) if fields[4] else 0,
-                'open_price': float(fields[5]) if fields[5] else 0,
-                'volume': int(float(fields[6])) if fields[6] else 0,  # 成交量（手）
-                'turnover': float(fields[37]) if fields[37] else 0,   # 成交额
-                'high_price': float(fields[33]) if fields[33] else 0,
-                'low_price': float(fields[34]) if fields[34] else 0,
-                'buy1_price': float(fields[9]) if fields[9] else 0,
-                'sell1_price': float(fields[19]) if fields[19] else 0,
-                'date': fields[30],
-                'time': fields[31],
-                'change_percent': ((float(fields[3]) - float(fields[4])) / float(fields[4]) * 100) if fields[3] and fields[4] else 0
-            }
-
-            return result
+            return _parse_tencent_fields(stock_code, fields)
 
+        except DataError:
+            raise
         except Exception as e:
             raise StockAPIError(f"获取股票行情失败: {str(e)}")
 
+    def get_stock_prices(self, stock_codes: List[str], batch_size: int = 100) -> Dict[str, Dict]:
+        """
+        批量获取股票实时行情（腾讯API，一次请求查询多只股票）
+
+        参数:
+            stock_codes: 股票代码列表
+            batch_size: 每次请求的股票数量（控制URL长度）
+
+        返回:
+            {stock_code: 行情字典}，顺序与输入一致；无数据的代码不会出现在结果中
+        """
+        codes = list(dict.fromkeys(normalize_stock_code(code) for code in stock_codes))
+        results = {}
+
+        # 先从缓存读取，只请求未命中的代码
+        missing = codes
+        if self.cache is not None:
+            missing = []
+            for code in codes:
+                cached = self.cache.get(('tencent', code))
+                if cached is None:
+                    missing.append(code)
+                else:
+                    results[code] = cached
+
+        fetchers = {'tencent': self._fetch_batch_tencent, 'sina': self._fetch_batch_sina}
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            try:
+                quotes = self.router.route(list(self.QUOTE_SOURCES), lambda source: fetchers[source](chunk))
+            except SourceUnavailableError as e:
+                raise StockAPIError(f"批量获取股票行情失败: {str(e)}")
+
+            for code, quote in quotes.items():
+                results[code] = quote
+                if self.cache is not None:
+                    self.cache.set(('tencent', code), quote)
+
+        return {code: results[code] for code in codes if code in results}
+
+    def _fetch_batch_tencent(self, codes: List[str]) -> Dict[str, Dict]:
+        """一次请求腾讯批量行情"""
+        symbols = ','.join(f"{_market_prefix(code)}{code}" for code in codes)
+        url = f"http://qt.gtimg.cn/q={symbols}"
+        self.limiter.acquire(url)
+        response = self.session.get(url, timeout=self.timeout)
+        _check_status(response)
+        response.encoding = 'gbk'
+
+        # 每行一只股票: v_sh600000="1~浦发银行~600000~...";
+        quotes = {}
+        for symbol, data_str in _TENCENT_LINE_RE.findall(response.text):
+            fields = data_str.split('~')
+            if len(fields) < 38:
+                continue
+            try:
+                quotes[symbol[2:]] = _parse_tencent_fields(symbol[2:], fields)
+            except ValueError:
+                continue
+        return quotes
+
+    def _fetch_batch_sina(self, codes: List[str]) -> Dict[str, Dict]:
+        """一次请求新浪批量行情（腾讯不可用时的替代数据源）"""
+        symbols = ','.join(f"{_market_prefix(code)}{code}" for code in codes)
+        url = f"http://hq.sinajs.cn/list={symbols}"
+        self.limiter.acquire(url)
+        response = self.session.get(url, timeout=self.timeout, headers=SINA_HEADERS)
+        _check_status(response)
+        response.encoding = 'gbk'
+
+        # 每行一只股票: var hq_str_sh600000="浦发银行,...";
+        quotes = {}
+        for symbol, data_str in _SINA_LINE_RE.findall(response.text):
+            fields = data_str.split(',')
+            if len(fields) < 32:
+                continue
+            try:
+                quotes[symbol[2:]] = _parse_sina_fields(symbol[2:], fields)
+            except ValueError:
+                continue
+        return quotes
+
+    def get_stock_prices_array(self, stock_codes: List[str], batch_size: int = 100):
+        """
+        批量获取实时行情，返回 NumPy 结构化数组（适合全市场轮询）
+
+        与 get_stock_prices 请求方式相同，但跳过逐字段 float() 和逐股字典构造，
+        列定义见 quote_parser.QUOTE_DTYPE；成交额（turnover）统一为万元，与数据源无关
+        """
+        import numpy as np
+        try:
+            from .quote_parser import parse_tencent_batch, parse_sina_batch
+        except ImportError:
+            from quote_parser import parse_tencent_batch, parse_sina_batch
+
+        codes = list(dict.fromkeys(normalize_stock_code(code) for code in stock_codes))
+        arrays = []
+
+        def fetch(source: str, chunk: List[str]):
+            symbols = ','.join(f"{_market_prefix(code)}{code}" for code in chunk)
+            if source == 'tencent':
+                url = f"http://qt.gtimg.cn/q={symbols}"
+                self.limiter.acquire(url)
+                return parse_tencent_batch(_check_status(self.session.get(url, timeout=self.timeout)).content)
+            url = f"http://hq.sinajs.cn/list={symbols}"
+            self.limiter.acquire(url)
+            response = self.session.get(url, timeout=self.timeout, headers=SINA_HEADERS)
+            return parse_sina_batch(_check_status(response).content)
+
+        for start in range(0, len(codes), batch_size):
+            chunk = codes[start:start + batch_size]
+            try:
+                arrays.append(self.router.route(list(self.QUOTE_SOURCES), lambda source: fetch(source, chunk)))
+            except SourceUnavailableError as e:
+                raise StockAPIError(f"批量获取股票行情失败: {str(e)}")
+
+        return np.concatenate(arrays) if arrays else parse_tencent_batch(b'')
+
     def get_stock_price_sina(self, stock_code: str) -> Dict:
         """
         使用新浪API获取股票实时行情
         stock_code: 股票代码，如 'sh600000' 或 'sz000001'
         """
         # 新浪API格式：sh600000 或 sz000001
-        if stock_code.startswith('6'):
-            symbol = f'sh{stock_code}'
-        else:
-            symbol = f'sz{stock_code}'
+        symbol = f'{_market_prefix(stock_code)}{stock_code}'
 
         url = f"http://hq.sinajs.cn/list={symbol}"
         try:
-            response = self.session.get(url, timeout=self.timeout)
+            response = self._timed_get('sina', url, headers=SINA_HEADERS)
+            _check_status(response)
             response.encoding = 'gbk'
 
             content = response.text
-            if '=' not in content:
+            if '=' not in content or '"' not in content:
                 raise StockAPIError(f"无法解析股票数据: {stock_code}")
 
-            # 解析返回数据
+            # 解析返回数据；代码不存在时返回空字符串
             data_str = content.split('"')[1]
+            if not data_str:
+                raise StockDataError(f"股票代码不存在: {stock_code}")
             fields = data_str.split(',')
+            if len(fields) < 32:
+                raise StockAPIError(f"无法解析股票数据: {stock_code}")
 
-            result = {
-                'stock_code': stock_code,
-                'stock_name': fields[0],
-                'open_price': float(fields[1]) if fields[1] else 0,
-                'yesterday_close': float(fields[2]) if fields[2] else 0,
-                'current_price': float(fields[3]) if fields[3] else 0,
-                'high_price': float(fields[4]) if fields[4] else 0,
-                'low_price': float(fields[5]) if fields[5] else 0,
-                'buy1_price': float(fields[6]) if fields[6] else 0,
-                'sell1_price': float(fields[7]) if fields[7] else 0,
-                'volume': int(float(fields[8])) if fields[8] else 0,  # 成交量
-                'turnover': float(fields[9]) if fields[9] else 0,      # 成交额
-                'date': fields[30] if len(fields) > 30 else '',
-                'time': fields[31] if len(fields) > 31 else '',
-                'change_percent': ((float(fields[3]) - float(fields[2])) / float(fields[2]) * 100) if fields[3] and fields[2] else 0
-            }
-
-            return result
+            return _parse_sina_fields(stock_code, fields)
 
+        except DataError:
+            raise
         except Exception as e:
             raise StockAPIError(f"获取股票行情失败: {str(e)}")
 
-    def get_stock_price(self, stock_code: str, source: str = 'tencent') -> Dict:
+    def get_stock_price(self, stock_code: str, source: str = 'tencent', hedge: bool = False) -> Dict:
         """
         获取股票实时行情（自动选择数据源）
         stock_code: 股票代码
         source: 数据源 'tencent' 或 'sina'
+        hedge: 是否启用对冲请求（主数据源响应慢时同时请求备用数据源）
         """
         # 标准化股票代码
-        stock_code = stock_code.replace('sh', '').replace('sz', '').replace('.', '')
+        stock_code = normalize_stock_code(stock_code)
 
-        if source == 'tencent':
-            return self.get_stock_price_tencent(stock_code)
-        elif source == 'sina':
-            return self.get_stock_price_sina(stock_code)
-        else:
+        if source not in self.QUOTE_SOURCES:
             raise StockAPIError(f"不支持的数据源: {source}")
+        if hedge:
+            fetch = lambda code: self.get_stock_price_hedged(code, primary=source)
+        else:
+            fetch = lambda code: self.get_stock_price_routed(code, preferred=source)
+
+        # 同一代码的并发请求只发出一次
+        key = ('quote', source, stock_code, hedge)
+        fetch_once = lambda: self.flight.do(key, lambda: fetch(stock_code))
+
+        if self.cache is None:
+            return fetch_once()
+        return self.cache.get_or_fetch((source, stock_code), fetch_once)
+
+    def _quote_fetchers(self) -> Dict:
+        return {'tencent': self.get_stock_price_tencent, 'sina': self.get_stock_price_sina}
+
+    def get_stock_price_routed(self, stock_code: str, preferred: str = 'tencent') -> Dict:
+        """
+        经数据源路由获取实时行情
+
+        首选数据源正常时只请求首选数据源；其熔断或请求失败时，
+        按健康分依次尝试其他同类数据源
+
+        参数:
+            stock_code: 股票代码
+            preferred: 首选数据源 'tencent' 或 'sina'
+        """
+        stock_code = normalize_stock_code(stock_code)
+        fetchers = self._quote_fetchers()
+        sources = [preferred] + [s for s in self.QUOTE_SOURCES if s != preferred]
+        try:
+            return self.router.route(sources, lambda source: fetchers[source](stock_code))
+        except SourceUnavailableError as e:
+            raise StockAPIError(f"获取股票行情失败: {str(e)}")
+
+    def get_source_status(self) -> Dict[str, Dict]:
+        """各数据源的健康状态（熔断状态、错误率、平均耗时等）"""
+        return self.router.status()
+
+    def get_hedge_delay(self, source: str) -> float:
+        """
+        对冲等待时间（秒）
+        未指定 hedge_delay 时取该数据源历史耗时的分位数（默认p95），样本不足时使用0.5秒
+        """
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+
+        histogram = get_latency_histogram(source)
+        delay = histogram.percentile(self.hedge_percentile) if histogram.count >= 20 else None
+        if delay is None:
+            delay = 0.5
+        return min(max(delay, 0.05), self.timeout)
+
+    def _count_hedge(self, key: str):
+        with self._hedge_lock:
+            self.hedge_stats[key] += 1
+
+    def get_stock_price_hedged(self, stock_code: str, primary: str = 'tencent') -> Dict:
+        """
+        对冲请求获取实时行情
+
+        先请求主数据源；若在对冲等待时间内没有返回（或已失败），再同时请求备用数据源。
+        先返回有效结果的一方胜出，另一方的请求被取消或结果被丢弃。
+        熔断中的数据源视为已失败，直接请求另一方。
+
+        参数:
+            stock_code: 股票代码
+            primary: 主数据源 'tencent' 或 'sina'
+        """
+        stock_code = normalize_stock_code(stock_code)
+        secondary = self.HEDGE_PARTNER.get(primary)
+        if secondary is None:
+            raise StockAPIError(f"不支持的数据源: {primary}")
+
+        fetchers = self._quote_fetchers()
+        with self._hedge_lock:
+            if self._executors is None:
+                self._executors = (
+                    ThreadPoolExecutor(max_workers=self.HEDGE_WORKERS, thread_name_prefix='hedge-primary'),
+                    ThreadPoolExecutor(max_workers=self.HEDGE_WORKERS, thread_name_prefix='hedge-secondary'),
+                )
+        primary_pool, secondary_pool = self._executors
+
+        def submit(pool: ThreadPoolExecutor, source: str):
+            return pool.submit(self.router.call, source, lambda: fetchers[source](stock_code))
+
+        self._count_hedge('requests')
+        pending = {submit(primary_pool, primary): primary}
+        done, _ = wait(pending, timeout=self.get_hedge_delay(primary))
+
+        hedged = False
+        errors = []
+        while True:
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    result = future.result()
+                except DataError:
+                    # 没有该股票的数据，备用数据源同样不会有
+                    for loser in pending:
+                        loser.cancel()
+                    raise
+                except StockAPIError as e:
+                    errors.append(f"{source}: {e}")
+                    continue
+                except SourceUnavailableError as e:
+                    errors.append(str(e))
+                    continue
+
+                for loser in pending:
+                    loser.cancel()
+                if source == secondary:
+                    self._count_hedge('secondary_wins')
+                return result
+
+            # 主数据源超过等待时间未返回或已失败，发出备用请求
+            if not hedged:
+                hedged = True
+                self._count_hedge('hedged')
+                pending[submit(secondary_pool, secondary)] = secondary
+
+            if not pending:
+                raise StockAPIError(f"获取股票行情失败: {'; '.join(errors)}")
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
 
     def format_stock_info(self, stock_data: Dict) -> str:
         """格式化股票信息为易读文本"""
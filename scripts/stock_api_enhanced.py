@@ -2,14 +2,179 @@
 增强版股票API客户端 - 支持换手率等更多数据
 """
 import requests
-from typing import Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+try:
+    from .quote_cache import QuoteCache, get_quote_cache
+    from .single_flight import get_single_flight
+    from .rate_limiter import get_rate_limiter
+    from .source_router import DataError, SourceRouter, SourceUnavailableError, get_source_router
+    from .stock_api import _TENCENT_LINE_RE, _market_prefix, _parse_tencent_fields
+except ImportError:
+    from quote_cache import QuoteCache, get_quote_cache
+    from single_flight import get_single_flight
+    from rate_limiter import get_rate_limiter
+    from source_router import DataError, SourceRouter, SourceUnavailableError, get_source_router
+    from stock_api import _TENCENT_LINE_RE, _market_prefix, _parse_tencent_fields
+
+
+# stock/get 接口字段（单只股票详情）
+DETAIL_FIELDS = 'f43,f44,f45,f46,f47,f48,f49,f50,f57,f58,f60,f107,f116,f117,f127,f168'
+
+# ulist/clist 列表接口使用另一套字段编号，这里映射到 stock/get 的同义字段
+_ULIST_TO_DETAIL = {
+    'f2': 'f43',     # 最新价
+    'f15': 'f44',    # 最高价
+    'f16': 'f45',    # 最低价
+    'f17': 'f46',    # 开盘价
+    'f5': 'f47',     # 成交量（手）
+    'f6': 'f48',     # 成交额（元）
+    'f10': 'f50',    # 量比
+    'f12': 'f57',    # 代码
+    'f14': 'f58',    # 名称
+    'f18': 'f60',    # 昨收
+    'f124': 'f107',  # 时间戳
+    'f20': 'f116',   # 总市值
+    'f21': 'f117',   # 流通市值
+    'f100': 'f127',  # 行业
+    'f8': 'f168',    # 换手率
+}
+ULIST_DETAIL_FIELDS = ','.join(_ULIST_TO_DETAIL)
+
+
+def _secid(stock_code: str) -> str:
+    """东方财富 secid：1. 表示沪市，0. 表示深市"""
+    return f'1.{stock_code}' if stock_code.startswith('6') else f'0.{stock_code}'
+
+
+def _check_response(response) -> Dict:
+    """
+    检查东方财富响应并返回 JSON
+
+    非200状态码和 rc 不为0（如 ut 被拒绝时的 {"rc":102,"data":null}）视为数据源故障，
+    计入错误率并换数据源；rc 为0但没有数据才是代码不存在
+    """
+    if response.status_code != 200:
+        raise Exception(f"HTTP错误: {response.status_code}")
+    data = response.json()
+    if data.get('rc', 0) != 0:
+        raise Exception(f"接口返回错误: rc={data.get('rc')}")
+    return data
+
+
+def _ulist_to_detail_fields(item: Dict) -> Dict:
+    """将列表接口的一条记录转换为 stock/get 字段（停牌股票的 '-' 按0处理）"""
+    d = {}
+    for list_field, detail_field in _ULIST_TO_DETAIL.items():
+        value = item.get(list_field)
+        if value == '-':
+            value = 0
+        d[detail_field] = value
+    return d
+
+
+def _parse_detail_em(stock_code: str, d: Dict) -> Dict:
+    """将东方财富 stock/get 字段解析为详细数据字典"""
+    # 解析字段（东方财富字段说明）
+    current = (d.get('f43') or 0) / 100  # 最新价（分转元）
+    yesterday = d.get('f60', 0) / 100 if d.get('f60') else 0  # f60是昨收价（分转元）
+
+    # 如果f60没有，尝试用f49
+    if yesterday == 0:
+        yesterday = (d.get('f49') or 0) / 100
+
+    result = {
+        'stock_code': stock_code,
+        'stock_name': d.get('f58') or '',
+        'current_price': current,
+        'open_price': (d.get('f46') or 0) / 100,    # 开盘价（分转元）
+        'yesterday_close': yesterday,             # 昨收（分转元）
+        'high_price': (d.get('f44') or 0) / 100,     # 最高价（分转元）
+        'low_price': (d.get('f45') or 0) / 100,      # 最低价（分转元）
+        'volume': d.get('f47') or 0,                 # 成交量（手）
+        'turnover_amount': d.get('f48') or 0,        # 成交额（元）
+        'change_percent': ((current - yesterday) / yesterday * 100) if yesterday > 0 else 0,
+        'total_market_cap': d.get('f116') or 0,      # 总市值（元）
+        'circulating_market_cap': d.get('f117') or 0,  # 流通市值（元）
+        'turnover_rate': (d.get('f168') or 0) / 100,  # 换手率（需要除以100）
+        'industry': d.get('f127') or '',             # 行业
+        'timestamp': d.get('f107') or 0,             # 时间戳
+    }
+
+    # 计算涨跌额
+    result['change_amount'] = current - yesterday
+
+    return result
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_tencent_detail(stock_code: str, fields: List[str]) -> Dict:
+    """
+    将腾讯行情字段解析为与 _parse_detail_em 相同的结构（东方财富不可用时的替代）
+
+    腾讯行情没有行业字段，industry 为空字符串
+    """
+    quote = _parse_tencent_fields(stock_code, fields)
+    try:
+        timestamp = int(datetime.strptime(fields[30], '%Y%m%d%H%M%S')
+                        .replace(tzinfo=timezone(timedelta(hours=8))).timestamp())
+    except ValueError:
+        timestamp = 0
+
+    return {
+        'stock_code': stock_code,
+        'stock_name': quote['stock_name'],
+        'current_price': quote['current_price'],
+        'open_price': quote['open_price'],
+        'yesterday_close': quote['yesterday_close'],
+        'high_price': quote['high_price'],
+        'low_price': quote['low_price'],
+        'volume': quote['volume'],
+        'turnover_amount': quote['turnover'] * 10000,               # 成交额（万元转元）
+        'change_percent': quote['change_percent'],
+        'total_market_cap': _to_float(fields[45]) * 100000000,      # 总市值（亿元转元）
+        'circulating_market_cap': _to_float(fields[44]) * 100000000,  # 流通市值（亿元转元）
+        'turnover_rate': _to_float(fields[38]),                     # 换手率（%）
+        'industry': '',
+        'timestamp': timestamp,
+        'change_amount': quote['current_price'] - quote['yesterday_close'],
+    }
 
 
 class EnhancedStockAPI:
     """增强版API - 支持换手率、市值等更多字段"""
 
-    def __init__(self, timeout: int = 5):
+    # 可互相替代的详情数据源：东方财富 stock/get、东方财富 ulist、腾讯（无行业）
+    DETAIL_SOURCES = ('em_detail', 'em_ulist', 'tencent')
+    # 批量详情的数据源
+    BATCH_DETAIL_SOURCES = ('em_ulist', 'tencent')
+
+    def __init__(self,
+                 timeout: int = 5,
+                 cache: Optional[QuoteCache] = None,
+                 use_cache: bool = True,
+                 router: Optional[SourceRouter] = None):
+        """
+        初始化
+
+        参数:
+            timeout: 请求超时（秒）
+            cache: 行情缓存，默认使用全局共享缓存
+            use_cache: 是否启用行情缓存
+            router: 数据源路由（熔断），默认使用全局共享实例
+        """
         self.timeout = timeout
+        self.cache = (cache or get_quote_cache()) if use_cache else None
+        self.flight = get_single_flight()
+        self.limiter = get_rate_limiter()
+        self.router = router or get_source_router()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -24,67 +189,152 @@ class EnhancedStockAPI:
 
         返回:
             包含换手率等详细数据的字典
+
+        东方财富 stock/get 熔断或失败时，依次改用 ulist 接口和腾讯行情
         """
-        # 确定市场前缀
-        if stock_code.startswith('6'):
-            secid = f'1.{stock_code}'  # 1. 表示沪市
-        else:
-            secid = f'0.{stock_code}'  # 0. 表示深市
+        # 同一代码的并发请求只发出一次
+        fetch_once = lambda: self.flight.do(('em_detail', stock_code),
+                                            lambda: self._route_detail(stock_code))
+
+        if self.cache is None:
+            return fetch_once()
+        return self.cache.get_or_fetch(('em_detail', stock_code), fetch_once)
 
+    def _route_detail(self, stock_code: str) -> Dict:
+        """经数据源路由获取单只股票详情"""
+        def fetch(source: str) -> Dict:
+            if source == 'em_detail':
+                return self._fetch_stock_detail_em(stock_code)
+            batch = self._batch_fetchers()[source]([stock_code])
+            if stock_code not in batch:
+                raise DataError("获取股票详情失败: 未获取到数据")
+            return batch[stock_code]
+
+        try:
+            return self.router.route(list(self.DETAIL_SOURCES), fetch)
+        except SourceUnavailableError as e:
+            raise Exception(f"获取股票详情失败: {str(e)}")
+
+    def _fetch_stock_detail_em(self, stock_code: str) -> Dict:
+        """请求东方财富 stock/get 接口"""
         url = 'http://push2.eastmoney.com/api/qt/stock/get'
         params = {
-            'secid': secid,
-            'fields': 'f43,f44,f45,f46,f47,f48,f49,f50,f57,f58,f60,f107,f116,f117,f127,f168',
+            'secid': _secid(stock_code),
+            'fields': DETAIL_FIELDS,
             'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
         }
 
         try:
+            self.limiter.acquire(url)
             response = self.session.get(url, params=params, timeout=self.timeout)
 
-            if response.status_code != 200:
-                raise Exception(f"HTTP错误: {response.status_code}")
-
-            data = response.json()
+            data = _check_response(response)
 
+            # 代码不存在时返回 {"rc":0,"data":null}
             if not data.get('data'):
-                raise Exception("未获取到数据")
-
-            d = data['data']
-
-            # 解析字段（东方财富字段说明）
-            current = d.get('f43', 0) / 100  # 最新价（分转元）
-            yesterday = d.get('f60', 0) / 100 if d.get('f60') else 0  # f60是昨收价（分转元）
-
-            # 如果f60没有，尝试用f49
-            if yesterday == 0:
-                yesterday = d.get('f49', 0) / 100
-
-            result = {
-                'stock_code': stock_code,
-                'stock_name': d.get('f58', ''),
-                'current_price': current,
-                'open_price': d.get('f46', 0) / 100,    # 开盘价（分转元）
-                'yesterday_close': yesterday,         # 昨收（分转元）
-                'high_price': d.get('f44', 0) / 100,     # 最高价（分转元）
-                'low_price': d.get('f45', 0) / 100,      # 最低价（分转元）
-                'volume': d.get('f47', 0),                # 成交量（手）
-                'turnover_amount': d.get('f48', 0),       # 成交额（元）
-                'change_percent': ((current - yesterday) / yesterday * 100) if yesterday > 0 else 0,
-                'total_market_cap': d.get('f116', 0),    # 总市值（元）
-                'circulating_market_cap': d.get('f117', 0),  # 流通市值（元）
-                'turnover_rate': d.get('f168', 0) / 100,  # 换手率（需要除以100）
-                'industry': d.get('f127', ''),            # 行业
-                'timestamp': d.get('f107', 0),            # 时间戳
-            }
-
-            # 计算涨跌额
-            result['change_amount'] = current - yesterday
-
-            return result
+                raise DataError("获取股票详情失败: 未获取到数据")
+
+            return _parse_detail_em(stock_code, data['data'])
 
+        except DataError:
+            raise
         except Exception as e:
             raise Exception(f"获取股票详情失败: {str(e)}")
 
+    def get_stock_details_em(self, stock_codes: List[str], batch_size: int = 100) -> Dict[str, Dict]:
+        """
+        批量获取详细数据（东方财富 ulist 接口，一次请求查询多只股票）
+
+        参数:
+            stock_codes: 股票代码列表
+            batch_size: 每次请求的股票数量
+
+        返回:
+            {stock_code: 详细数据字典}，字段与 get_stock_detail_em 一致；
+            顺序与输入一致，无数据的代码不会出现在结果中
+
+        ulist 接口熔断或失败时改用腾讯批量行情（行业字段为空）
+        """
+        codes = list(dict.fromkeys(stock_codes))
+        results = {}
+
+        # 先从缓存读取，只请求未命中的代码
+        missing = codes
+        if self.cache is not None:
+            missing = []
+            for code in codes:
+                cached = self.cache.get(('em_detail', code))
+                if cached is None:
+                    missing.append(code)
+                else:
+                    results[code] = cached
+
+        fetchers = self._batch_fetchers()
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            try:
+                details = self.router.route(list(self.BATCH_DETAIL_SOURCES),
+                                            lambda source: fetchers[source](chunk))
+            except SourceUnavailableError as e:
+                raise Exception(f"批量获取股票详情失败: {str(e)}")
+
+            for code, detail in details.items():
+                results[code] = detail
+                if self.cache is not None:
+                    self.cache.set(('em_detail', code), detail)
+
+        return {code: results[code] for code in codes if code in results}
+
+    def _batch_fetchers(self) -> Dict:
+        return {'em_ulist': self._fetch_details_ulist, 'tencent': self._fetch_details_tencent}
+
+    def _fetch_details_ulist(self, codes: List[str]) -> Dict[str, Dict]:
+        """一次请求东方财富 ulist 接口"""
+        url = 'http://push2.eastmoney.com/api/qt/ulist.np/get'
+        params = {
+            'secids': ','.join(_secid(code) for code in codes),
+            'fields': ULIST_DETAIL_FIELDS,
+            'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
+        }
+
+        self.limiter.acquire(url)
+        response = self.session.get(url, params=params, timeout=self.timeout)
+
+        data = _check_response(response)
+        diff = (data.get('data') or {}).get('diff') or []
+        if isinstance(diff, dict):
+            diff = list(diff.values())
+
+        details = {}
+        for item in diff:
+            code = item.get('f12', '')
+            if code:
+                details[code] = _parse_detail_em(code, _ulist_to_detail_fields(item))
+        return details
+
+    def _fetch_details_tencent(self, codes: List[str]) -> Dict[str, Dict]:
+        """一次请求腾讯批量行情，转换为详情结构"""
+        symbols = ','.join(f"{_market_prefix(code)}{code}" for code in codes)
+        url = f"http://qt.gtimg.cn/q={symbols}"
+        self.limiter.acquire(url)
+        response = self.session.get(url, timeout=self.timeout)
+        response.encoding = 'gbk'
+
+        details = {}
+        for symbol, data_str in _TENCENT_LINE_RE.findall(response.text):
+            fields = data_str.split('~')
+            if len(fields) < 46:
+                continue
+            try:
+                details[symbol[2:]] = _parse_tencent_detail(symbol[2:], fields)
+            except ValueError:
+                continue
+        return details
+
+    def get_source_status(self) -> Dict[str, Dict]:
+        """各数据源的健康状态（熔断状态、错误率、平均耗时等）"""
+        return self.router.status()
+
     def format_enhanced_info(self, stock_data: Dict) -> str:
         """格式化增强版股票信息"""
         if not stock_data:
@@ -3,16 +3,71 @@ MA均线数据获取模块
 使用AKShare获取历史数据并计算MA
 """
 import pandas as pd
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Hashable, Optional, List
+
+try:
+    from .single_flight import get_single_flight
+    from .rate_limiter import get_rate_limiter
+    from .trading_session import beijing_now, is_market_active, next_active_time
+except ImportError:
+    from single_flight import get_single_flight
+    from rate_limiter import get_rate_limiter
+    from trading_session import beijing_now, is_market_active, next_active_time
+
+
+class HistoryCache:
+    """历史K线的LRU缓存（线程安全），每条记录带有效期（北京时间），与 QuoteCache 一样超出容量时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size: int = 1000):
+        """
+        参数:
+            max_size: 最大缓存条数
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (有效期至, DataFrame)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, now: datetime) -> Optional[pd.DataFrame]:
+        """读取缓存，未命中或已过期返回None（返回副本）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry[0]:
+                if entry is not None:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1].copy()
+
+    def set(self, key: Hashable, df: pd.DataFrame, expires_at: datetime):
+        """写入缓存（保存副本）"""
+        with self._lock:
+            self._entries[key] = (expires_at, df.copy())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
 
 
 class MADataAPI:
     """MA均线数据API"""
 
-    def __init__(self):
+    def __init__(self, history_cache_size: int = 1000):
+        """
+        参数:
+            history_cache_size: 休市期间缓存的历史K线最大条数
+        """
         self.akshare = None
+        self.flight = get_single_flight()
+        self.limiter = get_rate_limiter()
+        self.now_func = beijing_now
+        self._history_cache = HistoryCache(history_cache_size)  # (symbol, days) -> DataFrame
         self._init_akshare()
 
     def _init_akshare(self):
@@ -33,6 +88,9 @@ class MADataAPI:
         """
         获取股票历史数据（带重试机制）
 
+        同一股票、同一参数的并发调用只发出一次请求，结果共享；
+        休市期间日K线不会变化，结果保留到下一个活跃阶段
+
         参数:
             symbol: 股票代码（如 '601318' 或 '000001'）
             days: 获取最近多少天的数据
@@ -41,13 +99,28 @@ class MADataAPI:
         返回:
             DataFrame with columns: 日期, 开盘, 收盘, 最高, 最低, 成交量, etc.
         """
+        now = self.now_func()
+        cached = self._history_cache.get((symbol, days), now)
+        if cached is not None:
+            return cached
+
+        df = self.flight.do(('history', symbol, days),
+                            lambda: self._fetch_stock_history(symbol, days, max_retries))
+        if df is not None and not is_market_active(now):
+            self._history_cache.set((symbol, days), df, next_active_time(now))
+        return df
+
+    def _fetch_stock_history(self, symbol: str, days: int, max_retries: int) -> Optional[pd.DataFrame]:
+        """通过AKShare获取历史数据并计算MA"""
         for attempt in range(max_retries):
             try:
                 # 计算日期范围
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+                today = self.now_func()
+                end_date = today.strftime('%Y%m%d')
+                start_date = (today - timedelta(days=days)).strftime('%Y%m%d')
 
-                # 获取历史数据
+                # 获取历史数据（与其他调用方共享AKShare的请求额度）
+                self.limiter.acquire('akshare')
                 df = self.akshare.stock_zh_a_hist(
                     symbol=symbol,
                     period="daily",
@@ -133,13 +206,15 @@ class MADataAPI:
             'date': latest['date'],
         }
 
-    def batch_get_ma(self, symbols: List[str], delay: float = 1.0) -> Dict[str, Dict]:
+    def batch_get_ma(self, symbols: List[str], delay: Optional[float] = None) -> Dict[str, Dict]:
         """
         批量获取MA数据
 
+        请求频率由全局限速器控制，只有额度用完时才会等待
+
         参数:
             symbols: 股票代码列表
-            delay: 请求延迟（秒）
+            delay: 每只股票之间额外的固定间隔（秒），默认不额外等待
 
         返回:
             {symbol: ma_data}
@@ -157,8 +232,8 @@ class MADataAPI:
             else:
                 print(f"    ✗ 获取失败")
 
-            # 避免请求过快
-            time.sleep(delay)
+            if delay:
+                time.sleep(delay)
 
         return results
 
@@ -171,7 +246,10 @@ class MADataAPI:
         返回:
             完整的股票数据字典（包含MA）
         """
-        from stock_api_enhanced import EnhancedStockAPI
+        try:
+            from .stock_api_enhanced import EnhancedStockAPI
+        except ImportError:
+            from stock_api_enhanced import EnhancedStockAPI
 
         # 获取实时数据
         realtime_api = EnhancedStockAPI()
@@ -256,7 +334,7 @@ if __name__ == '__main__':
     # 测试3: 批量获取
     print("\n【测试3】批量获取MA数据")
     symbols = ['601318', '600519', '000001', '002594']
-    results = api.batch_get_ma(symbols, delay=1.0)
+    results = api.batch_get_ma(symbols)
 
     print(f"\n成功获取 {len(results)} 只股票的MA数据")
     for symbol, data in results.items():
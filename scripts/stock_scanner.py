@@ -2,292 +2,978 @@
 全市场股票扫描器
 支持获取A股完整列表并批量筛选
 """
+import ast
 import requests
-import time
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from typing import List, Dict, Callable, Optional
+from collections import deque
+from datetime import datetime
+from functools import partial
+from typing import Any, List, Dict, Callable, Iterable, Iterator, Optional, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
+
+try:
+    from .rate_limiter import get_rate_limiter
+    from .trading_session import beijing_now, is_market_active, next_active_time
+    from .universe_cache import UniverseCache, get_universe_cache
+    from .screen_expression import ScreenExpression
+    from .market_snapshot import MarketSnapshot, stocks_to_columns, columns_to_stocks
+    from .stock_api_enhanced import ULIST_DETAIL_FIELDS, _parse_detail_em, _ulist_to_detail_fields
+except ImportError:
+    from rate_limiter import get_rate_limiter
+    from trading_session import beijing_now, is_market_active, next_active_time
+    from universe_cache import UniverseCache, get_universe_cache
+    from screen_expression import ScreenExpression
+    from market_snapshot import MarketSnapshot, stocks_to_columns, columns_to_stocks
+    from stock_api_enhanced import ULIST_DETAIL_FIELDS, _parse_detail_em, _ulist_to_detail_fields
+
+
+CLIST_URL = 'http://80.push2.eastmoney.com/api/qt/clist/get'
+
+# A股市场代码
+# m:0+t:6 - 深市主板
+# m:0+t:80 - 深市中小板
+# m:0+t:81 - 深市创业板
+# m:1+t:2 - 沪市主板
+# m:1+t:23 - 沪市科创板
+A_SHARE_FS = 'm:0+t:6,m:0+t:80,m:0+t:81,m:1+t:2,m:1+t:23'
+
+# 列表默认字段：代码、市场、名称、最新价、涨跌幅、涨跌额、成交量、成交额
+CLIST_FIELDS = 'f12,f13,f14,f2,f3,f4,f5,f6'
+
+# 可按需附加的字段：股票字典字段 -> (clist 字段, 换算除数；None 表示文本)
+# 筛选条件/战法声明需要的字段后，只在一次 clist 请求中多取这些列，不必再逐只获取详情
+CLIST_EXTRA_FIELDS = {
+    'amplitude': ('f7', 100),                 # 振幅（%）
+    'turnover_rate': ('f8', 100),             # 换手率（%）
+    'volume_ratio': ('f10', 100),             # 量比
+    'high_price': ('f15', 100),
+    'low_price': ('f16', 100),
+    'open_price': ('f17', 100),
+    'yesterday_close': ('f18', 100),
+    'total_market_cap': ('f20', 1),           # 总市值（元）
+    'circulating_market_cap': ('f21', 1),     # 流通市值（元）
+    'industry': ('f100', None),
+    'timestamp': ('f124', 1),                 # 行情时间（Unix时间戳，秒）
+    # 与 get_stock_detail_em 同名的字段，供按详情字段编写的战法使用
+    'stock_code': ('f12', None),
+    'stock_name': ('f14', None),
+    'current_price': ('f2', 100),
+    'turnover_amount': ('f6', 1),
+}
+
+# full 模式的字段：clist 与 ulist 字段编号相同，一页即可得到100只股票的完整详情
+CLIST_DETAIL_FIELDS = ULIST_DETAIL_FIELDS
+
+# 可作为 clist 排序键（fid）的字段：股票字典字段 -> clist 字段
+CLIST_SORT_FIELDS = {
+    'current': 'f2',
+    'change_percent': 'f3',
+    'change_amount': 'f4',
+    'volume': 'f5',
+    'turnover': 'f6',
+    'amplitude': 'f7',
+    'turnover_rate': 'f8',
+    'volume_ratio': 'f10',
+    'total_market_cap': 'f20',
+    'circulating_market_cap': 'f21',
+}
+
+# 排行榜字段（本地由快照计算）
+RANKING_FIELDS = ('turnover', 'change_percent', 'amplitude', 'volume', 'turnover_rate')
+
+# 盘中快照超过该秒数视为过期
+SNAPSHOT_MAX_AGE = 60.0
+
+# 增量扫描时判断股票行情是否变化的字段
+RESCAN_CHANGE_FIELDS = ('current', 'volume', 'timestamp')
+
+# 全市场列表快照的名称
+UNIVERSE_SNAPSHOT = 'a_share_universe'
+
+# 单页最多返回的条数（pz 超过该值时接口仍只返回100条）
+CLIST_PAGE_SIZE = 100
+
+
+def clist_params(page: int, page_size: int = CLIST_PAGE_SIZE, fid: str = 'f62',
+                 fields: str = CLIST_FIELDS, po: str = '1') -> Dict:
+    """
+    clist 接口请求参数
+
+    不传 fltt，价格、涨跌幅等按整数返回（×100），由 _parse_clist_item 换算
+    """
+    return {
+        'pn': str(page),
+        'pz': str(page_size),
+        'po': po,
+        'np': '1',
+        'invt': '2',
+        'fid': fid,
+        'fs': A_SHARE_FS,
+        'fields': fields,
+        'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
+    }
+
+
+def _clist_number(item: Dict, key: str):
+    """停牌股票的字段为 '-'，按0处理"""
+    value = item.get(key)
+    return 0 if value in (None, '-') else value
+
+
+def extra_fields(fields: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    需要附加请求的字段（按名称排序，去重）
+
+    默认字段和 clist 不提供的字段（如 MA5 等指标）会被忽略
+    """
+    return tuple(sorted({field for field in fields or () if field in CLIST_EXTRA_FIELDS}))
+
+
+def declared_fields(*screens) -> Tuple[str, ...]:
+    """
+    筛选条件声明需要的字段
+
+    ScreenExpression 的 fields 为表达式中的字段；普通函数可设置 fields 属性声明，
+    战法模块通过 STRATEGY_FIELDS 声明（StrategyManager 加载时设置为 screen 函数的 fields 属性）
+    """
+    fields = set()
+    for screen in screens:
+        fields.update(getattr(screen, 'fields', None) or ())
+    return tuple(sorted(fields))
+
+
+def clist_fields_for(fields: Optional[Iterable[str]]) -> str:
+    """
+    按需要的字段生成 clist 的 fields 参数（默认字段 + 附加字段）
+
+    示例:
+        clist_fields_for(['open_price', 'turnover_rate'])  # 'f12,...,f6,f17,f8'
+    """
+    codes = CLIST_FIELDS.split(',')
+    for field in extra_fields(fields):
+        code = CLIST_EXTRA_FIELDS[field][0]
+        if code not in codes:
+            codes.append(code)
+    return ','.join(codes)
+
+
+def _parse_clist_item(item: Dict, extra: Tuple[str, ...] = ()) -> Dict:
+    """将 clist 接口的一条记录解析为股票字典（extra 为附加字段）"""
+    stock = {
+        'code': item.get('f12', ''),
+        'name': item.get('f14', ''),
+        'market': item.get('f13', ''),
+        'current': _clist_number(item, 'f2') / 100,
+        'change_percent': _clist_number(item, 'f3') / 100,
+        'change_amount': _clist_number(item, 'f4') / 100,
+        'volume': _clist_number(item, 'f5'),
+        'turnover': _clist_number(item, 'f6'),
+    }
+    for field in extra:
+        code, scale = CLIST_EXTRA_FIELDS[field]
+        if scale is None:
+            value = item.get(code)
+            stock[field] = '' if value in (None, '-') else value
+        else:
+            stock[field] = _clist_number(item, code) / scale if scale != 1 else _clist_number(item, code)
+    return stock
+
+
+def _parse_clist_detail(item: Dict) -> Dict:
+    """将 full 模式的一条记录解析为详细数据字典（与 get_stock_detail_em 一致）"""
+    return _parse_detail_em(item.get('f12', ''), _ulist_to_detail_fields(item))
+
+
+# 扫描对象：股票字典列表、列式结构 {字段: 数组}、MarketSnapshot 或 pandas.DataFrame
+Universe = Union[List[Dict], Dict[str, np.ndarray], MarketSnapshot, Any]
+
+
+def screen_universe(universe: Universe, mask_func: Union[str, Callable[[Any], Any]]) -> List[Dict]:
+    """
+    向量化筛选
+
+    参数:
+        universe: 股票字典列表、列式结构、MarketSnapshot 或 DataFrame
+        mask_func: 接收列式结构（或 DataFrame），返回布尔掩码，
+                   例如 lambda c: (c['change_percent'] > 3) & (c['turnover'] > 1e8)；
+                   也可以是筛选表达式，例如 'change_percent > 3 and turnover > 1e8'
+
+    返回:
+        符合条件的股票字典列表（保持原顺序）
+
+    异常:
+        ExpressionError: 表达式语法错误、字段不存在或类型不匹配
+    """
+    if isinstance(mask_func, str):
+        mask_func = ScreenExpression(mask_func)
+
+    if isinstance(universe, list):
+        if not universe:
+            return []
+        rows = np.flatnonzero(np.asarray(mask_func(stocks_to_columns(universe)), dtype=bool))
+        return [universe[row] for row in rows]
+
+    if isinstance(universe, dict):
+        rows = np.flatnonzero(np.asarray(mask_func(universe), dtype=bool))
+        return columns_to_stocks(universe, rows)
+
+    if isinstance(universe, MarketSnapshot):
+        return universe.filter(mask_func).to_records()
+
+    # DataFrame
+    mask = np.asarray(mask_func(universe), dtype=bool)
+    return universe[mask].to_dict('records')
+
+
+def _number_constant(node) -> Optional[float]:
+    """数值常量（含负数）的值，其他节点返回None"""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _number_constant(node.operand)
+        return None if value is None else -value
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        return float(node.value)
+    return None
+
+
+def _range_bound(op, left, right) -> Optional[Dict]:
+    """字段与常量比较（如 change_percent > 3 或 3 < change_percent）转换为排序方案"""
+    flipped = {ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Lt: ast.Gt, ast.LtE: ast.GtE}
+    if isinstance(right, ast.Name) and isinstance(left, (ast.Constant, ast.UnaryOp)):
+        if type(op) not in flipped:
+            return None
+        op, left, right = flipped[type(op)](), right, left
+
+    if not isinstance(left, ast.Name) or left.id not in CLIST_SORT_FIELDS:
+        return None
+    bound = _number_constant(right)
+    if bound is None or not isinstance(op, (ast.Gt, ast.GtE, ast.Lt, ast.LtE)):
+        return None
+
+    descending = isinstance(op, (ast.Gt, ast.GtE))
+    return {
+        'field': left.id,
+        'fid': CLIST_SORT_FIELDS[left.id],
+        'po': '1' if descending else '0',
+        'bound': bound,
+        'inclusive': isinstance(op, (ast.GtE, ast.LtE)),
+    }
+
+
+def plan_clist_query(expression: Union[str, ScreenExpression]) -> Optional[Dict]:
+    """
+    查询下推：从筛选表达式中找出可排序字段的范围条件
+
+    表达式顶层为 and 连接时，取第一个形如 字段 > 常量 / 字段 < 常量 的条件，
+    让 clist 按该字段排序（> 为降序，< 为升序），满足条件的股票排在前面；
+    翻页时排序键越过阈值即可停止
+
+    返回:
+        {field, fid, po, bound, inclusive}；没有可下推的条件时返回None
+    """
+    if isinstance(expression, str):
+        expression = ScreenExpression(expression)
+
+    tree = expression.tree
+    conjuncts = tree.values if isinstance(tree, ast.BoolOp) and isinstance(tree.op, ast.And) else [tree]
+    for node in conjuncts:
+        if not isinstance(node, ast.Compare):
+            continue
+        operands = [node.left] + node.comparators
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            plan = _range_bound(op, left, right)
+            if plan is not None:
+                return plan
+    return None
+
+
+def _past_bound(plan: Dict, value: float) -> bool:
+    """按排序方案，value 之后的记录是否都不可能满足条件"""
+    if plan['po'] == '1':
+        return value < plan['bound'] or (value == plan['bound'] and not plan['inclusive'])
+    return value > plan['bound'] or (value == plan['bound'] and not plan['inclusive'])
+
 
 class StockScanner:
     """全市场股票扫描器"""
 
-    def __init__(self, timeout: int = 5):
+    def __init__(self,
+                 timeout: int = 5,
+                 now_func: Callable[[], datetime] = beijing_now,
+                 snapshot_cache: Optional[UniverseCache] = None,
+                 use_snapshot: bool = True):
+        """
+        参数:
+            timeout: 请求超时（秒）
+            now_func: 返回当前北京时间，用于判断交易时段
+            snapshot_cache: 全市场列表的磁盘快照，默认使用全局共享实例
+            use_snapshot: 是否使用磁盘快照
+        """
         self.timeout = timeout
+        self.now_func = now_func
+        self.snapshot_cache = (snapshot_cache or get_universe_cache()) if use_snapshot else None
+        self.limiter = get_rate_limiter()
+        self._list_cache = {}  # (limit, use_pagination) -> (有效期至, 股票列表)
+        self._rescan_state = {}  # 筛选条件 -> 上一次的行情快照与筛选结果
+        self.last_rescan = {}
+        self._snapshot = None  # 最近一次的全市场快照（排行榜共用）
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
 
-    def get_all_stocks(self, limit: Optional[int] = None, use_pagination: bool = True) -> List[Dict]:
+    def get_all_stocks(self, limit: Optional[int] = None, use_pagination: bool = True,
+                       max_workers: int = 8, refresh: bool = False,
+                       fields: Optional[Iterable[str]] = None) -> List[Dict]:
         """
         获取所有A股列表
 
         参数:
             limit: 限制返回数量，None表示全部
             use_pagination: 是否使用分页（默认True，可获取完整数据）
+            max_workers: 并发获取分页的线程数
+            refresh: 忽略磁盘快照，重新获取全市场列表
+            fields: 额外需要的字段（见 CLIST_EXTRA_FIELDS，如 open_price、turnover_rate），
+                    在同一次列表请求中获取
 
         返回:
-            股票列表，每个元素包含 {code, name, market}
-        """
-        url = 'http://80.push2.eastmoney.com/api/qt/clist/get'
+            股票列表，每个元素包含 {code, name, market, current, change_percent,
+            change_amount, volume, turnover} 及 fields 中的字段
 
-        # A股市场代码
-        # m:0+t:6 - 深市主板
-        # m:0+t:80 - 深市中小板
-        # m:0+t:81 - 深市创业板
-        # m:1+t:2 - 沪市主板
-        # m:1+t:23 - 沪市科创板
-        fs = 'm:0+t:6,m:0+t:80,m:0+t:81,m:1+t:2,m:1+t:23'
-
-        # 如果不使用分页，使用单次请求
-        if not use_pagination:
-            page_size = limit if limit else 100
-            params = {
-                'pn': '1',
-                'pz': str(page_size),
-                'po': '1',
-                'np': '1',
-                'fltt': '2',
-                'invt': '2',
-                'fid': 'f62',
-                'fs': fs,
-                'fields': 'f12,f13,f14,f2,f3,f4,f5,f6',
-                'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
-            }
-
-            try:
-                response = self.session.get(url, params=params, timeout=self.timeout)
-                data = response.json()
-
-                if not data.get('data'):
-                    return []
+        全市场列表保存为磁盘快照；快照获取之后行情没有变化（休市期间）时直接读取快照，
+        交易时段内每次重新获取最新行情；
+        不使用快照时，休市期间的结果在内存中保留到下一个活跃阶段
+        """
+        extra = extra_fields(fields)
+        if use_pagination and self.snapshot_cache is not None:
+            return self._get_universe(limit, max_workers, refresh, extra)
+
+        key = (limit, use_pagination, extra)
+        now = self.now_func()
+        cached = self._list_cache.get(key)
+        if cached is not None and now < cached[0]:
+            return [dict(stock) for stock in cached[1]]
+
+        stocks, complete = self._fetch_all_stocks(limit, use_pagination, max_workers, extra)
+        if complete and not is_market_active(now):
+            self._list_cache[key] = (next_active_time(now), stocks)
+            stocks = [dict(stock) for stock in stocks]
+        return stocks
+
+    def _get_universe(self, limit: Optional[int], max_workers: int, refresh: bool,
+                      extra: Tuple[str, ...] = ()) -> List[Dict]:
+        """从磁盘快照读取全市场列表；没有当前有效的快照（或快照缺少所需字段）时获取并保存"""
+        stocks = None if refresh else self._load_snapshot(extra)
+        if stocks:
+            return stocks[:limit] if limit else stocks
+
+        # 只需要部分股票且没有快照时不必拉取全市场
+        if limit and not refresh:
+            return self._fetch_all_stocks(limit, True, max_workers, extra)[0]
+
+        # 保留原快照中的附加字段，快照字段只增不减
+        stocks = self.snapshot_cache.load(UNIVERSE_SNAPSHOT)
+        if stocks:
+            extra = extra_fields(set(extra) | set(stocks[0]))
+        fetched, complete = self._fetch_all_stocks(None, True, max_workers, extra)
+        # 有分页失败时不保存，避免之后整个交易日的扫描都缺少这些股票
+        if complete:
+            self.snapshot_cache.save(UNIVERSE_SNAPSHOT, fetched)
+        else:
+            print(f"全市场列表不完整（{len(fetched)} 只），未保存快照")
+        return fetched[:limit] if limit else fetched
+
+    def refresh_universe(self, max_workers: int = 8,
+                         fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """重新获取全市场列表并更新磁盘快照"""
+        return self.get_all_stocks(max_workers=max_workers, refresh=True, fields=fields)
+
+    def get_all_details(self, limit: Optional[int] = None, max_workers: int = 8) -> List[Dict]:
+        """
+        获取全市场详细数据（clist full 模式）
 
-                stocks = []
-                for item in data['data']['diff']:
-                    stocks.append({
-                        'code': item.get('f12', ''),
-                        'name': item.get('f14', ''),
-                        'market': item.get('f13', ''),
-                        'current': item.get('f2', 0) / 100,
-                        'change_percent': item.get('f3', 0) / 100,
-                        'change_amount': item.get('f4', 0) / 100,
-                        'volume': item.get('f5', 0),
-                        'turnover': item.get('f6', 0),
-                    })
-
-                return stocks
+        每页记录直接带上开盘价、最高/最低价、昨收、换手率、量比、市值和行业，
+        字段与 get_stock_detail_em 完全一致，不必再逐只或按批请求详情；全市场约55次请求
 
-            except Exception as e:
-                print(f"获取股票列表失败: {e}")
-                return []
-
-        # 使用分页获取完整数据
-        all_stocks = []
-        page = 1
-        page_size = 500  # 每页请求500条（但API最多返回100条）
-
-        while True:
-            params = {
-                'pn': str(page),
-                'pz': str(page_size),
-                'po': '1',
-                'np': '1',
-                'fltt': '2',
-                'invt': '2',
-                'fid': 'f62',
-                'fs': fs,
-                'fields': 'f12,f13,f14,f2,f3,f4,f5,f6',
-                'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
-            }
+        参数:
+            limit: 限制返回数量，None表示全部
+            max_workers: 并发获取分页的线程数
 
-            try:
-                response = self.session.get(url, params=params, timeout=self.timeout)
-                data = response.json()
+        返回:
+            详细数据列表；休市期间的结果在内存中保留到下一个活跃阶段
+        """
+        key = ('full', limit)
+        now = self.now_func()
+        cached = self._list_cache.get(key)
+        if cached is not None and now < cached[0]:
+            return [dict(detail) for detail in cached[1]]
+
+        details, complete = self._fetch_all_stocks(limit, True, max_workers, full=True)
+        if complete and not is_market_active(now):
+            self._list_cache[key] = (next_active_time(now), details)
+            details = [dict(detail) for detail in details]
+        return details
+
+    def get_snapshot(self, fields: Optional[Iterable[str]] = None, refresh: bool = False,
+                     max_workers: int = 8) -> MarketSnapshot:
+        """
+        全市场行情快照（列式，按代码/市场/行业索引）
 
-                if not data.get('data') or not data['data'].get('diff'):
-                    break
+        参数同 get_all_stocks；快照的获取时间为磁盘快照的保存时间或本次请求时间
+        """
+        stocks = self.get_all_stocks(max_workers=max_workers, refresh=refresh, fields=fields)
+        fetched_at = None
+        if self.snapshot_cache is not None:
+            info = self.snapshot_cache.info(UNIVERSE_SNAPSHOT)
+            if info and self.now_func() < next_active_time(info['fetched_at']):
+                fetched_at = info['fetched_at']
+        return MarketSnapshot.from_stocks(stocks, fetched_at or self.now_func())
+
+    def _read_snapshot(self, fields: Iterable[str] = (),
+                       max_age: float = 0.0) -> Optional[Tuple[datetime, List[Dict]]]:
+        """
+        当前有效且包含所需附加字段的磁盘快照 (获取时间, 股票列表)，否则返回None
 
-                items = data['data']['diff']
-                if not items:
-                    break
+        快照获取之后经过了交易时段（如开盘前获取、盘中较早获取）时行情已变化，
+        只有距获取时间不超过 max_age 秒时才继续使用
+        """
+        if self.snapshot_cache is None:
+            return None
+        entry = self.snapshot_cache.load_with_time(UNIVERSE_SNAPSHOT)
+        if entry is None:
+            return None
+        fetched_at, stocks = entry
+        now = self.now_func()
+        if now >= next_active_time(fetched_at) and (now - fetched_at).total_seconds() > max_age:
+            return None
+        if not stocks or not all(field in stocks[0] for field in extra_fields(fields)):
+            return None
+        return entry
+
+    def _load_snapshot(self, fields: Iterable[str] = ()) -> Optional[List[Dict]]:
+        """当前有效且包含所需附加字段的磁盘快照，否则返回None"""
+        entry = self._read_snapshot(fields)
+        return entry[1] if entry else None
+
+    def _fetch_all_stocks(self, limit: Optional[int], use_pagination: bool,
+                          max_workers: int = 8, extra: Tuple[str, ...] = (),
+                          full: bool = False) -> Tuple[List[Dict], bool]:
+        """
+        请求 clist 接口获取股票列表
 
-                for item in items:
-                    all_stocks.append({
-                        'code': item.get('f12', ''),
-                        'name': item.get('f14', ''),
-                        'market': item.get('f13', ''),
-                        'current': item.get('f2', 0) / 100,
-                        'change_percent': item.get('f3', 0) / 100,
-                        'change_amount': item.get('f4', 0) / 100,
-                        'volume': item.get('f5', 0),
-                        'turnover': item.get('f6', 0),
-                    })
-
-                # API限制：每次最多返回100条
-                # 如果返回少于100条，说明已经是最后一页
-                if len(items) < 100:
-                    break
+        extra 为附加字段；full=True 时按 full 模式请求，返回详细数据字典
 
-                # 如果设置了limit且已获取足够数量
-                if limit and len(all_stocks) >= limit:
-                    all_stocks = all_stocks[:limit]
-                    break
+        返回:
+            (股票列表, 是否完整)；有分页请求失败或条数少于接口给出的总数时不完整
+        """
+        if full:
+            fetch_page = partial(self._fetch_clist_page, fields=CLIST_DETAIL_FIELDS)
+            parse = _parse_clist_detail
+        else:
+            fetch_page = partial(self._fetch_clist_page, fields=clist_fields_for(extra))
+            parse = partial(_parse_clist_item, extra=extra)
 
-                page += 1
+        # 如果不使用分页，使用单次请求
+        if not use_pagination:
+            try:
+                items, _ = fetch_page(1, limit if limit else 100)
+                return [parse(item) for item in items], True
+            except Exception as e:
+                print(f"获取股票列表失败: {e}")
+                return [], False
 
-                # 避免请求过快
-                time.sleep(1.0)
+        # 先取第一页得到总数，其余页并发获取（请求频率由全局限速器控制）
+        try:
+            first, total = fetch_page(1)
+        except Exception as e:
+            print(f"获取第1页失败: {e}")
+            return [], False
+
+        if not first:
+            return [], False
+
+        per_page = len(first)
+        if limit:
+            total = min(total, limit)
+        pages = max(1, -(-total // per_page))
+
+        results = {1: first}
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(fetch_page, page): page
+                           for page in range(2, pages + 1)}
+                for future in as_completed(futures):
+                    page = futures[future]
+                    try:
+                        results[page] = future.result()[0]
+                    except Exception as e:
+                        print(f"获取第{page}页失败: {e}")
+
+        # 按页序合并；翻页期间排序可能变化，同一只股票可能出现在相邻两页，按代码去重
+        stocks = {}
+        for page in sorted(results):
+            for item in results[page]:
+                code = item.get('f12', '')
+                if code not in stocks:
+                    stocks[code] = parse(item)
+
+        all_stocks = list(stocks.values())
+        if limit:
+            all_stocks = all_stocks[:limit]
+        return all_stocks, len(all_stocks) >= total
+
+    def _fetch_clist_page(self, page: int, page_size: int = CLIST_PAGE_SIZE,
+                          fid: str = 'f62', fields: str = CLIST_FIELDS,
+                          po: str = '1') -> Tuple[List[Dict], int]:
+        """
+        获取 clist 的一页原始记录
 
-            except Exception as e:
-                print(f"获取第{page}页失败: {e}")
-                break
+        返回:
+            (记录列表, 全市场总数)
+        """
+        self.limiter.acquire(CLIST_URL)
+        response = self.session.get(CLIST_URL, params=clist_params(page, page_size, fid, fields, po),
+                                    timeout=self.timeout)
+        data = response.json()
 
-        return all_stocks
+        payload = data.get('data') or {}
+        items = payload.get('diff') or []
+        if isinstance(items, dict):
+            items = list(items.values())
+        return items, payload.get('total', 0)
 
     def scan_market(self,
-                   screen_func: Callable[[Dict], bool],
+                   screen_func: Optional[Callable[[Dict], bool]] = None,
                    limit: Optional[int] = None,
-                   max_workers: int = 10) -> List[Dict]:
+                   max_workers: int = 10,
+                   mask_func: Optional[Union[str, Callable[[Any], Any]]] = None,
+                   universe: Optional[Universe] = None,
+                   fields: Optional[Iterable[str]] = None) -> List[Dict]:
         """
         全市场扫描
 
         参数:
-            screen_func: 筛选函数，接收股票数据，返回True/False
+            screen_func: 筛选函数，接收单只股票数据，返回True/False
             limit: 限制扫描数量，None表示全部
-            max_workers: 并发线程数
+            max_workers: 逐只筛选时的并发线程数（筛选函数需要请求网络时有效）
+            mask_func: 向量化筛选函数，接收列式结构 {字段: 数组}（或 DataFrame），
+                       返回布尔掩码；也可以是筛选表达式字符串（见 screen_expression）。
+                       指定后不再逐只调用 screen_func
+            universe: 扫描对象（股票字典列表、列式结构、MarketSnapshot 或 DataFrame），
+                      默认获取A股列表
+            fields: 筛选需要的额外字段（如 open_price、turnover_rate），与筛选条件
+                    声明的字段合并后在获取A股列表时一并请求（见 declared_fields）
 
         返回:
             符合条件的股票列表
+
+        示例:
+            scanner.scan_market(mask_func=lambda c: c['change_percent'] > 3)
+            scanner.scan_market(mask_func='change_percent > 3 and turnover > 1e8')
         """
+        if screen_func is None and mask_func is None:
+            raise ValueError("需要指定 screen_func 或 mask_func")
+
+        if isinstance(mask_func, str):
+            mask_func = ScreenExpression(mask_func)
+        fields = tuple(fields or ()) + declared_fields(screen_func, mask_func)
+
+        # 筛选条件可下推且没有磁盘快照时，按条件排序分页请求，越过阈值即停止
+        if universe is None and limit is None and isinstance(mask_func, ScreenExpression):
+            if self._load_snapshot(fields) is None and plan_clist_query(mask_func) is not None:
+                qualified = list(self.iter_market(mask_func=mask_func, fields=fields))
+                print(f"扫描完成: {len(qualified)} 只符合条件")
+                return qualified
+
         # 1. 获取股票列表
-        print(f"正在获取A股列表...")
-        stocks = self.get_all_stocks(limit=limit)
-        print(f"获取到 {len(stocks)} 只股票")
+        if universe is None:
+            print(f"正在获取A股列表...")
+            universe = self.get_all_stocks(limit=limit, fields=fields)
+            print(f"获取到 {len(universe)} 只股票")
 
-        if not stocks:
+        if isinstance(universe, list) and not universe:
             return []
 
-        # 2. 批量扫描
-        print(f"开始扫描（并发数: {max_workers}）...")
-        qualified = []
+        # 2. 向量化筛选：整批数据一次计算掩码
+        if mask_func is not None:
+            qualified = screen_universe(universe, mask_func)
+            print(f"扫描完成: {len(qualified)} 只符合条件")
+            return qualified
+
+        # 3. 逐只筛选
+        if isinstance(universe, list):
+            stocks = universe
+        elif isinstance(universe, dict):
+            stocks = columns_to_stocks(universe)
+        elif isinstance(universe, MarketSnapshot):
+            stocks = universe.to_records()
+        else:
+            stocks = universe.to_dict('records')
         total = len(stocks)
+        print(f"开始扫描（并发数: {max_workers}）...")
 
-        for i, stock in enumerate(stocks, 1):
+        def check(stock: Dict) -> bool:
             try:
-                # 执行筛选
-                if screen_func(stock):
-                    qualified.append(stock)
-                    print(f"  [{i}/{total}] ✓ {stock['name']} ({stock['code']})")
-
-                if i % 100 == 0:
-                    print(f"  进度: {i}/{total} ({i/total*100:.1f}%)")
+                return bool(screen_func(stock))
             except Exception as e:
-                print(f"  [{i}/{total}] ✗ {stock.get('code', 'Unknown')}: {e}")
+                print(f"  ✗ {stock.get('code', 'Unknown')}: {e}")
+                return False
 
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(check, stocks))
+        else:
+            results = [check(stock) for stock in stocks]
+
+        qualified = [stock for stock, ok in zip(stocks, results) if ok]
+        print(f"扫描完成: {total} 只中 {len(qualified)} 只符合条件")
         return qualified
 
+    def iter_market(self,
+                    screen_func: Optional[Callable[[Dict], bool]] = None,
+                    mask_func: Optional[Union[str, Callable[[Any], Any]]] = None,
+                    limit: Optional[int] = None,
+                    prefetch: int = 2,
+                    fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        逐页扫描全市场，每解析完一页就返回其中符合条件的股票
+
+        解析当前页时后台预取之后的 prefetch 页；调用方提前结束迭代
+        （break 或关闭生成器）时，尚未开始的请求会被取消。
+        有有效的磁盘快照时直接按页读取快照，不请求接口。
+
+        mask_func 为筛选表达式且不限制数量时做查询下推（见 plan_clist_query）：
+        按条件中的字段排序请求，排序键越过阈值后不再翻页。
+        停牌股票（行情为 '-'）排在最后，不会被扫描到
+
+        参数:
+            screen_func: 筛选函数，接收单只股票数据，返回True/False
+            mask_func: 向量化筛选函数或筛选表达式（同 scan_market）
+            limit: 限制扫描数量，None表示全部
+            prefetch: 预取的页数
+            fields: 筛选需要的额外字段（同 scan_market）
+
+        示例:
+            for stock in scanner.iter_market(mask_func='change_percent > 3'):
+                ...
+            first10 = list(itertools.islice(scanner.iter_market(my_screen), 10))
+        """
+        if screen_func is None and mask_func is None:
+            raise ValueError("需要指定 screen_func 或 mask_func")
+
+        def screen(stocks: List[Dict]) -> List[Dict]:
+            if mask_func is not None:
+                return screen_universe(stocks, mask_func)
+            qualified = []
+            for stock in stocks:
+                try:
+                    if screen_func(stock):
+                        qualified.append(stock)
+                except Exception as e:
+                    print(f"  ✗ {stock.get('code', 'Unknown')}: {e}")
+            return qualified
+
+        if isinstance(mask_func, str):
+            mask_func = ScreenExpression(mask_func)
+        extra = extra_fields(tuple(fields or ()) + declared_fields(screen_func, mask_func))
+
+        snapshot = self._load_snapshot(extra)
+        if snapshot is not None:
+            snapshot = snapshot[:limit] if limit else snapshot
+            for start in range(0, len(snapshot), CLIST_PAGE_SIZE):
+                yield from screen(snapshot[start:start + CLIST_PAGE_SIZE])
+            return
+
+        plan = None
+        if limit is None and isinstance(mask_func, ScreenExpression):
+            plan = plan_clist_query(mask_func)
+        fetch_page = partial(self._fetch_clist_page, fields=clist_fields_for(extra))
+        if plan:
+            fetch_page = partial(fetch_page, fid=plan['fid'], po=plan['po'])
+
+        executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+        pending = deque()  # (页码, future)
+        seen = set()
+        remaining = limit
+        try:
+            try:
+                first, total = fetch_page(1)
+            except Exception as e:
+                print(f"获取第1页失败: {e}")
+                return
+            if not first:
+                return
+
+            if limit:
+                total = min(total, limit)
+            pages = max(1, -(-total // len(first)))
+            next_page = 2
+            items = first
+
+            while True:
+                # 先提交预取，再处理当前页
+                while len(pending) < prefetch and next_page <= pages:
+                    pending.append((next_page, executor.submit(fetch_page, next_page)))
+                    next_page += 1
+
+                parsed = [_parse_clist_item(item, extra) for item in items]
+                stocks = []
+                for stock in parsed:
+                    if stock['code'] in seen:
+                        continue
+                    seen.add(stock['code'])
+                    stocks.append(stock)
+                if remaining is not None:
+                    stocks = stocks[:remaining]
+                    remaining -= len(stocks)
+
+                yield from screen(stocks)
+
+                if not pending or remaining == 0:
+                    break
+                if plan and parsed and _past_bound(plan, parsed[-1][plan['field']]):
+                    break
+                page, future = pending.popleft()
+                try:
+                    items = future.result()[0]
+                except Exception as e:
+                    print(f"获取第{page}页失败: {e}")
+                    items = []
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def rescan(self,
+               screen_func: Optional[Callable[[Dict], bool]] = None,
+               mask_func: Optional[Union[str, Callable[[Any], Any]]] = None,
+               universe: Optional[Universe] = None,
+               key: Any = None,
+               change_fields: Tuple[str, ...] = RESCAN_CHANGE_FIELDS,
+               fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        增量扫描：反复执行同一个筛选时，只重新筛选行情发生变化的股票
+
+        每个筛选条件保存上一次的行情（change_fields）和每只股票的筛选结果；
+        再次调用时与上一次比较，价格、成交量、行情时间都没变的股票直接沿用上次结果，
+        其余股票（含新出现的股票）重新筛选后合并。盘中未成交的股票不再重复计算
+
+        参数:
+            screen_func: 筛选函数，接收单只股票数据，返回True/False
+            mask_func: 向量化筛选函数或筛选表达式（同 scan_market）
+            universe: 扫描对象（股票字典列表或列式结构），默认重新获取A股列表
+            key: 区分筛选条件的键，默认为筛选函数/表达式本身
+            change_fields: 判断行情变化的字段（股票数据中没有的字段忽略）
+            fields: 筛选需要的额外字段（同 scan_market）
+
+        返回:
+            符合条件的股票列表（顺序与股票列表一致）；
+            本次重新筛选的数量记录在 self.last_rescan
+        """
+        if screen_func is None and mask_func is None:
+            raise ValueError("需要指定 screen_func 或 mask_func")
+
+        if key is None:
+            key = mask_func if mask_func is not None else screen_func
+        state = self._rescan_state.get(key)
+        if state is not None:
+            mask_func = state['mask_func']
+        elif isinstance(mask_func, str):
+            mask_func = ScreenExpression(mask_func)
+
+        # 增量扫描需要最新行情，不使用磁盘快照；判断变化的字段（如行情时间）一并请求
+        if universe is None:
+            fields = tuple(fields or ()) + tuple(change_fields) + declared_fields(screen_func, mask_func)
+            universe = self.get_all_stocks(refresh=True, fields=fields)
+        if isinstance(universe, dict):
+            columns, stocks = universe, columns_to_stocks(universe)
+        else:
+            stocks = list(universe)
+            columns = stocks_to_columns(stocks)
+
+        count = len(stocks)
+        codes = columns['code'].tolist() if count else []
+        matched = np.zeros(count, dtype=bool)
+        changed = np.ones(count, dtype=bool)
+
+        if state is not None and count:
+            previous = np.array([state['index'].get(code, -1) for code in codes], dtype=np.int64)
+            known = previous >= 0
+            safe = np.where(known, previous, 0)
+            changed = ~known
+            for field in change_fields:
+                if field in columns and field in state['columns']:
+                    changed |= known & (columns[field] != state['columns'][field][safe])
+            matched[~changed] = state['matched'][previous[~changed]]
+
+        rows = np.flatnonzero(changed)
+        if len(rows):
+            if mask_func is not None:
+                subset = {name: values[rows] for name, values in columns.items()}
+                matched[rows] = np.broadcast_to(np.asarray(mask_func(subset), dtype=bool), (len(rows),))
+            else:
+                for row in rows:
+                    try:
+                        matched[row] = bool(screen_func(stocks[row]))
+                    except Exception as e:
+                        print(f"  ✗ {stocks[row].get('code', 'Unknown')}: {e}")
+
+        self._rescan_state[key] = {
+            'mask_func': mask_func,
+            'index': {code: row for row, code in enumerate(codes)},
+            'columns': {field: columns[field] for field in change_fields if field in columns},
+            'matched': matched,
+        }
+        self.last_rescan = {'stocks': count, 'rescreened': len(rows), 'matched': int(matched.sum())}
+        return [stocks[row] for row in np.flatnonzero(matched)]
+
+    def reset_rescan(self, key: Any = None):
+        """清除增量扫描的状态（key 为None时清除全部筛选条件）"""
+        if key is None:
+            self._rescan_state.clear()
+        else:
+            self._rescan_state.pop(key, None)
+
     def scan_market_with_details(self,
                                  screen_func: Callable[[Dict], bool],
-                                 limit: Optional[int] = None) -> List[Dict]:
+                                 limit: Optional[int] = None,
+                                 max_workers: int = 8) -> List[Dict]:
         """
         全市场扫描（获取详细信息后筛选）
 
-        注意：速度较慢，因为需要获取每只股票的详细信息
+        详细信息随股票列表一起通过 clist full 模式获取（见 get_all_details），
+        全市场约55次请求，不再逐只或按批请求详情
 
         参数:
-            screen_func: 筛选函数，接收详细股票数据，返回True/False
+            screen_func: 筛选函数，接收详细股票数据（字段与 get_stock_detail_em 一致），返回True/False
             limit: 限制扫描数量
+            max_workers: 并发获取分页的线程数
 
         返回:
-            符合条件的股票详细列表
+            符合条件的股票详细列表（顺序与股票列表一致）
         """
-        from stock_api_enhanced import EnhancedStockAPI
-
-        # 1. 获取股票列表
-        print(f"正在获取A股列表...")
-        stocks = self.get_all_stocks(limit=limit)
-        print(f"获取到 {len(stocks)} 只股票")
+        print(f"正在获取A股详细数据...")
+        details = self.get_all_details(limit=limit, max_workers=max_workers)
+        print(f"获取到 {len(details)} 只股票")
 
-        if not stocks:
-            return []
-
-        # 2. 逐个获取详细信息并筛选
-        print(f"开始扫描（获取详细信息）...")
         qualified = []
-        api = EnhancedStockAPI()
-
-        for i, stock in enumerate(stocks, 1):
+        for detail in details:
             try:
-                # 获取详细信息
-                detail = api.get_stock_detail_em(stock['code'])
-
-                # 执行筛选
                 if screen_func(detail):
                     qualified.append(detail)
-                    print(f"  [{i}/{len(stocks)}] ✓ {detail['stock_name']} ({detail['stock_code']}) - "
-                          f"¥{detail['current_price']:.2f} ({detail['change_percent']:+.2f}%)")
-
-                if i % 50 == 0:
-                    print(f"  进度: {i}/{len(stocks)}")
-                    time.sleep(1.0)  # 避免请求过快
-
             except Exception as e:
-                print(f"  [{i}/{len(stocks)}] ✗ {stock['code']}: {e}")
+                print(f"  ✗ {detail['stock_code']}: {e}")
 
+        print(f"扫描完成: {len(details)} 只中 {len(qualified)} 只符合条件")
         return qualified
 
-    def get_hot_stocks(self, top_n: int = 100) -> List[Dict]:
+    def _snapshot_fresh(self, snapshot: Optional[MarketSnapshot], max_age: float,
+                        fields: Iterable[str] = ()) -> bool:
         """
-        获取热门股票（按成交额排序）
+        快照是否仍可使用
+
+        休市期间获取的快照在下一个活跃阶段之前都有效；否则按 max_age 判断
+        """
+        if snapshot is None or snapshot.fetched_at is None:
+            return False
+        if not all(field in snapshot for field in fields):
+            return False
+        now = self.now_func()
+        if now < next_active_time(snapshot.fetched_at):
+            return True
+        return (now - snapshot.fetched_at).total_seconds() <= max_age
+
+    def current_snapshot(self, max_age: float = SNAPSHOT_MAX_AGE,
+                         fields: Optional[Iterable[str]] = None) -> MarketSnapshot:
+        """
+        当前全市场快照：内存或磁盘中的快照未过期时直接使用，否则重新获取
 
         参数:
-            top_n: 返回前N只
+            max_age: 盘中快照的最长使用时间（秒）
+            fields: 需要的额外字段
+        """
+        fields = tuple(fields or ())
+        if self._snapshot_fresh(self._snapshot, max_age, fields):
+            return self._snapshot
+
+        entry = self._read_snapshot(fields, max_age)
+        if entry is not None:
+            snapshot = MarketSnapshot.from_stocks(entry[1], entry[0])
+        else:
+            snapshot = self.get_snapshot(fields=fields, refresh=True)
+        self._snapshot = snapshot
+        return snapshot
+
+    def _ranking_snapshot(self, by: Tuple[str, ...], max_age: float) -> MarketSnapshot:
+        """
+        排行用的快照（含 RANKING_FIELDS 和 by 中的附加字段）
 
-        返回:
-            热门股票列表
+        异常:
+            ValueError: 排序字段不支持
         """
-        params = {
-            'pn': '1',
-            'pz': str(top_n),
-            'po': '1',
-            'np': '1',
-            'fltt': '2',
-            'invt': '2',
-            'fid': 'f6',  # 按成交额排序
-            'fs': 'm:0+t:6,m:0+t:80,m:0+t:81,m:1+t:2,m:1+t:23',
-            'fields': 'f12,f13,f14,f2,f3,f4,f5,f6',
-            'ut': 'fa5fd1943c7b386f172d6893dbfba10b'
-        }
+        unsupported = [field for field in by if field not in CLIST_SORT_FIELDS]
+        if unsupported:
+            raise ValueError(f"不支持的排序字段: {', '.join(unsupported)}"
+                             f"（可用字段: {', '.join(CLIST_SORT_FIELDS)}）")
+        return self.current_snapshot(max_age, fields=RANKING_FIELDS + by)
+
+    def get_ranking(self, by: str = 'turnover', top_n: int = 100, ascending: bool = False,
+                    max_age: float = SNAPSHOT_MAX_AGE) -> List[Dict]:
+        """
+        排行榜（由全市场快照本地部分排序得到，快照过期时才请求接口）
 
-        url = 'http://80.push2.eastmoney.com/api/qt/clist/get'
+        参数:
+            by: 排序字段，见 CLIST_SORT_FIELDS（常用的成交额、涨跌幅、振幅、成交量、换手率见 RANKING_FIELDS）
+            top_n: 返回前N只
+            ascending: True 为从小到大（如跌幅榜）
+            max_age: 盘中快照的最长使用时间（秒）
 
-        try:
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            data = response.json()
+        返回:
+            股票列表（按排序字段排列）
 
-            if not data.get('data'):
-                return []
+        异常:
+            ValueError: 排序字段不支持
+        """
+        snapshot = self._ranking_snapshot((by,), max_age)
+        return snapshot.top(by, top_n, ascending).to_records()
 
-            stocks = []
-            for item in data['data']['diff']:
-                stocks.append({
-                    'code': item.get('f12', ''),
-                    'name': item.get('f14', ''),
-                    'current': item.get('f2', 0) / 100,
-                    'change_percent': item.get('f3', 0) / 100,
-                    'turnover': item.get('f6', 0),  # 成交额
-                })
+    def get_rankings(self, by: Iterable[str] = RANKING_FIELDS, top_n: int = 20,
+                     max_age: float = SNAPSHOT_MAX_AGE) -> Dict[str, List[Dict]]:
+        """多个排行榜（共用同一个快照，只请求一次；排序字段不支持时抛出 ValueError）"""
+        by = (by,) if isinstance(by, str) else tuple(by)
+        snapshot = self._ranking_snapshot(by, max_age)
+        return {field: snapshot.top(field, top_n).to_records() for field in by}
 
-            return stocks
+    def get_hot_stocks(self, top_n: int = 100, max_age: float = SNAPSHOT_MAX_AGE) -> List[Dict]:
+        """
+        获取热门股票（按成交额排序）
+
+        参数:
+            top_n: 返回前N只
+            max_age: 盘中快照的最长使用时间（秒）
 
+        返回:
+            热门股票列表
+        """
+        try:
+            ranking = self.get_ranking('turnover', top_n, max_age=max_age)
         except Exception as e:
             print(f"获取热门股票失败: {e}")
             return []
 
+        return [{
+            'code': stock['code'],
+            'name': stock['name'],
+            'current': stock['current'],
+            'change_percent': stock['change_percent'],
+            'turnover': stock['turnover'],  # 成交额
+        } for stock in ranking]
+
     def format_scan_result(self, stocks: List[Dict]) -> str:
         """格式化扫描结果"""
         if not stocks:
@@ -318,11 +1004,12 @@ def get_all_stocks(limit: Optional[int] = None, use_pagination: bool = True) ->
     return scanner.get_all_stocks(limit=limit, use_pagination=use_pagination)
 
 
-def scan_market(screen_func: Callable[[Dict], bool],
-                limit: Optional[int] = None) -> List[Dict]:
-    """扫描全市场"""
+def scan_market(screen_func: Optional[Callable[[Dict], bool]] = None,
+                limit: Optional[int] = None,
+                mask_func: Optional[Union[str, Callable[[Any], Any]]] = None) -> List[Dict]:
+    """扫描全市场（screen_func 逐只筛选，mask_func 向量化筛选）"""
     scanner = StockScanner()
-    return scanner.scan_market(screen_func, limit=limit)
+    return scanner.scan_market(screen_func, limit=limit, mask_func=mask_func)
 
 
 if __name__ == '__main__':
@@ -357,3 +1044,11 @@ if __name__ == '__main__':
     print(f"\n涨幅>3%的股票: {len(result)} 只")
     for s in result[:10]:
         print(f"  {s['name']}: {s['change_percent']:.2f}%")
+    print()
+
+    # 测试4: 向量化筛选（同一批数据可反复筛选）
+    print("=== 测试4: 向量化筛选 ===")
+    columns = stocks_to_columns(scanner.get_all_stocks(limit=1000))
+    rising = scanner.scan_market(mask_func=lambda c: c['change_percent'] > 3, universe=columns)
+    active = scanner.scan_market(mask_func=lambda c: c['turnover'] > 1e9, universe=columns)
+    print(f"涨幅>3%: {len(rising)} 只，成交额>10亿: {len(active)} 只")
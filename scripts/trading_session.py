@@ -0,0 +1,185 @@
+"""
+A股交易时段
+判断当前所处的交易阶段（集合竞价、连续竞价、午间休市、收盘集合竞价、休市），
+计算下一个有行情变化的时段，供轮询、缓存和扫描决定何时请求、何时休眠
+
+节假日表需要每年按交易所公告更新，也可通过 add_holidays() 补充
+"""
+import threading
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+
+# 交易阶段
+PRE_OPEN = 'pre_open'                 # 开盘前（9:15之前）
+CALL_AUCTION = 'call_auction'         # 开盘集合竞价 9:15-9:25
+AUCTION_MATCHED = 'auction_matched'   # 竞价已撮合，等待连续竞价 9:25-9:30（行情不变）
+CONTINUOUS = 'continuous'             # 连续竞价 9:30-11:30、13:00-14:57
+LUNCH_BREAK = 'lunch_break'           # 午间休市 11:30-13:00
+CLOSING_AUCTION = 'closing_auction'   # 收盘集合竞价 14:57-15:00
+CLOSED = 'closed'                     # 收盘后
+HOLIDAY = 'holiday'                   # 周末或节假日
+
+# 行情会发生变化的阶段
+ACTIVE_PHASES = (CALL_AUCTION, CONTINUOUS, CLOSING_AUCTION)
+
+# 交易日内各阶段的起始时间（按时间顺序）
+_SCHEDULE = (
+    (dtime(0, 0), PRE_OPEN),
+    (dtime(9, 15), CALL_AUCTION),
+    (dtime(9, 25), AUCTION_MATCHED),
+    (dtime(9, 30), CONTINUOUS),
+    (dtime(11, 30), LUNCH_BREAK),
+    (dtime(13, 0), CONTINUOUS),
+    (dtime(14, 57), CLOSING_AUCTION),
+    (dtime(15, 0), CLOSED),
+)
+
+MARKET_CLOSE = dtime(15, 0)
+
+# 沪深交易所休市日（不含周末）
+HOLIDAYS = {
+    # 2025
+    date(2025, 1, 1),
+    date(2025, 1, 28), date(2025, 1, 29), date(2025, 1, 30), date(2025, 1, 31),
+    date(2025, 2, 3), date(2025, 2, 4),
+    date(2025, 4, 4),
+    date(2025, 5, 1), date(2025, 5, 2), date(2025, 5, 5),
+    date(2025, 6, 2),
+    date(2025, 10, 1), date(2025, 10, 2), date(2025, 10, 3),
+    date(2025, 10, 6), date(2025, 10, 7), date(2025, 10, 8),
+    # 2026
+    date(2026, 1, 1), date(2026, 1, 2),
+    date(2026, 2, 16), date(2026, 2, 17), date(2026, 2, 18), date(2026, 2, 19),
+    date(2026, 2, 20), date(2026, 2, 23),
+    date(2026, 4, 6),
+    date(2026, 5, 1), date(2026, 5, 4), date(2026, 5, 5),
+    date(2026, 6, 19),
+    date(2026, 9, 25),
+    date(2026, 10, 1), date(2026, 10, 2), date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 7),
+}
+
+_BEIJING = timezone(timedelta(hours=8))
+
+
+def beijing_now() -> datetime:
+    """当前北京时间（不带时区信息）"""
+    return datetime.now(_BEIJING).replace(tzinfo=None)
+
+
+def add_holidays(days: Iterable[date]):
+    """补充休市日"""
+    HOLIDAYS.update(days)
+
+
+def is_trading_day(day: date) -> bool:
+    """是否为交易日（非周末、非节假日）"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def next_trading_day(day: date) -> date:
+    """day 之后的第一个交易日"""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def previous_trading_day(day: date) -> date:
+    """day 之前的最后一个交易日"""
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def phase_at(now: datetime) -> str:
+    """当前所处的交易阶段"""
+    if not is_trading_day(now.date()):
+        return HOLIDAY
+
+    current = now.time()
+    phase = PRE_OPEN
+    for start, name in _SCHEDULE:
+        if current >= start:
+            phase = name
+    return phase
+
+
+def is_market_active(now: Optional[datetime] = None) -> bool:
+    """行情是否在变化（集合竞价或连续竞价期间）"""
+    return phase_at(now or beijing_now()) in ACTIVE_PHASES
+
+
+def next_active_time(now: datetime) -> datetime:
+    """
+    下一个行情会变化的时间点；当前已处于活跃阶段时返回 now
+
+    例如午间休市返回13:00，收盘后返回下一个交易日9:15
+    """
+    if is_market_active(now):
+        return now
+
+    if is_trading_day(now.date()):
+        for start, name in _SCHEDULE:
+            if name in ACTIVE_PHASES and now.time() < start:
+                return datetime.combine(now.date(), start)
+
+    return datetime.combine(next_trading_day(now.date()), dtime(9, 15))
+
+
+def next_session_start(now: datetime) -> datetime:
+    """
+    下一个交易日开盘集合竞价的开始时间（9:15）
+
+    交易日9:15之前返回当天9:15，否则返回下一个交易日9:15
+    """
+    if is_trading_day(now.date()) and now.time() < dtime(9, 15):
+        return datetime.combine(now.date(), dtime(9, 15))
+    return datetime.combine(next_trading_day(now.date()), dtime(9, 15))
+
+
+def seconds_until_active(now: Optional[datetime] = None) -> float:
+    """距离下一个活跃阶段的秒数（当前活跃时为0）"""
+    now = now or beijing_now()
+    return (next_active_time(now) - now).total_seconds()
+
+
+def last_completed_trading_day(now: Optional[datetime] = None) -> date:
+    """
+    最近一个已收盘的交易日
+
+    交易日15:00之后为当天，否则为上一个交易日
+    """
+    now = now or beijing_now()
+    if is_trading_day(now.date()) and now.time() >= MARKET_CLOSE:
+        return now.date()
+    return previous_trading_day(now.date())
+
+
+def wait_until_active(now_func: Callable[[], datetime] = beijing_now,
+                      stop_event: Optional[threading.Event] = None,
+                      max_wait: Optional[float] = None) -> float:
+    """
+    休眠到下一个活跃阶段
+
+    参数:
+        now_func: 返回当前北京时间
+        stop_event: 设置后立即返回
+        max_wait: 最长等待秒数
+
+    返回:
+        计划等待的秒数（stop_event 被设置时会提前返回）
+    """
+    wait = seconds_until_active(now_func())
+    if max_wait is not None:
+        wait = min(wait, max_wait)
+    if wait <= 0:
+        return 0.0
+
+    if stop_event is None:
+        stop_event = threading.Event()
+    stop_event.wait(wait)
+    return wait
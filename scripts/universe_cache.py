@@ -0,0 +1,149 @@
+"""
+A股列表快照（磁盘缓存）
+全市场列表按列保存为 NumPy .npz 文件（字符串列为UTF-8字节），
+在下一个交易日开盘前一直有效；同一天内重复扫描不再请求列表接口
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .trading_session import beijing_now, next_session_start
+except ImportError:
+    from trading_session import beijing_now, next_session_start
+
+
+# 默认缓存目录，可通过环境变量 STOCK_CACHE_DIR 修改
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ai_trade')
+
+
+def _to_columns(records: List[Dict]) -> Dict[str, np.ndarray]:
+    """字典列表转为列数组；字符串列编码为UTF-8字节"""
+    columns = list(records[0])
+    arrays = {}
+    str_columns = []
+    for key in columns:
+        values = [record.get(key) for record in records]
+        if all(isinstance(v, str) for v in values):
+            arrays[key] = np.array([v.encode('utf-8') for v in values])
+            str_columns.append(key)
+        else:
+            arrays[key] = np.asarray([0 if v is None else v for v in values])
+    arrays['__columns__'] = np.array(columns)
+    arrays['__str_columns__'] = np.array(str_columns, dtype='U32')
+    return arrays
+
+
+def _from_columns(data) -> List[Dict]:
+    """列数组还原为字典列表（值为Python原生类型）"""
+    columns = data['__columns__'].tolist()
+    str_columns = set(data['__str_columns__'].tolist())
+    values = []
+    for key in columns:
+        column = data[key]
+        values.append(np.char.decode(column, 'utf-8').tolist() if key in str_columns else column.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+class UniverseCache:
+    """A股列表的磁盘快照"""
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 now_func: Callable[[], datetime] = beijing_now):
+        """
+        参数:
+            cache_dir: 缓存目录，默认 STOCK_CACHE_DIR 环境变量或 ~/.cache/ai_trade
+            now_func: 返回当前北京时间
+        """
+        self.cache_dir = cache_dir or os.environ.get('STOCK_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.now_func = now_func
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f'{name}.npz')
+
+    def _read(self, name: str):
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                expires_at = datetime.fromisoformat(str(data['__expires_at__']))
+                fetched_at = datetime.fromisoformat(str(data['__fetched_at__']))
+                if self.now_func() >= expires_at:
+                    return None
+                return fetched_at, expires_at, _from_columns(data)
+        except (OSError, ValueError, KeyError):
+            # 文件损坏或格式不兼容，视为没有快照
+            return None
+
+    def load(self, name: str) -> Optional[List[Dict]]:
+        """读取有效快照，不存在或已过期返回None"""
+        entry = self._read(name)
+        return entry[2] if entry else None
+
+    def load_with_time(self, name: str) -> Optional[Tuple[datetime, List[Dict]]]:
+        """读取有效快照及其获取时间 (fetched_at, records)，不存在或已过期返回None"""
+        entry = self._read(name)
+        return (entry[0], entry[2]) if entry else None
+
+    def save(self, name: str, records: List[Dict]):
+        """保存快照，有效期到下一个交易日开盘"""
+        if not records:
+            return
+        now = self.now_func()
+        arrays = _to_columns(records)
+        arrays['__fetched_at__'] = np.array(now.isoformat())
+        arrays['__expires_at__'] = np.array(next_session_start(now).isoformat())
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{self.path(name)}.{os.getpid()}.tmp'
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path(name))
+
+    def get_or_fetch(self, name: str, fetch: Callable[[], List[Dict]], refresh: bool = False) -> List[Dict]:
+        """
+        有有效快照时直接返回，否则调用 fetch() 获取并保存
+
+        参数:
+            refresh: 忽略已有快照，强制重新获取
+        """
+        if not refresh:
+            records = self.load(name)
+            if records is not None:
+                return records
+        records = fetch()
+        self.save(name, records)
+        return records
+
+    def invalidate(self, name: str):
+        """删除快照"""
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def info(self, name: str) -> Optional[Dict]:
+        """快照信息（获取时间、过期时间、条数），无有效快照返回None"""
+        entry = self._read(name)
+        if entry is None:
+            return None
+        fetched_at, expires_at, records = entry
+        return {'fetched_at': fetched_at, 'expires_at': expires_at, 'count': len(records)}
+
+
+# 全局实例
+_universe_cache = None
+
+
+def get_universe_cache() -> UniverseCache:
+    """获取全局列表快照实例"""
+    global _universe_cache
+    if _universe_cache is None:
+        _universe_cache = UniverseCache()
+    return _universe_cache
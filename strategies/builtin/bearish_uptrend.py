@@ -12,6 +12,8 @@ STRATEGY_AUTHOR = "System"
 STRATEGY_VERSION = "1.0.0"
 STRATEGY_CATEGORY = "builtin"
 STRATEGY_TAGS = ["阴线", "高换手", "上升趋势", "回调"]
+# 筛选读取的行情字段（扫描器据此在列表请求中一并获取，均线等指标除外）
+STRATEGY_FIELDS = ['current_price', 'open_price']
 
 
 def get_default_params():
@@ -12,6 +12,8 @@ STRATEGY_AUTHOR = "System"
 STRATEGY_VERSION = "1.0.0"
 STRATEGY_CATEGORY = "builtin"
 STRATEGY_TAGS = ["金叉", "均线", "买入信号"]
+# 筛选读取的行情字段（扫描器据此在列表请求中一并获取，均线等指标除外）
+STRATEGY_FIELDS = []
 
 
 def get_default_params():
@@ -12,6 +12,8 @@ STRATEGY_AUTHOR = "AI"
 STRATEGY_VERSION = "1.0.0"
 STRATEGY_CATEGORY = "custom"
 STRATEGY_TAGS = ["筛选", "自定义"]
+# 筛选读取的行情字段（扫描器据此在列表请求中一并获取，均线等指标除外）
+STRATEGY_FIELDS = ['current_price', 'open_price']
 
 
 def get_default_params():
@@ -177,6 +177,7 @@ class StrategyGenerator:
 
         # 生成筛选逻辑
         screen_code = self._generate_screen_logic(parsed)
+        fields_code = self._generate_fields(parsed)
 
         # 使用模板
         code = f'''"""
@@ -193,6 +194,8 @@ STRATEGY_AUTHOR = "{author}"
 STRATEGY_VERSION = "1.0.0"
 STRATEGY_CATEGORY = "custom"
 STRATEGY_TAGS = ["筛选", "自定义"]
+# 筛选读取的行情字段（扫描器据此在列表请求中一并获取，均线等指标除外）
+STRATEGY_FIELDS = {fields_code}
 
 
 def get_default_params():
@@ -259,6 +262,21 @@ def screen(stock_data, **params):
 
         return '\n'.join(lines)
 
+    # 各条件在生成的筛选逻辑中从 stock_data 读取的字段
+    # （均线、换手率条件读取的是 params，不需要在行情列表中获取）
+    _CONDITION_FIELDS = {
+        'bearish': ('current_price', 'open_price'),
+        'bullish': ('current_price', 'open_price'),
+        'volume_above': ('volume',),
+    }
+
+    def _generate_fields(self, parsed: Dict) -> str:
+        """生成 STRATEGY_FIELDS：只列出生成的条件实际从 stock_data 读取的字段"""
+        fields = []
+        for cond in parsed.get('conditions', []):
+            fields.extend(self._CONDITION_FIELDS.get(cond.get('type'), ()))
+        return repr(list(dict.fromkeys(fields)))
+
     def _generate_params_schema(self, params: Dict) -> str:
         """生成参数模式"""
         if not params:
@@ -7,6 +7,8 @@ import json
 from typing import Dict, List, Callable, Any, Optional
 from pathlib import Path
 
+import numpy as np
+
 
 class StrategyManager:
     """战法管理器"""
@@ -71,6 +73,9 @@ class StrategyManager:
 
         if screen_func is None:
             raise AttributeError(f"战法缺少screen函数: {name}")
+        # 声明的字段附加到筛选函数上，StockScanner.scan_market 据此在列表请求中一并获取
+        if metadata['fields']:
+            screen_func.fields = tuple(metadata['fields'])
 
         # 缓存战法
         strategy_info = {
@@ -92,7 +97,8 @@ class StrategyManager:
             'author': getattr(module, 'STRATEGY_AUTHOR', 'Unknown'),
             'version': getattr(module, 'STRATEGY_VERSION', '1.0.0'),
             'category': getattr(module, 'STRATEGY_CATEGORY', 'custom'),
-            'tags': getattr(module, 'STRATEGY_TAGS', [])
+            'tags': getattr(module, 'STRATEGY_TAGS', []),
+            'fields': list(getattr(module, 'STRATEGY_FIELDS', []))
         }
         return metadata
 
@@ -125,6 +131,36 @@ class StrategyManager:
             print(f"战法执行出错 {name}: {e}")
             return False
 
+    def screen_snapshot(self, name: str, snapshot, params: Dict = None, category: str = 'custom'):
+        """
+        对全市场快照执行战法筛选
+
+        参数:
+            name: 战法名称
+            snapshot: MarketSnapshot（字段需包含战法 STRATEGY_FIELDS 声明的字段）
+            params: 战法参数（可选，默认使用default_params）
+            category: 战法类别
+
+        返回:
+            符合条件的股票组成的 MarketSnapshot 视图
+        """
+        strategy = self.load_strategy(name, category)
+        final_params = {**strategy['default_params'], **(params or {})}
+
+        matched = []
+        errors = 0
+        for position, stock_data in enumerate(snapshot.to_records()):
+            try:
+                if strategy['screen_func'](stock_data, **final_params):
+                    matched.append(position)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"战法执行出错 {name}: {e}")
+        if errors > 1:
+            print(f"战法 {name} 共 {errors} 只股票执行出错")
+        return snapshot.select(np.array(matched, dtype=np.int64))
+
     def save_strategy(self, name: str, code: str, category: str = 'custom', overwrite: bool = False) -> str:
         """
         保存战法代码
@@ -0,0 +1,142 @@
+"""
+异步客户端测试 - 使用本地替身HTTP服务
+"""
+import sys
+import os
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+pytest.importorskip('aiohttp')
+
+from scripts.async_stock_client import AsyncStockClient
+from scripts.stock_api import StockAPIError
+
+
+def tencent_line(symbol: str) -> str:
+    fields = [''] * 50
+    fields[1] = f'股票{symbol[2:]}'
+    fields[3], fields[4], fields[5], fields[6] = '10.5', '10.0', '10.1', '1000'
+    fields[33], fields[34], fields[37] = '10.8', '9.9', '1050000'
+    return f'v_{symbol}="{"~".join(fields)}";\n'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """模拟腾讯、新浪、东方财富接口"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str = 'text/plain'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path == '/tencent':
+            symbols = parsed.query[2:].split(',')
+            self._send(''.join(tencent_line(s) for s in symbols if s != 'sz999999').encode('gbk'))
+        elif parsed.path == '/sina':
+            # 新浪接口缺少 Referer 时返回403
+            if not self.headers.get('Referer'):
+                self.send_response(403)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            symbol = parsed.query[5:]
+            fields = ['新浪股票', '10.1', '10.0', '10.5', '10.8', '9.9', '10.4', '10.5', '1000', '1050000']
+            fields += [''] * 20 + ['2026-01-05', '15:00:00']
+            self._send(f'var hq_str_{symbol}="{",".join(fields)}";'.encode('gbk'))
+        elif parsed.path == '/em/stock':
+            code = query['secid'][0].split('.')[1]
+            self._send(json.dumps({'data': {'f43': 1050, 'f60': 1000, 'f58': f'东财{code}', 'f168': 512}}).encode())
+        elif parsed.path == '/em/ulist':
+            diff = [{'f12': s.split('.')[1], 'f14': 'x', 'f2': 1050, 'f18': 1000, 'f8': 300}
+                    for s in query['secids'][0].split(',')]
+            self._send(json.dumps({'data': {'total': len(diff), 'diff': diff}}).encode())
+        elif parsed.path == '/em/clist':
+            page, size = int(query['pn'][0]), int(query['pz'][0])
+            total = 250
+            diff = [{'f12': f'{600000 + i}', 'f14': f'S{i}', 'f13': 1, 'f2': 1000, 'f3': 100,
+                     'f4': 10, 'f5': 1, 'f6': 2}
+                    for i in range((page - 1) * size, min(page * size, total))]
+            self._send(json.dumps({'data': {'total': total, 'diff': diff}}).encode())
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+
+@pytest.fixture(scope='module')
+def stand_in_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    yield {
+        'tencent': f'{base}/tencent?q=',
+        'sina': f'{base}/sina?list=',
+        'em_detail': f'{base}/em/stock',
+        'em_ulist': f'{base}/em/ulist',
+        'em_clist': f'{base}/em/clist',
+    }
+    server.shutdown()
+
+
+def test_async_quotes_and_details(stand_in_server):
+    """单只行情、批量行情与详细数据"""
+    async def run():
+        async with AsyncStockClient(base_urls=stand_in_server, limit_per_host=4) as client:
+            tencent = await client.get_stock_price('sh601318')
+            sina = await client.get_stock_price('000001', source='sina')
+            batch = await client.get_stock_prices([f'{600000 + i}' for i in range(30)] + ['999999'],
+                                                  batch_size=8)
+            detail = await client.get_stock_detail_em('601318')
+            details = await client.get_stock_details_em(['601318', '000001'])
+            return tencent, sina, batch, detail, details
+
+    tencent, sina, batch, detail, details = asyncio.run(run())
+
+    assert tencent['stock_name'] == '股票601318'
+    assert abs(tencent['change_percent'] - 5.0) < 1e-9
+    assert sina['stock_name'] == '新浪股票'
+    assert list(batch.keys()) == [f'{600000 + i}' for i in range(30)]
+    assert detail['stock_name'] == '东财601318'
+    assert detail['turnover_rate'] == 5.12
+    assert details['000001']['turnover_rate'] == 3.0
+
+
+def test_async_fan_out_and_clist(stand_in_server):
+    """信号量限制下的大量并发请求，以及分页并发获取全市场列表"""
+    async def run():
+        async with AsyncStockClient(base_urls=stand_in_server, max_concurrency=20) as client:
+            codes = [f'{600000 + i}' for i in range(200)]
+            quotes = await client.gather_bounded(client.get_stock_price, codes)
+            stocks = await client.get_all_stocks()
+            return quotes, stocks
+
+    quotes, stocks = asyncio.run(run())
+
+    assert len(quotes) == 200
+    assert all(isinstance(q, dict) for q in quotes)
+    assert len(stocks) == 250
+    assert len({s['code'] for s in stocks}) == 250
+
+
+def test_async_unknown_source(stand_in_server):
+    async def run():
+        async with AsyncStockClient(base_urls=stand_in_server) as client:
+            await client.get_stock_price('601318', source='unknown')
+
+    with pytest.raises(StockAPIError):
+        asyncio.run(run())
@@ -0,0 +1,128 @@
+"""
+批量行情测试 - 使用本地替身响应，不依赖网络
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.stock_api import StockAPIClient
+from scripts.source_router import SourceRouter
+
+
+def make_tencent_line(symbol: str, name: str, price: float, prev_close: float) -> str:
+    """构造一行腾讯行情数据"""
+    fields = [''] * 50
+    fields[0] = '1'
+    fields[1] = name
+    fields[2] = symbol[2:]
+    fields[3] = str(price)
+    fields[4] = str(prev_close)
+    fields[5] = str(prev_close)
+    fields[6] = '12345'
+    fields[9] = str(price - 0.01)
+    fields[19] = str(price + 0.01)
+    fields[30] = '20260105150000'
+    fields[31] = '15:00:00'
+    fields[33] = str(price + 0.5)
+    fields[34] = str(price - 0.5)
+    fields[37] = '98765.0'
+    return f'v_{symbol}="{"~".join(fields)}";\n'
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.encoding = None
+        self.status_code = 200
+
+
+class FakeTencentSession:
+    """记录请求URL并按代码返回行情的替身会话"""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.urls.append(url)
+        symbols = url.split('q=')[1].split(',')
+        body = ''.join(make_tencent_line(s, f'股票{s[2:]}', 10.0, 9.5)
+                       for s in symbols if s != 'sz999999')
+        return FakeResponse(body)
+
+
+def test_get_stock_prices_batches_requests():
+    """500只股票按批次请求，结果顺序与输入一致"""
+    client = StockAPIClient(use_cache=False, router=SourceRouter())
+    client.session = FakeTencentSession()
+
+    codes = [f'{600000 + i}' for i in range(250)] + [f'{i:06d}' for i in range(1, 251)]
+    quotes = client.get_stock_prices(codes, batch_size=100)
+
+    assert len(client.session.urls) == 5
+    assert list(quotes.keys()) == codes
+    first = quotes['600000']
+    assert first['stock_name'] == '股票600000'
+    assert first['current_price'] == 10.0
+    assert abs(first['change_percent'] - (10.0 - 9.5) / 9.5 * 100) < 1e-9
+
+
+def test_get_stock_prices_skips_missing_codes():
+    """无数据的代码不出现在结果中，带前缀的代码会被标准化"""
+    client = StockAPIClient(use_cache=False, router=SourceRouter())
+    client.session = FakeTencentSession()
+
+    quotes = client.get_stock_prices(['sh601318', '999999', '000001'])
+
+    assert list(quotes.keys()) == ['601318', '000001']
+
+
+class FakeJSONResponse:
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self.payload
+
+
+class FakeUlistSession:
+    """按 secids 返回东方财富列表记录的替身会话"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(params)
+        diff = []
+        for secid in params['secids'].split(','):
+            code = secid.split('.')[1]
+            diff.append({
+                'f12': code, 'f14': f'股票{code}', 'f2': 1050, 'f18': 1000,
+                'f17': 1010, 'f15': 1080, 'f16': 990, 'f5': 5000, 'f6': 5200000.0,
+                'f8': 625, 'f10': 120, 'f20': 1.2e10, 'f21': 8e9,
+                'f100': '银行', 'f124': 1767596400,
+            })
+        return FakeJSONResponse({'data': {'total': len(diff), 'diff': diff}})
+
+
+def test_get_stock_details_em_batches_and_normalizes():
+    """批量详情按批次请求，字段与单只详情一致"""
+    from scripts.stock_api_enhanced import EnhancedStockAPI
+
+    api = EnhancedStockAPI(use_cache=False, router=SourceRouter())
+    api.session = FakeUlistSession()
+
+    codes = [f'{600000 + i}' for i in range(150)]
+    details = api.get_stock_details_em(codes)
+
+    assert len(api.session.calls) == 2
+    assert list(details.keys()) == codes
+    d = details['600000']
+    assert d['current_price'] == 10.5
+    assert d['yesterday_close'] == 10.0
+    assert d['open_price'] == 10.1
+    assert abs(d['change_percent'] - 5.0) < 1e-9
+    assert d['turnover_rate'] == 6.25
+    assert d['total_market_cap'] == 1.2e10
+    assert d['industry'] == '银行'
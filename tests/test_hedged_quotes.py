@@ -0,0 +1,97 @@
+"""
+对冲请求测试 - 主数据源慢或失败时由备用数据源返回
+"""
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.stock_api import StockAPIClient, StockAPIError
+from scripts.source_metrics import LatencyHistogram
+from scripts.source_router import SourceRouter
+
+
+def make_client(tencent_delay: float, sina_delay: float, tencent_error: bool = False) -> StockAPIClient:
+    client = StockAPIClient(use_cache=False, hedge_delay=0.05, router=SourceRouter())
+
+    def tencent(code):
+        time.sleep(tencent_delay)
+        if tencent_error:
+            raise StockAPIError('tencent down')
+        return {'stock_code': code, 'source': 'tencent'}
+
+    def sina(code):
+        time.sleep(sina_delay)
+        return {'stock_code': code, 'source': 'sina'}
+
+    client.get_stock_price_tencent = tencent
+    client.get_stock_price_sina = sina
+    return client
+
+
+def test_fast_primary_is_not_hedged():
+    client = make_client(0.0, 0.0)
+    assert client.get_stock_price('601318', hedge=True)['source'] == 'tencent'
+    assert client.hedge_stats['hedged'] == 0
+
+
+def test_slow_primary_hedges_to_secondary():
+    client = make_client(1.0, 0.0)
+    start = time.perf_counter()
+    result = client.get_stock_price('601318', hedge=True)
+    assert result['source'] == 'sina'
+    assert time.perf_counter() - start < 0.5
+    assert client.hedge_stats == {'requests': 1, 'hedged': 1, 'secondary_wins': 1}
+
+
+def test_failed_primary_falls_back_immediately():
+    client = make_client(0.0, 0.0, tencent_error=True)
+    assert client.get_stock_price_hedged('601318')['source'] == 'sina'
+
+
+def test_both_sources_fail():
+    client = make_client(0.0, 0.0, tencent_error=True)
+
+    def sina(code):
+        raise StockAPIError('sina down')
+
+    client.get_stock_price_sina = sina
+    with pytest.raises(StockAPIError):
+        client.get_stock_price_hedged('601318')
+
+
+def test_latency_histogram_percentile():
+    histogram = LatencyHistogram()
+    for _ in range(95):
+        histogram.record(0.010)
+    for _ in range(5):
+        histogram.record(2.0)
+
+    assert 0.010 <= histogram.percentile(0.95) < 0.013
+    assert histogram.percentile(0.99) >= 2.0
+    assert histogram.snapshot()['count'] == 100
+
+
+def test_hedge_stats_are_consistent_under_concurrency():
+    from concurrent.futures import ThreadPoolExecutor
+
+    client = make_client(0.0, 0.0)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda i: client.get_stock_price_hedged(f'{600000 + i}'), range(400)))
+    assert client.hedge_stats['requests'] == 400
+
+
+def test_hedges_are_not_queued_behind_hung_primaries():
+    """超过线程池大小的并发请求主数据源都挂起时，备用请求仍能及时返回"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    client = make_client(1.0, 0.0)
+    callers = client.HEDGE_WORKERS + 4
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(lambda i: client.get_stock_price_hedged(f'{600000 + i}'), range(callers)))
+    assert time.perf_counter() - start < 0.5
+    assert {r['source'] for r in results} == {'sina'}
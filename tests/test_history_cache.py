@@ -0,0 +1,56 @@
+"""
+历史K线缓存测试 - 容量淘汰、有效期与并发访问
+"""
+import sys
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.stock_ma_data import HistoryCache
+
+NOW = datetime(2026, 1, 5, 16, 0)
+NEXT_OPEN = datetime(2026, 1, 6, 9, 15)
+
+
+def test_lru_eviction_and_expiry():
+    cache = HistoryCache(max_size=2)
+    df = pd.DataFrame({'收盘': [10.0, 10.5]})
+    cache.set(('600000', 60), df, NEXT_OPEN)
+    cache.set(('600001', 60), df, NEXT_OPEN)
+
+    # 读取后 600000 变为最近使用，写入第三条时淘汰 600001
+    assert cache.get(('600000', 60), NOW).equals(df)
+    cache.set(('600002', 60), df, NEXT_OPEN)
+    assert len(cache) == 2
+    assert cache.get(('600001', 60), NOW) is None
+
+    # 返回副本，修改不影响缓存
+    copy = cache.get(('600000', 60), NOW)
+    copy.loc[0, '收盘'] = 0
+    assert cache.get(('600000', 60), NOW).loc[0, '收盘'] == 10.0
+
+    # 到下一个交易日开盘后过期
+    assert cache.get(('600000', 60), NEXT_OPEN) is None
+    assert len(cache) == 1
+
+
+def test_concurrent_access_stays_bounded():
+    cache = HistoryCache(max_size=50)
+    df = pd.DataFrame({'收盘': [1.0]})
+
+    def worker(offset):
+        for i in range(200):
+            key = (f'{600000 + (offset * 200 + i) % 120}', 60)
+            cache.set(key, df, NEXT_OPEN)
+            cache.get(key, NOW)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
@@ -0,0 +1,147 @@
+"""
+全市场列式快照测试 - 索引、视图、排行与保存
+"""
+import sys
+import os
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.market_snapshot import MarketSnapshot
+from scripts.stock_scanner import StockScanner
+from scripts.universe_cache import UniverseCache
+
+FETCHED = datetime(2026, 1, 5, 15, 0)
+INDUSTRIES = ['银行', '保险', '半导体', '白酒']
+
+
+def make_stocks(n: int = 1000):
+    return [{
+        'code': f'{600000 + i}' if i % 2 else f'{i:06d}',
+        'name': f'股票{i}',
+        'market': i % 2,
+        'current': 10 + i / 100,
+        'change_percent': (i * 37 % 200 - 100) / 10,
+        'volume': i * 10,
+        'turnover': float(i * 1000),
+        'industry': INDUSTRIES[i % 4],
+    } for i in range(n)]
+
+
+def test_code_lookup_and_columns():
+    stocks = make_stocks()
+    snapshot = MarketSnapshot.from_stocks(stocks, FETCHED)
+
+    assert len(snapshot) == 1000
+    assert 'change_percent' in snapshot and '600001' not in snapshot
+    assert snapshot.get('600001') == stocks[1]
+    assert snapshot.get('999999') is None
+    assert snapshot.row('000002') == 2
+    assert snapshot.rows(['600003', 'x']).tolist() == [3, -1]
+    # 全量快照取列不复制
+    assert snapshot['volume'] is snapshot.columns['volume']
+
+
+def test_secondary_indexes_and_views_share_columns():
+    stocks = make_stocks()
+    snapshot = MarketSnapshot.from_stocks(stocks, FETCHED)
+
+    shanghai = snapshot.by_market(1)
+    assert len(shanghai) == 500
+    assert shanghai.columns['volume'] is snapshot.columns['volume']
+
+    banks = shanghai.by_industry('保险')
+    assert len(banks) == 250
+    assert all(s['industry'] == '保险' and s['market'] == 1 for s in banks.to_records())
+    assert banks.get('600001')['name'] == '股票1'
+    assert not banks.has_code('000000')
+    assert len(snapshot.by_industry('不存在')) == 0
+
+
+def test_missing_values_in_indexed_fields():
+    stocks = make_stocks(8)
+    stocks[2]['industry'] = None
+    del stocks[5]['industry']
+    stocks[3]['market'] = None
+    snapshot = MarketSnapshot.from_stocks(stocks, FETCHED)
+
+    assert snapshot.by_industry('银行').codes == ['000000', '000004']
+    assert snapshot.by_industry('').codes == ['000002', '600005']
+    assert snapshot.by_market(1).codes == ['600001', '600005', '600007']
+    assert snapshot.where('market', None).codes == ['600003']
+
+
+def test_filter_and_top_k():
+    stocks = make_stocks()
+    snapshot = MarketSnapshot.from_stocks(stocks, FETCHED)
+
+    rising = snapshot.filter('change_percent > 9')
+    expected = [s['code'] for s in stocks if s['change_percent'] > 9]
+    assert rising.codes == expected
+
+    top = snapshot.top('turnover', 5)
+    assert [s['turnover'] for s in top.to_records()] == [999000.0, 998000.0, 997000.0, 996000.0, 995000.0]
+
+    bottom = rising.top('change_percent', 3, ascending=True)
+    ordered = sorted((s for s in stocks if s['change_percent'] > 9), key=lambda s: s['change_percent'])
+    assert [s['change_percent'] for s in bottom] == [s['change_percent'] for s in ordered[:3]]
+    assert len(snapshot.top('volume', 5000)) == 1000
+
+
+def test_save_and_load(tmp_path):
+    stocks = make_stocks(50)
+    for stock in stocks:
+        stock['pe'] = 12.5
+    stocks[6]['pe'] = None  # 缺失值保存为 NaN
+    snapshot = MarketSnapshot.from_stocks(stocks, FETCHED)
+
+    path = str(tmp_path / 'snapshot.npz')
+    snapshot.by_market(0).save(path)
+    loaded = MarketSnapshot.load(path)
+
+    assert loaded.fetched_at == FETCHED
+    assert len(loaded) == 25
+    assert loaded.get('000004') == stocks[4]
+    assert np.isnan(loaded.get('000006')['pe'])
+
+
+def test_scanner_strategy_and_assistant_consume_snapshot(tmp_path):
+    from tests.test_stock_scanner import FakeClistSession
+    from strategies.strategy_manager import get_strategy_manager
+    from assistant.ai_stock_assistant import AIStockAssistant
+
+    cache = UniverseCache(str(tmp_path), now_func=lambda: FETCHED)
+    scanner = StockScanner(now_func=lambda: FETCHED, snapshot_cache=cache)
+    scanner.session = FakeClistSession(total=250, delay=0)
+
+    snapshot = scanner.get_snapshot()
+    assert len(snapshot) == 250 and snapshot.fetched_at == FETCHED
+    assert len(scanner.scan_market(mask_func='volume >= 24500', universe=snapshot)) == 5
+
+    stocks = make_stocks(100)
+    for i, stock in enumerate(stocks):
+        # 奇数行为阴线（开盘价高于现价）
+        stock.update(current_price=stock['current'], open_price=stock['current'] + (0.5 if i % 2 else -0.5),
+                     turnover_rate=stock['volume'] / 100)
+    matched = get_strategy_manager().screen_snapshot(
+        '王子战法', MarketSnapshot.from_stocks(stocks), params={'ma5': 11, 'ma20': 10, 'turnover_rate': 6})
+    assert matched.codes == [s['code'] for s in stocks[1::2]]
+
+    overview = AIStockAssistant().get_market_overview(MarketSnapshot.from_stocks(stocks), top_n=3)
+    assert overview['rising'] + overview['falling'] + overview['flat'] == 100
+    assert [s['turnover'] for s in overview['top_turnover']] == [99000.0, 98000.0, 97000.0]
+    assert overview['top_gainers'][0]['change_percent'] == max(s['change_percent'] for s in stocks)
+
+    # 不传快照时使用扫描器的当前快照：盘中较早的磁盘快照不再使用
+    trading = [datetime(2026, 1, 6, 10, 0)]
+    scanner = StockScanner(now_func=lambda: trading[0],
+                           snapshot_cache=UniverseCache(str(tmp_path), now_func=lambda: trading[0]))
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assistant = AIStockAssistant(scanner=scanner)
+    assert assistant.get_market_overview()['total'] == 250
+    trading[0] = datetime(2026, 1, 6, 14, 30)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assistant.get_market_overview()
+    assert scanner.session.pages
@@ -0,0 +1,83 @@
+"""
+行情缓存测试 - 交易时段有效期、LRU淘汰、命中统计
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.quote_cache import QuoteCache, session_ttl
+from scripts.stock_api import StockAPIClient
+from scripts.source_router import SourceRouter
+
+
+class FakeClock:
+    """可控的单调时钟（其他测试共用）"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_session_ttl_by_phase():
+    # 2026-01-05 是周一
+    assert session_ttl(datetime(2026, 1, 5, 10, 0), 3) == 3
+    assert session_ttl(datetime(2026, 1, 5, 14, 0), 3) == 3
+    # 午间休市：缓存到13:00
+    assert session_ttl(datetime(2026, 1, 5, 12, 0), 3) == 3600
+    # 开盘前：缓存到9:15
+    assert session_ttl(datetime(2026, 1, 5, 9, 0), 3) == 900
+    # 收盘后：缓存到次日9:15
+    assert session_ttl(datetime(2026, 1, 5, 15, 0), 3) == 18 * 3600 + 15 * 60
+    # 周五收盘后：缓存到下周一9:15
+    assert session_ttl(datetime(2026, 1, 9, 16, 0), 3) == (2 * 24 + 17) * 3600 + 15 * 60
+
+
+def test_cache_expiry_and_lru():
+    clock = FakeClock(1000.0)
+    cache = QuoteCache(max_size=2, live_ttl=3,
+                       now_func=lambda: datetime(2026, 1, 5, 10, 0), clock=clock)
+
+    cache.set('a', {'v': 1})
+    cache.set('b', {'v': 2})
+    assert cache.get('a') == {'v': 1}
+    cache.set('c', {'v': 3})   # 淘汰最久未使用的 b
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 1}
+
+    clock.now += 3
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 2
+    assert stats['evictions'] == 1
+
+
+def test_cache_returns_copies():
+    cache = QuoteCache(now_func=lambda: datetime(2026, 1, 5, 12, 0))
+    cache.set('a', {'v': 1})
+    cache.get('a')['v'] = 99
+    assert cache.get('a') == {'v': 1}
+
+
+def test_client_get_stock_price_uses_cache():
+    """同一代码多次查询只请求一次"""
+    calls = []
+    cache = QuoteCache(now_func=lambda: datetime(2026, 1, 5, 12, 0))
+    client = StockAPIClient(cache=cache, router=SourceRouter())
+
+    def fake_fetch(code):
+        calls.append(code)
+        return {'stock_code': code, 'current_price': 10.0}
+
+    client.get_stock_price_tencent = fake_fetch
+
+    for _ in range(5):
+        assert client.get_stock_price('sh601318')['current_price'] == 10.0
+
+    assert calls == ['601318']
+    assert cache.stats()['hits'] == 4
@@ -0,0 +1,87 @@
+"""
+统一行情数据结构测试
+"""
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.quote_models import Quote, QuoteBatch, QUOTE_FIELDS
+from scripts.quote_parser import parse_tencent_batch
+
+
+TENCENT_DICT = {
+    'stock_code': '601318', 'stock_name': '中国平安', 'current_price': 52.5,
+    'yesterday_close': 50.0, 'open_price': 50.1, 'volume': 123456,
+    'turnover': 65000.5, 'high_price': 53.0, 'low_price': 49.9,
+    'buy1_price': 52.49, 'sell1_price': 52.5, 'date': '20260105150000',
+    'time': '15:00:00', 'change_percent': 5.0,
+}
+
+EM_DICT = {
+    'stock_code': '000001', 'stock_name': '平安银行', 'current_price': 10.5,
+    'open_price': 10.1, 'yesterday_close': 10.0, 'high_price': 10.8, 'low_price': 9.9,
+    'volume': 5000, 'turnover_amount': 5200000.0, 'change_percent': 5.0,
+    'total_market_cap': 1.2e10, 'circulating_market_cap': 8e9, 'turnover_rate': 6.25,
+    'industry': '银行', 'timestamp': 1767596400, 'change_amount': 0.5,
+}
+
+
+def test_quote_uses_slots():
+    quote = Quote('601318')
+    assert not hasattr(quote, '__dict__')
+    assert Quote.__slots__ == QUOTE_FIELDS
+
+
+def test_from_dict_normalizes_amount_and_time():
+    tencent = Quote.from_dict(TENCENT_DICT)
+    assert tencent.amount == 650005000.0
+    assert tencent.timestamp == 1767596400
+
+    sina = Quote.from_dict({**TENCENT_DICT, 'turnover': 65000.5,
+                            'date': '2026-01-05', 'time': '15:00:00'}, source='sina')
+    assert sina.amount == tencent.amount
+    assert sina.timestamp == tencent.timestamp
+
+    em = Quote.from_dict(EM_DICT)
+    assert em.amount == 5200000.0
+    assert em.industry == '银行'
+
+
+def test_to_dict_keeps_legacy_keys():
+    d = Quote.from_dict(EM_DICT).to_dict()
+    for key, value in EM_DICT.items():
+        assert d[key] == value
+    assert d['turnover'] == d['turnover_amount']
+    assert (d['date'], d['time']) == ('2026-01-05', '15:00:00')
+
+
+def test_batch_lookup_and_columns():
+    batch = QuoteBatch.from_dicts([TENCENT_DICT, EM_DICT])
+
+    assert len(batch) == 2
+    assert batch.codes == ['601318', '000001']
+    assert '000001' in batch and '600000' not in batch
+    assert batch['000001'] == Quote.from_dict(EM_DICT)
+    assert batch.get('600000') is None
+    assert batch.column('amount').dtype == np.float64
+
+    selected = batch.select(batch.column('turnover_rate') > 1)
+    assert selected.codes == ['000001']
+    assert selected.to_dicts()[0]['industry'] == '银行'
+
+
+def test_batch_from_parser_array():
+    fields = [''] * 50
+    fields[1] = '中国平安'
+    fields[3], fields[4], fields[5], fields[6] = '52.50', '50.00', '50.10', '123456'
+    fields[37] = '65000.5'
+    raw = f'v_sh601318="{"~".join(fields)}";\n'.encode('gbk')
+
+    batch = QuoteBatch.from_array(parse_tencent_batch(raw), source='tencent')
+    quote = batch['601318']
+    assert quote.stock_name == '中国平安'
+    assert quote.amount == 650005000.0
+    assert abs(quote.change_percent - 5.0) < 1e-9
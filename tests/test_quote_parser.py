@@ -0,0 +1,116 @@
+"""
+向量化行情解析测试 - 与逐字典解析结果对比
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.quote_parser import parse_tencent_batch, parse_sina_batch, _repair_names, _RECORD_RE
+from scripts.stock_api import _parse_tencent_fields, _parse_sina_fields, _TENCENT_LINE_RE
+
+
+def make_tencent_payload(n: int) -> bytes:
+    lines = []
+    for i in range(n):
+        code = f'{600000 + i}'
+        fields = [''] * 88
+        fields[0] = '1'
+        fields[1] = f'测试{i}'
+        fields[2] = code
+        fields[3] = f'{10 + i * 0.01:.2f}'
+        fields[4] = '10.00'
+        fields[5] = '9.95'
+        fields[6] = str(1000 + i)
+        fields[9] = '10.01'
+        fields[19] = '10.02'
+        fields[30] = '20260105150000'
+        fields[31] = '15:00:00'
+        fields[33] = '10.50'
+        fields[34] = '9.80'
+        fields[37] = '123456.78'
+        lines.append(f'v_sh{code}="{"~".join(fields)}";\n')
+    return ''.join(lines).encode('gbk')
+
+
+def test_tencent_batch_matches_dict_path():
+    raw = make_tencent_payload(50)
+    arr = parse_tencent_batch(raw)
+
+    expected = [_parse_tencent_fields(symbol[2:], data.split('~'))
+                for symbol, data in _TENCENT_LINE_RE.findall(raw.decode('gbk'))]
+
+    assert len(arr) == len(expected) == 50
+    for row, quote in zip(arr, expected):
+        assert row['stock_code'] == quote['stock_code']
+        assert row['stock_name'] == quote['stock_name']
+        for column in ('current_price', 'yesterday_close', 'open_price', 'volume', 'turnover',
+                       'high_price', 'low_price', 'buy1_price', 'sell1_price'):
+            assert row[column] == quote[column]
+        assert abs(row['change_percent'] - quote['change_percent']) < 1e-9
+
+
+def test_tencent_name_with_tilde_trail_byte():
+    """名称的GBK第二字节为0x7E时仍能正确切分"""
+    name = '亊'  # GBK 编码为 0x81 0x7E
+    assert name.encode('gbk')[1:] == b'~'
+    fields = [''] * 88
+    fields[1], fields[3], fields[4] = name, '11.00', '10.00'
+    raw = ('v_sz000001="' + '~'.join(fields) + '";\n').encode('gbk') + make_tencent_payload(1)
+
+    arr = parse_tencent_batch(raw)
+
+    assert arr[0]['stock_name'] == name
+    assert arr[0]['current_price'] == 11.0
+    assert abs(arr[0]['change_percent'] - 10.0) < 1e-9
+
+
+def test_sina_batch_matches_dict_path():
+    fields = ['平安银行', '10.10', '10.00', '10.50', '10.80', '9.90', '10.49', '10.50',
+              '123400', '1300000.5'] + ['0'] * 20 + ['2026-01-05', '15:00:00', '00']
+    raw = (f'var hq_str_sz000001="{",".join(fields)}";\n'
+           f'var hq_str_sh600000="";\n').encode('gbk')
+
+    arr = parse_sina_batch(raw)
+    quote = _parse_sina_fields('000001', fields)
+
+    assert len(arr) == 1
+    assert arr[0]['stock_code'] == '000001'
+    assert arr[0]['stock_name'] == quote['stock_name']
+    assert arr[0]['volume'] == quote['volume']
+    assert arr[0]['turnover'] == quote['turnover']
+    assert abs(arr[0]['change_percent'] - quote['change_percent']) < 1e-9
+
+    # 新浪成交额统一为万元，按默认（腾讯）单位换算回元不会放大
+    from scripts.quote_models import Quote
+    assert abs(quote['turnover'] - 130.00005) < 1e-9
+    assert abs(Quote.from_dict(quote).amount - 1300000.5) < 1e-6
+
+
+def test_mixed_widths_and_bad_values():
+    """同一响应中字段数不同的行分别定位；含 '-' 的行被丢弃，其余行不受影响"""
+    lines = make_tencent_payload(4).decode('gbk').splitlines(keepends=True)
+    # 第2行多两个字段（如ETF），第3行现价为 '-'（停牌）
+    lines[1] = lines[1].replace('";', '~x~y";')
+    fields = lines[2].split('"')[1].split('~')
+    fields[3] = '-'
+    lines[2] = f'v_sh600002="{"~".join(fields)}";\n'
+    raw = ''.join(lines).encode('gbk')
+
+    arr = parse_tencent_batch(raw)
+    assert arr['stock_code'].tolist() == ['600000', '600001', '600003']
+    assert arr['stock_name'].tolist() == ['测试0', '测试1', '测试3']
+    assert arr['current_price'].tolist() == [10.0, 10.01, 10.03]
+    assert arr['turnover'].tolist() == [123456.78] * 3
+
+
+def test_clean_rows_skip_name_repair():
+    """名称未被误切的行不走逐行GBK重新切分"""
+    records = [(code.decode(), body) for code, body in _RECORD_RE.findall(make_tencent_payload(3))]
+    bodies = [body for _, body in records]
+    assert _repair_names([code for code, _ in records], bodies, b'~', 1, 2) == {}
+    assert bodies == [body for _, body in records]
+
+
+def test_empty_payload():
+    assert len(parse_tencent_batch(b'v_pv_none_match="1";\n')) == 0
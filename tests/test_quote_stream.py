@@ -0,0 +1,130 @@
+"""
+SSE行情推送测试 - 使用本地替身SSE服务
+"""
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.quote_stream import QuoteStream, iter_sse_data
+
+
+def event(payload: dict) -> bytes:
+    return f'data: {json.dumps(payload)}\n\n'.encode()
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """第一次连接推送全量+增量后断开；之后的连接推送新的全量并保持连接"""
+
+    protocol_version = 'HTTP/1.0'
+    connections = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        secids = query['secids'][0].split(',')
+        SSEHandler.connections.append(secids)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+
+        codes = [secid.split('.')[1] for secid in secids]
+        first = len(SSEHandler.connections) == 1
+        price = 1050 if first else 1100
+        full = {str(i): {'f12': code, 'f14': f'股票{code}', 'f2': price, 'f18': 1000, 'f8': 300}
+                for i, code in enumerate(codes)}
+        self.wfile.write(event({'rc': 0, 'full': 1, 'data': {'total': len(codes), 'diff': full}}))
+        self.wfile.flush()
+
+        if first:
+            # 心跳注释 + 格式错误的消息 + 只带序号和变化字段的增量
+            self.wfile.write(b': heartbeat\n\n')
+            self.wfile.write(b'data: {"rc": 0, "data": \n\n')
+            self.wfile.write(event({'rc': 0, 'full': 0, 'data': {'diff': {'1': {'f2': 1080, 'f8': 450}}}}))
+            self.wfile.flush()
+            return
+
+        try:
+            for _ in range(50):
+                time.sleep(0.1)
+                self.wfile.write(b': heartbeat\n\n')
+                self.wfile.flush()
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def sse_server():
+    SSEHandler.connections = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SSEHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/api/qt/ulist/sse'
+    server.shutdown()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_iter_sse_data():
+    lines = [': ping', 'data: {"a": 1}', '', 'event: x', 'data: line1', 'data: line2', '', 'data: tail']
+    assert list(iter_sse_data(lines)) == ['{"a": 1}', 'line1\nline2', 'tail']
+
+
+def test_stream_applies_updates_and_reconnects(sse_server):
+    updates = []
+    stream = QuoteStream(['600000', '000001'], url=sse_server, backoff=0.05,
+                         on_update=updates.append)
+    with stream:
+        # 第一次连接：全量 -> 增量（000001 价格变化）-> 断开 -> 重连后新的全量
+        assert wait_for(lambda: stream.stats['connections'] >= 2)
+        assert wait_for(lambda: stream.get_quote('600000')['current_price'] == 11.0)
+
+    # 格式错误的消息计入 errors，之后的增量仍在同一连接上收到
+    assert updates[0] == ['600000', '000001']
+    assert updates[1] == ['000001']
+    assert stream.stats['errors'] >= 1
+    assert stream.stats['reconnects'] >= 1
+
+    d = stream.get_quote('000001')
+    assert d['stock_name'] == '股票000001'
+    assert d['current_price'] == 11.0
+    assert d['change_percent'] == pytest.approx(10.0)
+    assert stream.table.raw('000001')['f8'] == 300
+    assert stream.get_stats()['groups'] == 1
+
+
+def test_one_connection_per_group(sse_server):
+    codes = [f'{600000 + i}' for i in range(5)]
+    stream = QuoteStream(codes, group_size=2, url=sse_server, backoff=0.05)
+    with stream:
+        assert wait_for(lambda: len(stream.table) == 5)
+
+    first_connections = sorted(SSEHandler.connections[:3], key=len)
+    assert [len(secids) for secids in first_connections] == [1, 2, 2]
+    assert set(stream.get_quotes()) == set(codes)
+
+
+def test_backoff_on_refused_connection():
+    stream = QuoteStream(['600000'], url='http://127.0.0.1:9/sse', backoff=0.01, max_backoff=0.02)
+    with stream:
+        assert wait_for(lambda: stream.stats['errors'] >= 3)
+    assert stream.stats['connections'] == 0
+    assert stream.last_error is not None
@@ -0,0 +1,104 @@
+"""
+行情订阅测试 - 使用替身客户端，不依赖网络
+"""
+import sys
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.quote_parser import QUOTE_DTYPE
+from scripts.quote_subscription import QuoteSubscription
+
+# 2026-01-05（周一）10:00，连续竞价中
+TRADING = lambda: datetime(2026, 1, 5, 10, 0)
+
+
+class FakeClient:
+    """按预设的快照序列返回行情数组"""
+
+    def __init__(self, snapshots):
+        self.snapshots = list(snapshots)
+        self.requests = []
+
+    def get_stock_prices_array(self, codes, batch_size=100):
+        self.requests.append(list(codes))
+        prices = self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+        array = np.zeros(len(codes), dtype=QUOTE_DTYPE)
+        array['stock_code'] = codes
+        for i, code in enumerate(codes):
+            array['current_price'][i], array['volume'][i] = prices.get(code, (0.0, 0))
+        return array
+
+
+def test_only_changed_symbols_are_emitted():
+    client = FakeClient([
+        {'600000': (10.0, 100), '000001': (12.0, 200), '300750': (200.0, 50)},
+        {'600000': (10.0, 100), '000001': (12.1, 260), '300750': (200.0, 50)},
+        {'600000': (10.0, 150), '000001': (12.1, 260), '300750': (200.0, 50)},
+        {'600000': (10.0, 150), '000001': (12.1, 260), '300750': (200.0, 50)},
+    ])
+    received = []
+    sub = QuoteSubscription(['sh600000', '000001', '300750'], callback=received.append, client=client)
+
+    assert len(sub.poll_once()) == 3           # 首次轮询全部视为变化
+    assert sub.poll_once().codes == ['000001']  # 价格和成交量变化
+    assert sub.poll_once().codes == ['600000']  # 只有成交量变化
+    assert len(sub.poll_once()) == 0
+
+    assert [batch.codes for batch in received] == [
+        ['600000', '000001', '300750'], ['000001'], ['600000']]
+    assert sub.get_stats() == {'polls': 4, 'changed': 5, 'errors': 0, 'codes': 3}
+
+
+def test_added_codes_count_as_changed():
+    client = FakeClient([{'600000': (10.0, 100), '000001': (12.0, 200)}])
+    sub = QuoteSubscription(['600000'], client=client)
+    sub.poll_once()
+
+    sub.add_codes(['000001'])
+    assert sub.poll_once().codes == ['000001']
+
+    sub.remove_codes(['600000'])
+    sub.poll_once()
+    assert client.requests[-1] == ['000001']
+
+
+def test_background_polling_and_errors():
+    client = FakeClient([{'600000': (10.0, 100)}])
+    calls = []
+    sub = QuoteSubscription(['600000'], callback=calls.append, interval=0.01, client=client,
+                            now_func=TRADING)
+
+    with sub:
+        deadline = time.time() + 2
+        while sub.stats['polls'] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+    assert sub.stats['polls'] >= 3
+    assert len(calls) == 1
+
+    def broken(codes, batch_size=100):
+        raise RuntimeError('network down')
+
+    client.get_stock_prices_array = broken
+    sub = QuoteSubscription(['600000'], interval=0.01, client=client, now_func=TRADING)
+    sub.run(max_polls=2)
+    assert sub.stats['errors'] == 2
+    assert isinstance(sub.last_error, RuntimeError)
+
+
+def test_no_polling_while_market_closed():
+    """休市期间取得首个快照后不再轮询，直到被停止"""
+    client = FakeClient([{'600000': (10.0, 100)}])
+    sub = QuoteSubscription(['600000'], interval=0.01, client=client,
+                            now_func=lambda: datetime(2026, 1, 5, 12, 0))
+    sub.start()
+    time.sleep(0.2)
+    sub.stop(timeout=1)
+
+    assert sub.stats['polls'] == 1
+    assert len(client.requests) == 1
@@ -0,0 +1,82 @@
+"""
+按主机限速测试（使用可控时钟，不访问网络）
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.rate_limiter import TokenBucket, RateLimiter, host_key, FALLBACK_LIMIT
+from tests.test_quote_cache import FakeClock
+
+
+def test_bucket_allows_burst_then_waits():
+    """桶容量内的突发请求无需等待，之后按速率排队"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5, capacity=3, clock=clock)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert abs(bucket.reserve() - 0.2) < 1e-9
+    # 欠额累积，后来者排在其后
+    assert abs(bucket.reserve() - 0.4) < 1e-9
+
+
+def test_bucket_refills_over_time():
+    """经过足够时间后令牌恢复，但不超过桶容量"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now = 0.1
+    assert bucket.reserve() == 0.0
+
+    clock.now = 100.0
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() > 0
+
+
+def test_host_key():
+    """数字前缀的镜像主机共用额度"""
+    assert host_key('https://push2.eastmoney.com/api/qt/stock/get?x=1') == 'push2.eastmoney.com'
+    assert host_key('http://80.push2.eastmoney.com/api/qt/clist/get') == 'push2.eastmoney.com'
+    assert host_key('https://qt.gtimg.cn/q=sh600000') == 'qt.gtimg.cn'
+    assert host_key('akshare') == 'akshare'
+
+
+def test_limiter_shares_bucket_per_host():
+    """同一主机的不同URL使用同一个令牌桶"""
+    limiter = RateLimiter()
+    a = limiter.bucket('https://push2.eastmoney.com/api/qt/stock/get')
+    b = limiter.bucket('http://82.push2.eastmoney.com/api/qt/clist/get')
+    assert a is b
+    assert limiter.bucket('https://qt.gtimg.cn/q=sz000001') is not a
+
+    unknown = limiter.bucket('https://example.com/')
+    assert (unknown.rate, unknown.capacity) == FALLBACK_LIMIT
+
+
+def test_set_limit_and_stats():
+    """调整额度后统计按主机汇总"""
+    limiter = RateLimiter()
+    limiter.set_limit('qt.gtimg.cn', 1000, 1000)
+    for _ in range(5):
+        assert limiter.acquire('https://qt.gtimg.cn/q=sh600000') == 0.0
+
+    stats = limiter.stats()
+    assert stats['qt.gtimg.cn']['acquired'] == 5
+    assert stats['qt.gtimg.cn']['rate'] == 1000
+
+
+def test_acquire_async_waits_without_blocking():
+    """协程版本在额度用完后排队等待"""
+    limiter = RateLimiter({'local.test': (50, 1)})
+
+    async def run():
+        return await asyncio.gather(*[limiter.acquire_async('http://local.test/x') for _ in range(3)])
+
+    waits = sorted(asyncio.run(run()))
+    assert waits[0] == 0.0
+    assert waits[1] > 0
+    assert waits[2] > waits[1]
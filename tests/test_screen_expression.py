@@ -0,0 +1,90 @@
+"""
+筛选表达式测试 - 解析、类型检查与向量化求值
+"""
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.screen_expression import (
+    ScreenExpression, ExpressionError, compile_screen, column_types, NUMBER, STRING
+)
+from scripts.stock_scanner import StockScanner, stocks_to_columns
+
+
+COLUMNS = {
+    'code': np.array(['600000', '600001', '600002', '600003']),
+    'industry': np.array(['银行', '保险', '银行', '半导体']),
+    'change_percent': np.array([5.0, 2.0, -1.0, 9.5]),
+    'turnover_rate': np.array([6.0, 8.0, 1.0, 4.0]),
+    'volume': np.array([100, 200, 0, 400]),
+    'MA5': np.array([10.0, 9.0, 8.0, 12.0]),
+    'MA20': np.array([9.0, 9.5, 8.5, 11.0]),
+}
+
+
+def mask(source: str) -> list:
+    return ScreenExpression(source)(COLUMNS).tolist()
+
+
+def test_boolean_logic_and_comparisons():
+    assert mask('change_percent > 3 and turnover_rate >= 5 and MA5 > MA20') == [True, False, False, False]
+    assert mask('change_percent > 3 or volume == 0') == [True, False, True, True]
+    assert mask('not change_percent > 3') == [False, True, True, False]
+    assert mask('0 < change_percent < 6') == [True, True, False, False]
+
+
+def test_arithmetic_functions_and_membership():
+    assert mask('MA5 / MA20 - 1 > 0.05') == [True, False, False, True]
+    assert mask('abs(change_percent) >= 2') == [True, True, False, True]
+    assert mask('max(turnover_rate, change_percent) > 7') == [False, True, False, True]
+    assert mask("industry in ('银行', '保险') and code != '600001'") == [True, False, True, False]
+    assert mask("industry not in ['银行']") == [False, True, False, True]
+
+
+def test_type_errors_are_reported_before_evaluation():
+    types = column_types(COLUMNS)
+    assert types['industry'] == STRING and types['volume'] == NUMBER
+
+    with pytest.raises(ExpressionError, match='未知字段'):
+        compile_screen('MA60 > MA20', types)
+    with pytest.raises(ExpressionError, match='类型不匹配'):
+        compile_screen("industry > 3", types)
+    with pytest.raises(ExpressionError, match='字符串'):
+        compile_screen("industry > '银行'", types)
+    with pytest.raises(ExpressionError, match='条件'):
+        compile_screen('change_percent + 1', types)
+    with pytest.raises(ExpressionError, match='不支持'):
+        compile_screen("__import__('os').system('ls')", types)
+    with pytest.raises(ExpressionError, match='语法'):
+        ScreenExpression('change_percent >')
+
+
+def test_fields_and_compile_cache():
+    expr = ScreenExpression('MA5 > MA20 and change_percent > 0')
+    assert expr.fields == {'MA5', 'MA20', 'change_percent'}
+    assert ScreenExpression('abs(change_percent) > max(MA5, 3)').fields == {'change_percent', 'MA5'}
+
+    expr(COLUMNS)
+    expr(COLUMNS)
+    assert len(expr._compiled) == 1
+
+
+def test_none_values_in_numeric_columns():
+    """尚未计算出均线的股票（None）不满足条件"""
+    columns = stocks_to_columns([{'code': '600000', 'MA5': 10.0}, {'code': '600001', 'MA5': None}])
+    assert ScreenExpression('MA5 > 5')(columns).tolist() == [True, False]
+
+
+def test_dataframe_and_scanner_integration():
+    frame = pd.DataFrame(COLUMNS)
+    assert ScreenExpression('volume >= 200')(frame).tolist() == [False, True, False, True]
+
+    scanner = StockScanner(use_snapshot=False)
+    stocks = [dict(zip(COLUMNS, values)) for values in zip(*(v.tolist() for v in COLUMNS.values()))]
+    result = scanner.scan_market(mask_func="industry == '银行' and change_percent > 0", universe=stocks)
+    assert [s['code'] for s in result] == ['600000']
@@ -0,0 +1,92 @@
+"""
+请求合并测试 - 并发相同请求只发出一次
+"""
+import sys
+import os
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.single_flight import SingleFlight
+from scripts.stock_api_enhanced import EnhancedStockAPI
+
+
+def run_concurrently(func, n: int):
+    results, errors = [], []
+    barrier = threading.Barrier(n)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(func())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_upstream_request():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'price': 10.0}
+
+    results, errors = run_concurrently(lambda: flight.do(('quote', '601318'), fetch), 10)
+
+    assert len(calls) == 1
+    assert results == [{'price': 10.0}] * 10
+    assert not errors
+    assert flight.stats() == {'executed': 1, 'shared': 9, 'in_flight': 0}
+
+
+def test_errors_fan_out_to_all_waiters():
+    flight = SingleFlight()
+
+    def fetch():
+        time.sleep(0.2)
+        raise ValueError('upstream failed')
+
+    results, errors = run_concurrently(lambda: flight.do('k', fetch), 5)
+
+    assert not results
+    assert len(errors) == 5
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.in_flight() == 0
+
+
+def test_sequential_calls_are_not_merged():
+    flight = SingleFlight()
+    assert flight.do('k', lambda: 1) == 1
+    assert flight.do('k', lambda: 2) == 2
+    assert flight.stats()['executed'] == 2
+
+
+def test_detail_requests_coalesce():
+    api = EnhancedStockAPI(use_cache=False)
+    api.flight = SingleFlight()
+    calls = []
+
+    def fetch(code):
+        calls.append(code)
+        time.sleep(0.2)
+        return {'stock_code': code}
+
+    api._fetch_stock_detail_em = fetch
+    results, _ = run_concurrently(lambda: api.get_stock_detail_em('601318'), 8)
+
+    assert calls == ['601318']
+    assert len(results) == 8
+    # 每个调用方拿到独立副本
+    results[0]['MA5'] = 1.0
+    assert 'MA5' not in results[1]
@@ -0,0 +1,300 @@
+"""
+数据源路由与熔断测试 - 使用可控时钟和替身数据源，不访问网络
+"""
+import json
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.source_router import (CircuitBreaker, SourceRouter, SourceUnavailableError,
+                                   CLOSED, OPEN, HALF_OPEN)
+from scripts.stock_api import StockAPIClient, StockAPIError
+from scripts.stock_api_enhanced import EnhancedStockAPI
+from tests.test_quote_cache import FakeClock
+
+
+def test_breaker_opens_on_error_rate():
+    breaker = CircuitBreaker(min_samples=4, error_threshold=0.5, clock=FakeClock())
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.score() == 0.0
+
+
+def test_breaker_opens_on_slow_responses():
+    breaker = CircuitBreaker(min_samples=3, slow_threshold=1.0, clock=FakeClock())
+    for _ in range(3):
+        breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_samples=1, cooldown=10, clock=clock)
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+    clock.now = 10
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # 探测请求进行中，其他请求不放行
+    assert not breaker.allow()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_doubles_cooldown():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_samples=1, cooldown=10, max_cooldown=15, clock=clock)
+    breaker.record(False, 0.1)
+
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    assert not breaker.allow()
+    clock.now = 25
+    assert breaker.allow()
+    assert breaker.snapshot()['opened_count'] == 2
+
+
+def test_router_skips_open_source():
+    router = SourceRouter(min_samples=2, cooldown=60)
+    calls = []
+
+    def fetch(source):
+        calls.append(source)
+        if source == 'a':
+            raise ValueError('a down')
+        return source
+
+    for _ in range(4):
+        assert router.route(['a', 'b'], fetch) == 'b'
+
+    # a 失败两次后熔断，之后不再请求
+    assert calls == ['a', 'b', 'a', 'b', 'b', 'b']
+    status = router.status()
+    assert status['a']['state'] == OPEN
+    assert status['b']['state'] == CLOSED
+
+
+def test_router_all_sources_fail():
+    router = SourceRouter()
+
+    def fetch(source):
+        raise ValueError(f'{source} down')
+
+    with pytest.raises(SourceUnavailableError) as info:
+        router.route(['a', 'b'], fetch)
+    assert 'a down' in str(info.value) and 'b down' in str(info.value)
+
+
+def test_client_routes_away_from_failing_source():
+    """腾讯持续失败时熔断，之后直接使用新浪"""
+    client = StockAPIClient(use_cache=False, router=SourceRouter(min_samples=3))
+    calls = []
+
+    def tencent(code):
+        calls.append('tencent')
+        raise StockAPIError('tencent down')
+
+    def sina(code):
+        calls.append('sina')
+        return {'stock_code': code, 'source': 'sina'}
+
+    client.get_stock_price_tencent = tencent
+    client.get_stock_price_sina = sina
+
+    for _ in range(5):
+        assert client.get_stock_price('601318')['source'] == 'sina'
+
+    assert calls.count('tencent') == 3
+    assert client.get_source_status()['tencent']['state'] == OPEN
+
+
+def test_client_unknown_source():
+    client = StockAPIClient(use_cache=False, router=SourceRouter())
+    with pytest.raises(StockAPIError):
+        client.get_stock_price('601318', source='unknown')
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode('gbk')
+        self.encoding = None
+        self.status_code = 200
+
+
+class FakeTencentOnlySession:
+    """东方财富返回500，腾讯正常返回"""
+
+    def get(self, url, params=None, timeout=None):
+        if 'eastmoney' in url:
+            response = FakeResponse('')
+            response.status_code = 500
+            return response
+
+        fields = [''] * 50
+        fields[1] = '中国平安'
+        fields[3], fields[4], fields[5] = '52.50', '50.00', '50.10'
+        fields[6] = '123456'
+        fields[30] = '20260105150000'
+        fields[33], fields[34] = '53.00', '49.90'
+        fields[37] = '65000.5'
+        fields[38] = '0.68'
+        fields[44], fields[45] = '5600.00', '9500.00'
+        return FakeResponse(f'v_sh601318="{"~".join(fields)}";\n')
+
+
+def test_enhanced_api_falls_back_to_tencent():
+    api = EnhancedStockAPI(use_cache=False, router=SourceRouter())
+    api.session = FakeTencentOnlySession()
+
+    d = api.get_stock_detail_em('601318')
+    assert d['stock_name'] == '中国平安'
+    assert d['current_price'] == 52.5
+    assert abs(d['change_percent'] - 5.0) < 1e-9
+    assert d['turnover_rate'] == 0.68
+    assert d['total_market_cap'] == 9.5e11
+    assert d['turnover_amount'] == 650005000.0
+    assert d['industry'] == ''
+
+    details = api.get_stock_details_em(['601318'])
+    assert details['601318']['circulating_market_cap'] == 5.6e11
+
+    status = api.get_source_status()
+    assert status['em_detail']['error_rate'] == 1.0
+    assert status['tencent']['error_rate'] == 0.0
+
+
+class FakeQuoteSession:
+    """腾讯/新浪单只行情：600000 正常返回，其他代码按“代码不存在”返回"""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        self.urls.append(url)
+        if 'gtimg' in url:
+            if not url.endswith('sh600000'):
+                return FakeResponse('v_pv_none_match="1";\n')
+            fields = [''] * 50
+            fields[1], fields[3], fields[4], fields[5] = '浦发银行', '10.50', '10.00', '10.10'
+            return FakeResponse(f'v_sh600000="{"~".join(fields)}";\n')
+        symbol = url.rsplit('=', 1)[1]
+        return FakeResponse(f'var hq_str_{symbol}="";\n')
+
+
+def test_unknown_codes_do_not_open_breakers():
+    """代码不存在属于数据错误：不计入错误率，也不换数据源重试"""
+    from scripts.source_router import DataError
+
+    client = StockAPIClient(use_cache=False, router=SourceRouter(min_samples=3))
+    client.session = FakeQuoteSession()
+
+    for _ in range(5):
+        with pytest.raises(StockAPIError) as info:
+            client.get_stock_price('99999x')
+        assert isinstance(info.value, DataError)
+
+    assert all('sinajs' not in url for url in client.session.urls)
+    status = client.get_source_status()
+    assert status['tencent']['state'] == CLOSED and status['tencent']['error_rate'] == 0.0
+    assert client.get_stock_price('600000')['current_price'] == 10.5
+
+    # 对冲请求同样不再请求备用数据源
+    with pytest.raises(StockAPIError):
+        client.get_stock_price('99999x', hedge=True)
+    assert all('sinajs' not in url for url in client.session.urls)
+
+
+def test_router_data_error_stops_fallback():
+    from scripts.source_router import DataError
+
+    router = SourceRouter(min_samples=1)
+    calls = []
+
+    def fetch(source):
+        calls.append(source)
+        raise DataError('未获取到数据')
+
+    with pytest.raises(DataError):
+        router.route(['a', 'b'], fetch)
+    assert calls == ['a']
+    assert router.status()['a']['state'] == CLOSED
+
+
+class FakeBlockedSession:
+    """按数据源返回指定状态码/响应体，其余数据源正常返回行情"""
+
+    def __init__(self, blocked: dict):
+        self.blocked = blocked
+        self.urls = []
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        self.urls.append(url)
+        for host, (status, body) in self.blocked.items():
+            if host in url:
+                response = FakeResponse(body)
+                response.status_code = status
+                response.json = lambda: json.loads(body)
+                return response
+        if 'sinajs' in url:
+            fields = ['浦发银行', '10.10', '10.00', '10.50'] + ['0'] * 26 + ['2026-01-05', '15:00:00']
+            symbols = url.rsplit('=', 1)[1].split(',')
+            return FakeResponse(''.join(f'var hq_str_{s}="{",".join(fields)}";\n' for s in symbols))
+        return FakeTencentOnlySession().get(url)
+
+
+def test_sina_403_opens_breaker_and_fails_over():
+    """新浪缺少 Referer 时返回403：计入错误率并改用腾讯"""
+    client = StockAPIClient(use_cache=False, router=SourceRouter(min_samples=2))
+    client.session = FakeBlockedSession({'sinajs': (403, 'Kinsoku jikou desu!')})
+
+    for _ in range(3):
+        assert client.get_stock_price('601318', source='sina')['stock_name'] == '中国平安'
+
+    status = client.get_source_status()
+    assert status['sina']['state'] == OPEN
+    assert status['tencent']['error_rate'] == 0.0
+
+
+def test_batch_5xx_fails_over():
+    """腾讯批量行情返回502时不能当作空结果，应改用新浪"""
+    client = StockAPIClient(use_cache=False, router=SourceRouter())
+    client.session = FakeBlockedSession({'gtimg': (502, 'Bad Gateway')})
+
+    quotes = client.get_stock_prices(['600000', '600001'])
+    assert list(quotes) == ['600000', '600001']
+    assert client.get_source_status()['tencent']['error_rate'] == 1.0
+
+    arr = client.get_stock_prices_array(['600000'])
+    assert arr[0]['current_price'] == 10.5
+
+
+def test_eastmoney_rc_error_fails_over():
+    """东方财富拒绝 ut 时返回 rc!=0：计入错误率并改用腾讯"""
+    api = EnhancedStockAPI(use_cache=False, router=SourceRouter(min_samples=2))
+    api.session = FakeBlockedSession({'eastmoney': (200, '{"rc":102,"data":null}')})
+
+    for _ in range(3):
+        assert api.get_stock_detail_em('601318')['stock_name'] == '中国平安'
+    assert api.get_stock_details_em(['601318'])['601318']['current_price'] == 52.5
+
+    status = api.get_source_status()
+    assert status['em_detail']['state'] == OPEN
+    assert status['em_ulist']['error_rate'] == 1.0
@@ -0,0 +1,434 @@
+"""
+全市场扫描器测试 - 使用替身 clist 会话，不依赖网络
+"""
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.stock_scanner import (StockScanner, CLIST_DETAIL_FIELDS, _parse_clist_item, declared_fields,
+                                   stocks_to_columns)
+
+# 2026-01-05（周一）10:00，连续竞价中
+TRADING = lambda: datetime(2026, 1, 5, 10, 0)
+
+
+class FakeJSONResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self.payload
+
+
+def make_item(i: int) -> dict:
+    code = f'{600000 + i}'
+    return {'f12': code, 'f14': f'股票{i}', 'f13': 1, 'f2': 1000 + i, 'f3': 250,
+            'f4': 25, 'f5': 100 * i, 'f6': 1e6 * i}
+
+
+class FakeClistSession:
+    """按 pn/pz 分页返回记录；每页延迟一段时间以体现并发"""
+
+    def __init__(self, total: int = 550, delay: float = 0.05, fail_pages=(), overlap: bool = False):
+        self.total = total
+        self.delay = delay
+        self.fail_pages = set(fail_pages)
+        self.overlap = overlap
+        self.pages = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        page, size = int(params['pn']), min(int(params['pz']), 100)
+        with self._lock:
+            self.pages.append(page)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if page in self.fail_pages:
+                raise ConnectionError('reset')
+            start = (page - 1) * size
+            # 模拟翻页期间排序变化：每页多带上一页最后一条
+            if self.overlap and page > 1:
+                start -= 1
+            diff = [make_item(i) for i in range(start, min(page * size, self.total))]
+            return FakeJSONResponse({'data': {'total': self.total, 'diff': diff}})
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_pages_are_fetched_concurrently():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=550, delay=0.1)
+
+    start = time.perf_counter()
+    stocks = scanner.get_all_stocks()
+    elapsed = time.perf_counter() - start
+
+    assert len(stocks) == 550
+    assert [s['code'] for s in stocks[:3]] == ['600000', '600001', '600002']
+    assert sorted(scanner.session.pages) == [1, 2, 3, 4, 5, 6]
+    assert scanner.session.max_active > 1
+    assert elapsed < 0.6  # 串行需要0.6秒以上
+
+
+def test_duplicates_across_pages_are_removed():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=350, delay=0, overlap=True)
+
+    codes = [s['code'] for s in scanner.get_all_stocks()]
+    assert len(codes) == len(set(codes)) == 350
+
+
+def test_limit_only_fetches_needed_pages():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=5500, delay=0)
+
+    stocks = scanner.get_all_stocks(limit=250)
+    assert len(stocks) == 250
+    assert sorted(scanner.session.pages) == [1, 2, 3]
+
+
+def test_failed_page_is_skipped():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=300, delay=0, fail_pages={2})
+
+    stocks = scanner.get_all_stocks()
+    assert len(stocks) == 200
+
+
+def test_parse_clist_item_scales_and_handles_suspended():
+    stock = _parse_clist_item(make_item(1))
+    assert stock['current'] == 10.01
+    assert stock['change_percent'] == 2.5
+
+    suspended = _parse_clist_item({'f12': '600001', 'f14': '停牌', 'f2': '-', 'f3': '-', 'f4': '-',
+                                   'f5': '-', 'f6': '-'})
+    assert suspended['current'] == 0 and suspended['volume'] == 0
+
+
+def test_vectorized_scan_matches_per_stock_screen():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    stocks = [_parse_clist_item(make_item(i)) for i in range(500)]
+    for i, stock in enumerate(stocks):
+        stock['change_percent'] = (i % 11) - 5
+
+    by_dict = scanner.scan_market(lambda s: s['change_percent'] > 3, universe=stocks, max_workers=4)
+    by_mask = scanner.scan_market(mask_func=lambda c: c['change_percent'] > 3, universe=stocks)
+    assert by_mask == by_dict
+    assert len(by_mask) == 90
+
+    # 列式结构可反复筛选，结果转换回原字段
+    columns = stocks_to_columns(stocks)
+    cheap = scanner.scan_market(mask_func=lambda c: (c['current'] < 10.5) & (c['volume'] > 0),
+                                universe=columns)
+    assert [s['code'] for s in cheap] == [f'{600000 + i}' for i in range(1, 50)]
+    assert cheap[0] == stocks[1]
+
+
+def test_vectorized_scan_accepts_dataframe():
+    import pandas as pd
+
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    frame = pd.DataFrame([_parse_clist_item(make_item(i)) for i in range(10)])
+    result = scanner.scan_market(mask_func=lambda df: df['volume'] >= 800, universe=frame)
+    assert [s['code'] for s in result] == ['600008', '600009']
+
+
+def test_scan_market_fetches_universe_once():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=250, delay=0)
+
+    result = scanner.scan_market(mask_func=lambda c: c['volume'] >= 24000)
+    assert [s['code'] for s in result] == ['600240', '600241', '600242', '600243', '600244',
+                                           '600245', '600246', '600247', '600248', '600249']
+    assert sorted(scanner.session.pages) == [1, 2, 3]
+
+
+def test_full_mode_matches_detail_api_without_per_stock_calls():
+    from scripts.source_router import SourceRouter
+    from scripts.stock_api_enhanced import EnhancedStockAPI
+    from tests.test_batch_quotes import FakeUlistSession
+
+    class UlistItemsAsClist(FakeUlistSession):
+        """clist 返回与 ulist 相同的记录，按 pn/pz 分页"""
+
+        def get(self, url, params=None, timeout=None):
+            page, size = int(params['pn']), int(params['pz'])
+            codes = [f'{600000 + i}' for i in range((page - 1) * size, min(page * size, 450))]
+            response = super().get(url, {'secids': ','.join(f'1.{code}' for code in codes)}, timeout)
+            self.calls[-1] = dict(params)
+            response.payload['data']['total'] = 450
+            return response
+
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = UlistItemsAsClist()
+
+    result = scanner.scan_market_with_details(lambda d: d['stock_code'].endswith('7'))
+    # 只有列表请求（每页100只），没有详情请求
+    assert len(scanner.session.calls) == 5
+    assert {call['fields'] for call in scanner.session.calls} == {CLIST_DETAIL_FIELDS}
+    assert [d['stock_code'] for d in result] == [f'{600000 + i}' for i in range(7, 450, 10)]
+
+    # 与详情接口的结果完全一致
+    api = EnhancedStockAPI(use_cache=False, router=SourceRouter())
+    api.session = FakeUlistSession()
+    assert result[0] == api.get_stock_details_em(['600007'])['600007']
+    assert result[0]['open_price'] == 10.1 and result[0]['turnover_rate'] == 6.25
+    assert result[0]['industry'] == '银行' and result[0]['total_market_cap'] == 1.2e10
+
+
+def test_iter_market_yields_matches_page_by_page():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=550, delay=0, overlap=True)
+
+    codes = [s['code'] for s in scanner.iter_market(mask_func='volume % 5000 == 0')]
+    assert codes == [f'{600000 + i}' for i in range(0, 550, 50)]
+
+    limited = list(scanner.iter_market(lambda s: True, limit=150))
+    assert len(limited) == 150
+
+
+def test_iter_market_stops_fetching_when_consumer_stops():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=5500, delay=0.02)
+
+    stream = scanner.iter_market(lambda s: True, prefetch=2)
+    first = [next(stream) for _ in range(120)]
+    stream.close()
+    time.sleep(0.1)
+
+    assert first[-1]['code'] == '600119'
+    # 第1、2页已处理，最多再预取两页
+    assert len(scanner.session.pages) <= 4
+
+
+class SortingClistSession:
+    """按 fid/po 排序后分页返回记录"""
+
+    def __init__(self, items):
+        self.items = items
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(dict(params))
+        fid, page, size = params['fid'], int(params['pn']), int(params['pz'])
+        ordered = sorted(self.items, key=lambda item: item.get(fid, 0), reverse=params['po'] == '1')
+        diff = ordered[(page - 1) * size:page * size]
+        return FakeJSONResponse({'data': {'total': len(self.items), 'diff': diff}})
+
+
+def test_plan_clist_query():
+    from scripts.stock_scanner import plan_clist_query
+
+    plan = plan_clist_query('MA5 > 1 and change_percent > 3')
+    assert (plan['field'], plan['fid'], plan['po'], plan['bound']) == ('change_percent', 'f3', '1', 3.0)
+    assert not plan['inclusive']
+
+    plan = plan_clist_query('-2 >= change_percent')
+    assert (plan['po'], plan['bound'], plan['inclusive']) == ('0', -2.0, True)
+
+    assert plan_clist_query('change_percent > 3 or volume > 100') is None
+    assert plan_clist_query("name == '平安银行'") is None
+
+
+def test_push_down_fetches_only_pages_before_threshold():
+    # 5500只股票，涨跌幅从 -10% 到 +10% 均匀分布
+    items = []
+    for i in range(5500):
+        item = make_item(i)
+        item['f3'] = int(-1000 + i * 2000 / 5499)
+        items.append(item)
+
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+    result = scanner.scan_market(mask_func='change_percent > 8')
+
+    expected = sorted((_parse_clist_item(item) for item in items if item['f3'] > 800),
+                      key=lambda s: -s['change_percent'])
+    assert sorted(s['code'] for s in result) == sorted(s['code'] for s in expected)
+    assert {r['fid'] for r in scanner.session.requests} == {'f3'}
+    # 符合条件的约550只，加上预取最多请求9页，而不是55页
+    assert len(scanner.session.requests) <= 9
+
+    # 升序下推
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+    result = scanner.scan_market(mask_func='change_percent <= -9.5')
+    assert len(result) == sum(1 for item in items if item['f3'] <= -950)
+    assert {r['po'] for r in scanner.session.requests} == {'0'}
+    assert len(scanner.session.requests) <= 4
+
+
+def test_rescan_only_rescreens_changed_stocks():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    stocks = [_parse_clist_item(make_item(i)) for i in range(1000)]
+    calls = []
+
+    def screen(stock):
+        calls.append(stock['code'])
+        return stock['current'] > 15
+
+    first = scanner.rescan(screen, universe=stocks)
+    assert len(first) == 499 and len(calls) == 1000
+
+    # 3只股票有新成交，1只新上市
+    updated = [dict(stock) for stock in stocks]
+    updated[0].update(current=20.0, volume=1)
+    updated[600].update(current=9.0, volume=60001)
+    updated[999]['volume'] += 100
+    updated.append({**updated[1], 'code': '688999', 'current': 30.0})
+    calls.clear()
+
+    second = scanner.rescan(screen, universe=updated)
+    assert sorted(calls) == ['600000', '600600', '600999', '688999']
+    assert scanner.last_rescan == {'stocks': 1001, 'rescreened': 4, 'matched': 500}
+    codes = [s['code'] for s in second]
+    assert codes[0] == '600000' and '600600' not in codes and codes[-1] == '688999'
+
+    # 结果与完整扫描一致
+    assert second == [s for s in updated if s['current'] > 15]
+
+
+def test_rescan_with_expression_and_separate_keys():
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = FakeClistSession(total=300, delay=0)
+
+    assert len(scanner.rescan(mask_func='volume >= 20000')) == 100
+    assert len(scanner.rescan(mask_func='volume < 100')) == 1
+    assert scanner.rescan(mask_func='volume >= 20000')[0]['code'] == '600200'
+    assert scanner.last_rescan['rescreened'] == 0
+
+    scanner.reset_rescan()
+    scanner.rescan(mask_func='volume >= 20000')
+    assert scanner.last_rescan['rescreened'] == 300
+
+
+def test_rescan_detects_quote_time_changes():
+    items = [dict(make_item(i), f124=1767596400) for i in range(300)]
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+
+    scanner.rescan(mask_func='volume >= 20000')
+    assert all('f124' in r['fields'].split(',') for r in scanner.session.requests)
+
+    # 价格、成交量不变，只有行情时间更新的股票也重新筛选
+    items[5]['f124'] += 3
+    scanner.rescan(mask_func='volume >= 20000')
+    assert scanner.last_rescan['rescreened'] == 1
+
+
+def test_clist_fields_for_declared_fields():
+    from scripts.stock_scanner import clist_fields_for, declared_fields
+    from scripts.screen_expression import ScreenExpression
+
+    assert clist_fields_for(None) == 'f12,f13,f14,f2,f3,f4,f5,f6'
+    assert clist_fields_for(['turnover_rate', 'open_price', 'MA5', 'current_price']) == \
+        'f12,f13,f14,f2,f3,f4,f5,f6,f17,f8'
+
+    def screen(stock):
+        return stock['open_price'] > stock['current_price']
+    screen.fields = ('open_price', 'current_price')
+
+    expr = ScreenExpression('turnover_rate > 5 and MA5 > MA20')
+    assert declared_fields(screen, expr, None) == ('MA20', 'MA5', 'current_price', 'open_price', 'turnover_rate')
+
+
+def test_scan_requests_declared_fields_in_single_pass():
+    items = []
+    for i in range(300):
+        item = make_item(i)
+        item.update(f17=1000 + 2 * i, f8=i, f100='银行')
+        items.append(item)
+
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+
+    # 阴线（开盘价高于现价）且换手率 >= 2.9%；换手率条件下推，按 f8 降序只取到阈值
+    result = scanner.scan_market(mask_func='open_price > current and turnover_rate >= 2.9')
+    assert {r['fields'] for r in scanner.session.requests} == {'f12,f13,f14,f2,f3,f4,f5,f6,f17,f8'}
+    assert len(result) == 10 and result[-1]['code'] == '600290'
+    assert result[-1]['open_price'] == 15.8 and result[-1]['turnover_rate'] == 2.9
+
+    # 按详情字段编写的战法
+    from strategies.strategy_manager import get_strategy_manager
+    strategy = get_strategy_manager().load_strategy('王子战法')
+    assert strategy['metadata']['fields'] == ['current_price', 'open_price']
+
+    # 生成的战法只声明筛选逻辑从 stock_data 读取的字段（换手率、均线取自 params）
+    from strategies.strategy_generator import generate_strategy
+    code = generate_strategy('测试', 'MA5大于MA10，收阴线，换手率大于5%，成交量大于10000')
+    assert "STRATEGY_FIELDS = ['current_price', 'open_price', 'volume']" in code
+    assert 'STRATEGY_FIELDS = []' in generate_strategy('测试', '换手率大于5%')
+
+    # 加载的战法直接传给 scan_market，不必再指定 fields
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+    scanner.scan_market(screen_func=strategy['screen_func'])
+    assert {r['fields'] for r in scanner.session.requests} == {'f12,f13,f14,f2,f3,f4,f5,f6,f17'}
+    assert len(scanner.session.requests) == 3
+
+    scanner = StockScanner(now_func=TRADING, use_snapshot=False)
+    scanner.session = SortingClistSession(items)
+    stocks = scanner.get_all_stocks(fields=declared_fields(strategy['screen_func']) + ('industry',))
+    assert len(stocks) == 300 and len(scanner.session.requests) == 3
+    stock = next(s for s in stocks if s['code'] == '600005')
+    assert stock['current_price'] == stock['current'] == 10.05
+    assert stock['industry'] == '银行'
+
+
+def test_rankings_share_one_snapshot_until_stale(tmp_path):
+    from scripts.universe_cache import UniverseCache
+
+    items = []
+    for i in range(250):
+        item = make_item(i)
+        # 振幅与成交额顺序相反，涨跌幅按 i 打乱
+        item.update(f7=25000 - 100 * i, f3=i * 37 % 250, f8=i)
+        items.append(item)
+
+    now = [datetime(2026, 1, 5, 10, 0)]
+    cache = UniverseCache(str(tmp_path), now_func=lambda: now[0])
+    scanner = StockScanner(now_func=lambda: now[0], snapshot_cache=cache)
+    scanner.session = SortingClistSession(items)
+
+    hot = scanner.get_hot_stocks(top_n=3)
+    assert [s['code'] for s in hot] == ['600249', '600248', '600247']
+    assert set(hot[0]) == {'code', 'name', 'current', 'change_percent', 'turnover'}
+
+    rankings = scanner.get_rankings(top_n=2)
+    assert [s['code'] for s in rankings['amplitude']] == ['600000', '600001']
+    assert rankings['amplitude'][0]['amplitude'] == 250.0
+    top_change = sorted(items, key=lambda item: -item['f3'])[0]['f12']
+    assert rankings['change_percent'][0]['code'] == top_change
+    losers = scanner.get_ranking('change_percent', 1, ascending=True)
+    assert losers[0]['change_percent'] == 0
+    # 一个看板的所有排行只请求一次全市场（3页）
+    assert len(scanner.session.requests) == 3
+    with pytest.raises(ValueError, match='MA5'):
+        scanner.get_rankings(by=('turnover', 'MA5'))
+    assert len(scanner.session.requests) == 3
+
+    # 快照过期后才重新请求
+    now[0] = datetime(2026, 1, 5, 10, 0, 30)
+    scanner.get_ranking('volume', 5)
+    assert len(scanner.session.requests) == 3
+    now[0] = datetime(2026, 1, 5, 10, 2)
+    scanner.get_ranking('volume', 5)
+    assert len(scanner.session.requests) == 6
+
+    # 新实例读取磁盘快照，同样不重复请求
+    fresh = StockScanner(now_func=lambda: now[0], snapshot_cache=cache)
+    fresh.session = SortingClistSession(items)
+    assert fresh.get_hot_stocks(top_n=3) == hot
+    assert fresh.session.requests == []
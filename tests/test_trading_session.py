@@ -0,0 +1,73 @@
+"""
+交易时段测试
+"""
+import sys
+import os
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts import trading_session as ts
+from scripts.stock_scanner import StockScanner
+from tests.test_stock_scanner import FakeClistSession
+
+
+def test_phases_on_trading_day():
+    # 2026-01-05 是周一
+    day = lambda h, m: datetime(2026, 1, 5, h, m)
+    assert ts.phase_at(day(9, 0)) == ts.PRE_OPEN
+    assert ts.phase_at(day(9, 15)) == ts.CALL_AUCTION
+    assert ts.phase_at(day(9, 27)) == ts.AUCTION_MATCHED
+    assert ts.phase_at(day(10, 0)) == ts.CONTINUOUS
+    assert ts.phase_at(day(12, 0)) == ts.LUNCH_BREAK
+    assert ts.phase_at(day(13, 0)) == ts.CONTINUOUS
+    assert ts.phase_at(day(14, 58)) == ts.CLOSING_AUCTION
+    assert ts.phase_at(day(15, 0)) == ts.CLOSED
+
+
+def test_weekends_and_holidays():
+    assert ts.phase_at(datetime(2026, 1, 10, 10, 0)) == ts.HOLIDAY   # 周六
+    assert ts.phase_at(datetime(2026, 10, 6, 10, 0)) == ts.HOLIDAY   # 国庆
+    assert not ts.is_trading_day(date(2026, 2, 18))
+    assert ts.next_trading_day(date(2026, 9, 30)) == date(2026, 10, 8)
+    assert ts.previous_trading_day(date(2026, 1, 5)) == date(2025, 12, 31)
+
+
+def test_next_active_time():
+    assert ts.next_active_time(datetime(2026, 1, 5, 10, 0)) == datetime(2026, 1, 5, 10, 0)
+    assert ts.next_active_time(datetime(2026, 1, 5, 9, 27)) == datetime(2026, 1, 5, 9, 30)
+    assert ts.next_active_time(datetime(2026, 1, 5, 12, 0)) == datetime(2026, 1, 5, 13, 0)
+    assert ts.next_active_time(datetime(2026, 1, 9, 16, 0)) == datetime(2026, 1, 12, 9, 15)
+    # 春节前最后一个交易日收盘后，到节后第一个交易日
+    assert ts.next_active_time(datetime(2026, 2, 13, 15, 30)) == datetime(2026, 2, 24, 9, 15)
+    assert ts.seconds_until_active(datetime(2026, 1, 5, 12, 0)) == 3600
+
+
+def test_last_completed_trading_day():
+    assert ts.last_completed_trading_day(datetime(2026, 1, 6, 10, 0)) == date(2026, 1, 5)
+    assert ts.last_completed_trading_day(datetime(2026, 1, 6, 15, 0)) == date(2026, 1, 6)
+    assert ts.last_completed_trading_day(datetime(2026, 1, 10, 10, 0)) == date(2026, 1, 9)
+    assert ts.last_completed_trading_day(datetime(2026, 1, 1, 20, 0)) == date(2025, 12, 31)
+
+
+def test_wait_until_active_respects_limits():
+    closed = lambda: datetime(2026, 1, 5, 12, 0)
+    assert ts.wait_until_active(lambda: datetime(2026, 1, 5, 10, 0)) == 0.0
+    assert ts.wait_until_active(closed, max_wait=0.01) == 0.01
+
+
+def test_scanner_reuses_list_while_closed():
+    now = [datetime(2026, 1, 5, 20, 0)]
+    scanner = StockScanner(now_func=lambda: now[0], use_snapshot=False)
+    scanner.session = FakeClistSession(total=1, delay=0)
+
+    first = scanner.get_all_stocks()
+    first[0]['code'] = 'changed'
+    assert scanner.get_all_stocks()[0]['code'] == '600000'
+    assert len(scanner.session.pages) == 1
+
+    # 次日开盘后重新请求，交易中不缓存
+    now[0] = datetime(2026, 1, 6, 10, 0)
+    scanner.get_all_stocks()
+    scanner.get_all_stocks()
+    assert len(scanner.session.pages) == 3
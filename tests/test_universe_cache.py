@@ -0,0 +1,148 @@
+"""
+全市场列表磁盘快照测试 - 使用临时目录，不依赖网络
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scripts.stock_scanner import StockScanner
+from scripts.trading_session import next_session_start
+from scripts.universe_cache import UniverseCache
+from tests.test_stock_scanner import FakeClistSession
+
+# 2026-01-05（周一）16:00，已收盘
+AFTER_CLOSE = datetime(2026, 1, 5, 16, 0)
+
+
+def test_next_session_start():
+    assert next_session_start(datetime(2026, 1, 5, 8, 0)) == datetime(2026, 1, 5, 9, 15)
+    assert next_session_start(datetime(2026, 1, 5, 10, 0)) == datetime(2026, 1, 6, 9, 15)
+    # 周五收盘后到下周一
+    assert next_session_start(datetime(2026, 1, 9, 16, 0)) == datetime(2026, 1, 12, 9, 15)
+
+
+def test_round_trip(tmp_path):
+    cache = UniverseCache(str(tmp_path), now_func=lambda: AFTER_CLOSE)
+    records = [
+        {'code': '600000', 'name': '浦发银行', 'market': 1, 'price': 10.5, 'volume': 100},
+        {'code': '000001', 'name': '平安银行', 'market': 0, 'price': 12.25, 'volume': 0},
+    ]
+    cache.save('universe', records)
+
+    assert cache.load('universe') == records
+    assert isinstance(cache.load('universe')[0]['market'], int)
+    assert cache.info('universe')['count'] == 2
+
+
+def test_expires_at_next_session(tmp_path):
+    now = [AFTER_CLOSE]
+    cache = UniverseCache(str(tmp_path), now_func=lambda: now[0])
+    cache.save('universe', [{'code': '600000', 'price': 1.0}])
+
+    now[0] = datetime(2026, 1, 6, 9, 0)
+    assert cache.load('universe') is not None
+    now[0] = datetime(2026, 1, 6, 9, 15)
+    assert cache.load('universe') is None
+
+
+def test_get_or_fetch_and_invalidate(tmp_path):
+    cache = UniverseCache(str(tmp_path), now_func=lambda: AFTER_CLOSE)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{'code': '600000', 'price': 1.0}]
+
+    cache.get_or_fetch('universe', fetch)
+    cache.get_or_fetch('universe', fetch)
+    assert len(calls) == 1
+
+    cache.get_or_fetch('universe', fetch, refresh=True)
+    assert len(calls) == 2
+
+    cache.invalidate('universe')
+    assert cache.load('universe') is None
+
+
+def test_scanner_reuses_snapshot_across_instances(tmp_path):
+    cache = UniverseCache(str(tmp_path), now_func=lambda: AFTER_CLOSE)
+
+    scanner = StockScanner(now_func=lambda: AFTER_CLOSE, snapshot_cache=cache)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    stocks = scanner.get_all_stocks()
+    assert len(stocks) == 250
+
+    # 新进程（新实例）直接读取快照，不再请求接口
+    fresh = StockScanner(now_func=lambda: AFTER_CLOSE, snapshot_cache=cache)
+    fresh.session = FakeClistSession(total=250, delay=0)
+    assert fresh.get_all_stocks() == stocks
+    assert fresh.get_all_stocks(limit=10) == stocks[:10]
+    assert len(list(fresh.iter_market(mask_func='volume >= 0'))) == 250
+    assert fresh.session.pages == []
+
+    fresh.refresh_universe()
+    assert fresh.session.pages
+
+
+def test_scanner_limit_without_snapshot_does_not_save(tmp_path):
+    cache = UniverseCache(str(tmp_path), now_func=lambda: AFTER_CLOSE)
+    scanner = StockScanner(now_func=lambda: AFTER_CLOSE, snapshot_cache=cache)
+    scanner.session = FakeClistSession(total=250, delay=0)
+
+    assert len(scanner.get_all_stocks(limit=50)) == 50
+    assert cache.load('a_share_universe') is None
+
+
+def test_partial_universe_is_not_saved(tmp_path):
+    cache = UniverseCache(str(tmp_path), now_func=lambda: AFTER_CLOSE)
+    scanner = StockScanner(now_func=lambda: AFTER_CLOSE, snapshot_cache=cache)
+
+    # 第2页失败：返回已获取的部分，但不保存为快照
+    scanner.session = FakeClistSession(total=250, delay=0, fail_pages=[2])
+    assert len(scanner.get_all_stocks()) == 150
+    assert cache.load('a_share_universe') is None
+
+    # 第1页失败：不保存空列表
+    scanner.session = FakeClistSession(total=250, delay=0, fail_pages=[1])
+    assert scanner.get_all_stocks() == []
+    assert cache.load('a_share_universe') is None
+
+    # 完整获取后才保存；之后的不完整刷新保留原快照
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assert len(scanner.get_all_stocks()) == 250
+    scanner.session = FakeClistSession(total=250, delay=0, fail_pages=[3])
+    assert len(scanner.refresh_universe()) == 200
+    assert len(cache.load('a_share_universe')) == 250
+
+
+def test_intraday_scan_does_not_reuse_earlier_quotes(tmp_path):
+    """盘中较早保存的快照行情已过时：之后的扫描重新获取；午间休市期间可直接使用"""
+    now = [datetime(2026, 1, 5, 9, 35)]
+    clock = lambda: now[0]
+    cache = UniverseCache(str(tmp_path), now_func=clock)
+    scanner = StockScanner(now_func=clock, snapshot_cache=cache)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assert len(scanner.get_all_stocks()) == 250
+    assert cache.load('a_share_universe') is not None
+
+    now[0] = datetime(2026, 1, 5, 14, 30)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assert len(scanner.scan_market(mask_func='volume >= 0')) == 250
+    assert scanner.session.pages
+    assert scanner.get_snapshot().fetched_at == now[0]
+
+    # 11:35 收盘前获取的快照，午休期间行情不变
+    now[0] = datetime(2026, 1, 5, 11, 35)
+    scanner.refresh_universe()
+    now[0] = datetime(2026, 1, 5, 12, 30)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    assert len(scanner.scan_market(mask_func='volume >= 0')) == 250
+    assert scanner.session.pages == []
+
+    # 收盘后不使用盘中保存的快照
+    now[0] = datetime(2026, 1, 5, 16, 0)
+    scanner.session = FakeClistSession(total=250, delay=0)
+    scanner.get_all_stocks()
+    assert scanner.session.pages